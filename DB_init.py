@@ -4,11 +4,11 @@ OpenClassroom Project 4
 Sample codes to manipulate TinyDB
 """
 
-from tinydb import TinyDB
+import storage
 
 
 def add_player(first_name: str, last_name: str, birth_day: int, birth_mon: int, birth_year: int,
-               sex: str, rating: int, tournament_score: float, table):
+               sex: str, rating: int, half_points: int, table):
     """Insert a player in the database - few error controls, for debug purposes only
 
     :return: Nothing
@@ -22,7 +22,7 @@ def add_player(first_name: str, last_name: str, birth_day: int, birth_mon: int,
         'birth_year': birth_year,
         'sex': sex,
         'rating': rating,
-        'tournament_score': tournament_score
+        'half_points': half_points
     }
 
     table.insert(serialized_player)
@@ -36,18 +36,18 @@ def add_test_players():
     :return: Nothing
     """
 
-    # Open database
-    db = TinyDB("ChessDB.json")
+    # Open player table
+    db = storage.open_db(storage.PLAYERS_FILE)
     table_players = db.table("table_players")
 
-    add_player("A", "B", 1, 5, 1968, "M", 2, 0.0, table_players)
-    add_player("C", "D", 12, 2, 1992, "F", 3, 0.0, table_players)
-    add_player("E", "F", 17, 6, 1997, "M", 5, 0.0, table_players)
-    add_player("G", "H", 21, 12, 1984, "F", 8, 0.0, table_players)
-    add_player("I", "J", 3, 11, 1975, "M", 7, 0.0, table_players)
-    add_player("K", "L", 5, 9, 2002, "F", 1, 0.0, table_players)
-    add_player("M", "N", 29, 11, 1962, "M", 4, 0.0, table_players)
-    add_player("O", "P", 4, 8, 1972, "F", 6, 0.0, table_players)
+    add_player("A", "B", 1, 5, 1968, "M", 2, 0, table_players)
+    add_player("C", "D", 12, 2, 1992, "F", 3, 0, table_players)
+    add_player("E", "F", 17, 6, 1997, "M", 5, 0, table_players)
+    add_player("G", "H", 21, 12, 1984, "F", 8, 0, table_players)
+    add_player("I", "J", 3, 11, 1975, "M", 7, 0, table_players)
+    add_player("K", "L", 5, 9, 2002, "F", 1, 0, table_players)
+    add_player("M", "N", 29, 11, 1962, "M", 4, 0, table_players)
+    add_player("O", "P", 4, 8, 1972, "F", 6, 0, table_players)
 
     # Close database
     db.close()
@@ -56,23 +56,16 @@ def add_test_players():
 
 
 def create_tables():
-    """Create output DB with two tables
+    """Create output DB: empty catalog and player table
 
     :return: Nothing
     """
 
-    # Open database
-    db = TinyDB("ChessDB.json")
-
-    # Drop existing table to clean everything
-    db.drop_table("table_tournaments")
-    db.drop_table("table_players")
-
-    # Create fresh tables
-    db.table("table_tournaments")
-    db.table("table_players")
-
-    # Close database
-    db.close()
+    # Drop existing tables to clean everything (tournament files are left orphaned)
+    for path, table_name in [(storage.CATALOG_FILE, "table_catalog"), (storage.PLAYERS_FILE, "table_players")]:
+        db = storage.open_db(path)
+        db.drop_table(table_name)
+        db.table(table_name)
+        db.close()
 
     return
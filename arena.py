@@ -0,0 +1,149 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Class implementing the waiting queue of an arena: players are paired as soon as they are available,
+with the waiting player closest to them in score, then rating, never against their last opponent
+"""
+
+import bisect
+from leaderboard import Leaderboard
+
+
+# How many waiting players are examined on each side of a player before accepting a rematch
+ARENA_WINDOW = 8
+
+
+class ArenaQueue:
+
+    def __init__(self):
+        # Waiting players, sorted like the leaderboard (-score, rating, player_id)
+        self.keys = []
+        self.key_by_id = {}
+
+        # Rematch and color history: last opponent of each player, whites minus blacks
+        self.last_opponent = {}
+        self.color_balance = {}
+
+    def clear(self) -> None:
+        """Forget waiting players and history
+
+        return: Nothing
+        """
+
+        self.keys.clear()
+        self.key_by_id.clear()
+        self.last_opponent.clear()
+        self.color_balance.clear()
+
+        return
+
+    def add(self, player_id: int, score: int, rating: int) -> None:
+        """A player is available for a new game - O(log n) search
+
+        param player_id: integer ID
+        param score: current score in half-points
+        param rating: rank
+        return: Nothing
+        """
+
+        if player_id in self.key_by_id:
+            return
+
+        key = Leaderboard.make_key(player_id, score, rating)
+        bisect.insort(self.keys, key)
+        self.key_by_id[player_id] = key
+
+        return
+
+    def remove(self, player_id: int) -> bool:
+        """A player leaves the queue (paired or paused)
+
+        param player_id: integer ID
+        return: False if the player was not waiting
+        """
+
+        key = self.key_by_id.pop(player_id, None)
+        if key is None:
+            return False
+
+        del self.keys[bisect.bisect_left(self.keys, key)]
+
+        return True
+
+    def is_waiting(self, player_id: int) -> bool:
+        """Is a player waiting for an opponent?
+
+        param player_id: integer ID
+        return: True/False
+        """
+
+        return player_id in self.key_by_id
+
+    def get_waiting(self) -> list:
+        """IDs of the waiting players, best score first
+
+        return: list of IDs
+        """
+
+        return [key[2] for key in self.keys]
+
+    def record_game(self, white_id: int, black_id: int) -> None:
+        """Remember a game for the next pairings (last opponents and colors)
+
+        param white_id: ID of the white player
+        param black_id: ID of the black player
+        return: Nothing
+        """
+
+        self.last_opponent[white_id] = black_id
+        self.last_opponent[black_id] = white_id
+        self.color_balance[white_id] = self.color_balance.get(white_id, 0) + 1
+        self.color_balance[black_id] = self.color_balance.get(black_id, 0) - 1
+
+        return
+
+    def find_opponent(self, player_id: int, played_pairs: set) -> int:
+        """Closest waiting player in the queue order: a new opponent if possible, else a rematch,
+        never the last opponent
+
+        param player_id: ID of a waiting player
+        param played_pairs: set of (lower ID, higher ID) of the games already played
+        return: ID of the opponent, 0 if nobody suitable is waiting
+        """
+
+        position = bisect.bisect_left(self.keys, self.key_by_id[player_id])
+        rematch = 0
+        for distance in range(1, ARENA_WINDOW + 1):
+            for index in (position - distance, position + distance):
+                if index < 0 or index >= len(self.keys):
+                    continue
+                opponent_id = self.keys[index][2]
+                if self.last_opponent.get(player_id) == opponent_id:
+                    continue
+                if (min(player_id, opponent_id), max(player_id, opponent_id)) not in played_pairs:
+                    return opponent_id
+                if not rematch:
+                    rematch = opponent_id
+
+        return rematch
+
+    def pair(self, player_id: int, played_pairs: set) -> tuple:
+        """Pair a waiting player and remove both players from the queue
+
+        param player_id: ID of a waiting player
+        param played_pairs: set of (lower ID, higher ID) of the games already played
+        return: (white ID, black ID), or None if the player has to wait
+        """
+
+        opponent_id = self.find_opponent(player_id, played_pairs)
+        if not opponent_id:
+            return None
+
+        self.remove(player_id)
+        self.remove(opponent_id)
+
+        # The player who had white more often gets black
+        if self.color_balance.get(player_id, 0) > self.color_balance.get(opponent_id, 0):
+            return opponent_id, player_id
+
+        return player_id, opponent_id
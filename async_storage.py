@@ -0,0 +1,155 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Storage operations run by a dedicated I/O thread, so that the REPL never waits for the disk
+A single worker executes reads and writes one at a time, in the order they were submitted: a load always
+sees the saves submitted before it. Callers hand over snapshots (serialized forms, never modified afterwards)
+The REPL submits operations with a completion handler, run on its own thread when it polls (see poll)
+"""
+
+import threading
+import collections
+import concurrent.futures
+import storage
+
+
+# Name of the worker thread (operations submitted from the worker itself are run at once, see run_sync)
+WORKER_NAME = "storage-io"
+
+# Single worker: operations are executed in submission order
+executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix=WORKER_NAME)
+
+# Operations submitted by the REPL whose completion was not reported yet: (future, on_done, on_error)
+pending = collections.deque()
+
+
+def run(function, *args) -> concurrent.futures.Future:
+    """Queue an operation (from any thread), nobody is told when it ends
+
+    param function: storage function, called on the worker thread
+    param args: its arguments (snapshots)
+    return: future of its result
+    """
+
+    return executor.submit(function, *args)
+
+
+def run_sync(function, *args):
+    """Run an operation after everything already queued and wait for it (for threads that need the result)
+
+    param function: storage function
+    param args: its arguments (snapshots)
+    return: its result (its exception is raised again)
+    """
+
+    # The worker cannot wait for itself
+    if threading.current_thread().name.startswith(WORKER_NAME):
+        return function(*args)
+
+    return run(function, *args).result()
+
+
+def submit(on_done, function, *args) -> concurrent.futures.Future:
+    """Queue an operation for the REPL: its result is handed to on_done by the next poll()
+
+    param on_done: called on the polling thread with the result (None = nothing to do)
+    param function: storage function, called on the worker thread
+    param args: its arguments (snapshots)
+    return: future of its result
+    """
+
+    future = run(function, *args)
+    pending.append((future, on_done, None))
+
+    return future
+
+
+def submit_write(on_done, on_error, function, *args) -> concurrent.futures.Future:
+    """Queue a write for the REPL, with a handler for failures (e.g. keep the change pending)
+
+    param on_done: called on the polling thread with the result (None = nothing to do)
+    param on_error: called on the polling thread with the exception raised by the operation
+    param function: storage function, called on the worker thread
+    param args: its arguments (snapshots)
+    return: future of its result
+    """
+
+    future = run(function, *args)
+    pending.append((future, on_done, on_error))
+
+    return future
+
+
+def poll() -> int:
+    """Report the operations that ended, in submission order (call it from the REPL thread only)
+    A failed operation is reported whatever its exception (I/O error, corrupt file...): the REPL keeps running
+
+    return: number of operations still running or waiting
+    """
+
+    # Messages left by the storage functions come first, their operation may still be running
+    while storage.notices:
+        print(storage.notices.popleft())
+
+    while pending and pending[0][0].done():
+        future, on_done, on_error = pending.popleft()
+        try:
+            result = future.result()
+        except Exception as error:
+            print(f"Storage operation failed: {error}")
+            if on_error is not None:
+                on_error(error)
+            continue
+        if on_done is not None:
+            on_done(result)
+
+    return len(pending)
+
+
+def wait() -> None:
+    """Wait for every operation submitted so far, then report them
+
+    return: Nothing
+    """
+
+    if pending:
+        concurrent.futures.wait([future for future, _, _ in pending])
+    poll()
+
+    return
+
+
+def save_players(on_done, on_error, serialized_players: list, next_id: int,
+                 renamed_ids: list) -> concurrent.futures.Future:
+    """Write a snapshot of the player table in the background
+
+    param on_done: called with True once written
+    param on_error: called with the exception if the write failed (or was refused)
+    param serialized_players: snapshot (never modified afterwards)
+    param next_id: next free ID of the list
+    param renamed_ids: IDs of the players renamed since the list was loaded
+    return: future
+    """
+
+    return submit_write(on_done, on_error, storage.save_players, serialized_players, next_id, renamed_ids)
+
+
+def load_players(on_done) -> concurrent.futures.Future:
+    """Read the player table in the background
+
+    param on_done: called with (list of serialized players, next free ID)
+    return: future
+    """
+
+    return submit(on_done, storage.load_player_table)
+
+
+def load_tournament(on_done, tour_name: str) -> concurrent.futures.Future:
+    """Read a stored tournament and complete its players from the player table in the background
+
+    param on_done: called with (serialized tournament, IDs of missing players), see storage.load_resolved_tournament
+    param tour_name: name of the tournament
+    return: future
+    """
+
+    return submit(on_done, storage.load_resolved_tournament, tour_name)
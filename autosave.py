@@ -0,0 +1,135 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Class implementing a background autosave: bursts of changes are coalesced into a single write,
+performed by a worker thread once no change happened during a quiet period
+"""
+
+import threading
+import time
+
+
+class AutoSaver:
+
+    def __init__(self, save_function, quiet_period: float):
+        """Prepare the worker thread (not started yet)
+
+        param save_function: called without argument from the worker thread to write pending changes
+        param quiet_period: seconds without change before writing, 0 = autosave disabled
+        """
+
+        self.save_function = save_function
+        self.quiet_period = quiet_period
+        self.last_change = None
+        self.stopped = False
+        self.condition = threading.Condition()
+        self.save_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+
+    def start(self) -> None:
+        """Start the worker thread
+
+        return: Nothing
+        """
+
+        self.thread.start()
+
+        return
+
+    def set_quiet_period(self, quiet_period: float) -> None:
+        """Change the delay between the last change and the write
+
+        param quiet_period: seconds, 0 = autosave disabled
+        return: Nothing
+        """
+
+        with self.condition:
+            self.quiet_period = quiet_period
+            self.condition.notify()
+
+        return
+
+    def notify(self) -> None:
+        """Signal a change: the write is postponed until the quiet period elapses
+
+        return: Nothing
+        """
+
+        with self.condition:
+            self.last_change = time.monotonic()
+            self.condition.notify()
+
+        return
+
+    def flush(self) -> None:
+        """Write pending changes now, from the calling thread
+
+        return: Nothing
+        """
+
+        with self.condition:
+            self.last_change = None
+        self.save()
+
+        return
+
+    def stop(self) -> None:
+        """Stop the worker thread after a last flush (if autosave is enabled)
+
+        return: Nothing
+        """
+
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.thread.is_alive():
+            self.thread.join()
+        if self.quiet_period > 0:
+            self.flush()
+
+        return
+
+    def save(self) -> None:
+        """Call the save function, never twice at the same time
+        Any failure is reported and the thread goes on (the save function keeps the changes pending)
+
+        return: Nothing
+        """
+
+        with self.save_lock:
+            try:
+                self.save_function()
+            except Exception as error:
+                print(f"Autosave failed: {error}")
+
+        return
+
+    def run(self) -> None:
+        """Worker thread: wait for changes, then for the quiet period, then save
+
+        return: Nothing
+        """
+
+        while True:
+            with self.condition:
+                # Wait for a change (or for autosave to be enabled)
+                while not self.stopped and (self.last_change is None or self.quiet_period <= 0):
+                    self.condition.wait()
+                if self.stopped:
+                    return
+
+                # Every new change restarts the quiet period
+                while not self.stopped and self.last_change is not None:
+                    remaining = self.last_change + self.quiet_period - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if self.stopped:
+                    return
+
+                # Changes may have been flushed meanwhile
+                if self.last_change is None:
+                    continue
+                self.last_change = None
+
+            self.save()
@@ -0,0 +1,42 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Round-robin schedules following the Berger tables (FIDE Handbook, C.05 Annex 1)
+Players are given by seed number (0 = first seed), the whole schedule is built at once in O(N²)
+"""
+
+
+def berger_schedule(player_count: int, double: bool) -> list:
+    """Build all rounds of a round-robin
+
+    param player_count: number of players (>= 2), an odd number gives a bye to one player per round
+    param double: True = double round-robin, the second cycle is played with reversed colors
+    return: list of rounds, each round being a list of (white seed, black seed) boards
+    """
+
+    # Odd number of players: a dummy player is added, meeting him means a bye
+    size = player_count + player_count % 2
+    last = size - 1
+
+    rounds = []
+    for round_index in range(last):
+        # Players 0..last-1 turn around the table, player "last" keeps his board and alternates colors
+        shift = round_index * size // 2
+        ring = [(shift + k) % last for k in range(last)]
+
+        boards = []
+        if round_index % 2 == 0:
+            boards.append((ring[0], last))
+        else:
+            boards.append((last, ring[0]))
+        for k in range(1, size // 2):
+            boards.append((ring[k], ring[last - k]))
+
+        # Remove the games against the dummy player
+        rounds.append([board for board in boards if max(board) < player_count])
+
+    # Second cycle: same rounds, colors reversed
+    if double:
+        rounds += [[(black, white) for white, black in boards] for boards in rounds]
+
+    return rounds
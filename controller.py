@@ -5,16 +5,92 @@ Function for the controller part of the MVC structure
 Main loop of the whole program
 """
 
+from session_registry import SessionRegistry
 from tournament import Tournament
 from player_list import PlayerList
+from autosave import AutoSaver
+from tournament_index import TournamentIndex, parse_filter
 import view
-from tinydb import TinyDB
-from tinydb import Query
+import storage
+import async_storage
+import player_stats
+import head_to_head
+import validation
+from errors import ValidationError
+import itertools
+import re
 
 
-# Create the list of players and the tournament as global variables
+# Seconds without change before the autosave thread writes (0 = disabled)
+AUTOSAVE_QUIET_PERIOD = 2.0
+
+# Create the list of players, shared by all sessions, as a global variable
 players = PlayerList()
-tournament = Tournament()
+
+# The player table is only autosaved once it was loaded or saved explicitly (never overwrite it by mistake)
+players_in_database = False
+
+# Tournaments resident in memory: "tournament" always points at the selected one
+sessions = SessionRegistry()
+
+# Secondary indexes over the catalog, rebuilt only when the catalog file changed
+tournament_index = TournamentIndex()
+
+
+def save_pending_changes() -> None:
+    """Write the player list and the tournaments modified since their last save (autosave thread)
+
+    return: Nothing
+    """
+
+    # Snapshot of each changed model, write without its lock: commands never wait for the disk
+    # (the dirty flag is tested and cleared under the write lock: a change is never taken by two savers)
+    jobs = []
+    if players_in_database:
+        snapshot = players.snapshot_for_save(only_if_dirty=True)
+        if snapshot is not None:
+            jobs.append((players, storage.save_players, snapshot))
+    for session_tournament in sessions.get_tournaments():
+        serialized = session_tournament.take_snapshot()
+        if serialized is not None:
+            jobs.append((session_tournament, Tournament.write_serialized, (serialized,)))
+
+    # Writes go through the storage thread, after the operations submitted by the REPL
+    # A failed write keeps its change pending for the next attempt, the other writes still happen
+    failure = None
+    for model, write, args in jobs:
+        try:
+            async_storage.run_sync(write, *args)
+        except Exception as error:
+            model.dirty = True
+            failure = failure or error
+
+    if failure is not None:
+        raise failure
+
+    return
+
+
+autosaver = AutoSaver(save_pending_changes, AUTOSAVE_QUIET_PERIOD)
+players.on_change = autosaver.notify
+sessions.on_change = autosaver.notify
+sessions.new_session("default")
+tournament = sessions.get_current()
+
+
+def run_checked(operation, *args):
+    """Run a model operation and print the value it refused, if any (the model never prints its errors)
+
+    param operation: model method (setter, player edition...)
+    param args: its arguments
+    return: result of the operation, None if it raised a ValidationError
+    """
+
+    try:
+        return operation(*args)
+    except ValidationError as error:
+        view.print_error(error)
+        return None
 
 
 def prompt_confirm(question: str) -> bool:
@@ -83,6 +159,21 @@ def prompt_for_int_in_range(prompt: str, min_val: int, max_val: int) -> int:
     return value
 
 
+def prompt_for_page() -> tuple:
+    """Asks user for the page of a listing to print
+
+    return: (index of the first record, number of records - 0 = all of them)
+    """
+
+    size = prompt_for_int_in_range("Records per page (0 = all)", 0, 1000)
+    if size == 0:
+        return 0, 0
+
+    page = prompt_for_int_in_range("Page number", 1, 100000)
+
+    return (page - 1) * size, size
+
+
 def prompt_for_match_result() -> int:
     """Asks user to enter a result code for a match (0-3)
 
@@ -105,88 +196,175 @@ def prompt_for_time_control() -> int:
     return prompt_for_int_in_range("", 1, 3)
 
 
-def print_all_tournaments():
-    """Print all tournaments listed in the database
+def prompt_for_pairing_system() -> int:
+    """Asks user to enter a code for the pairing system (1-3)
 
-    param tournament_name: name of the tournament
-    param print_tournament: False = only return dictionary, no print
-    return: None if not found, or the dictionary
+    return: 1 = swiss, 2 = round-robin, 3 = double round-robin, 4 = arena
+    """
+
+    view.print_prompt_for_pairing_system()
+
+    return prompt_for_int_in_range("", 1, 4)
+
+
+def print_all_tournaments(offset: int, size: int) -> bool:
+    """Print a page of the tournaments listed in the catalog
+
+    param offset: index of the first tournament to print
+    param size: number of tournaments on the page, 0 = all of them
+    return: False if the catalog is empty
+    """
+
+    # Only the catalog is read (on the storage thread), not the tournaments themselves,
+    # and only up to the end of the page
+    stop = offset + size + 1 if size else None
+    async_storage.submit(lambda page: print_tournaments_page(page, offset, size),
+                         lambda: list(itertools.islice(storage.iter_tournaments(), offset, stop)))
+
+    return True
+
+
+def print_tournaments_page(page: list, offset: int, size: int) -> None:
+    """Print a page of catalog entries read by the storage thread
+
+    param page: entries from offset on (one more than size if a next page exists)
+    param offset: index of the first tournament
+    param size: number of tournaments on the page, 0 = all of them
+    return: Nothing
     """
 
-    # Open database
-    db = TinyDB("ChessDB.json")
-    table_tournament = db.table("table_tournament")
+    if not page and offset == 0:
+        print("No tournament in the database")
+        return
+
+    more = bool(size) and len(page) > size
+    view.print_tournaments_page(page[:size] if size else page, offset, more)
 
-    if not table_tournament:
-        print("table_tournament does not exist")
+    return
+
+
+def find_tournaments(filter_text: str, offset: int, size: int) -> bool:
+    """Print a page of the tournaments matching a filter expression
+
+    param filter_text: conditions separated by spaces (e.g. "time=blitz finished=no start>=2023-03")
+    param offset: index of the first tournament to print
+    param size: number of tournaments on the page, 0 = all of them
+    return: False if the filter is invalid or nothing matches
+    """
+
+    conditions = parse_filter(filter_text)
+    if conditions is None:
         return False
 
-    # Loop and print
-    for tour in table_tournament:
-        view.print_tournament_infos(tour)
+    # The index is only used (and rebuilt when the catalog changed) by the storage thread
+    async_storage.submit(lambda results: print_query_results(results, offset, size),
+                         tournament_index.query, conditions)
+
+    return True
+
+
+def print_query_results(results: list, offset: int, size: int) -> None:
+    """Print a page of the result of a query on the catalog
+
+    param results: all matching catalog entries
+    param offset: index of the first tournament to print
+    param size: number of tournaments on the page, 0 = all of them
+    return: Nothing
+    """
+
+    if not results:
+        print("No matching tournament")
+        return
 
-    # Close database
-    db.close()
+    more = bool(size) and len(results) > offset + size
+    view.print_tournaments_page(results[offset:offset + size] if size else results, offset, more)
 
     return
 
 
 def find_and_print_tournament(tour_name: str, print_tournament: bool) -> dict:
-    """Returns a tournament or prints it
+    """Returns a tournament or prints it (after the storage operations already queued)
 
     param tournament_name: name of the tournament
     param print_tournament: False = only return dictionary, no print
     return: None if not found, or the dictionary
     """
 
-    tournament_found = {}
+    # Only the shard of this tournament is read, its players are completed from the player table for printing
+    # (both by the storage thread: the REPL never reads the files or their caches)
+    tournament_found = async_storage.run_sync(read_printable_tournament, tour_name)
+    if tournament_found and print_tournament:
+        view.print_tournament(tournament_found)
 
-    # Open database and find tournament
-    db = TinyDB("ChessDB.json")
-    table_tournament = db.table("table_tournament")
+    return tournament_found
 
-    if not table_tournament:
-        print("table_tournament does not exist")
-        return tournament_found
 
-    # Search by tournament name
-    for tour in table_tournament:
-        if tour["name"] == tour_name:
-            if print_tournament:
-                view.print_tournament(tour)
-            tournament_found = tour
+def read_printable_tournament(tour_name: str) -> dict:
+    """Read a stored tournament and complete its players from the player table (storage thread)
 
-    # Close database
-    db.close()
+    param tour_name: name of the tournament
+    return: serialized tournament with complete players, empty dictionary if not found
+    """
 
-    return tournament_found
+    return storage.load_resolved_tournament(tour_name)[0]
 
 
-def delete_tournament(tour_name: str) -> bool:
-    """Delete a tournament in the database
+def print_stored_tournament(tournament_found: dict) -> None:
+    """Print a tournament read from the database
 
-    param tournament_name: its name
-    return: True if it was found
+    param tournament_found: serialized tournament with complete players (empty if not found)
+    return: Nothing
     """
 
-    # Open database and find tournament
-    db = TinyDB("ChessDB.json")
-    table_tournament = db.table("table_tournament")
+    if not tournament_found:
+        print("Could not find tournament")
+        return
+
+    view.print_tournament(tournament_found)
 
-    if not table_tournament:
-        print("table_tournament does not exist")
-        return False
+    return
 
-    # Search/delete by tournament name
-    my_query = Query()
-    table_tournament.remove(my_query.name == tour_name)
 
-    # Close database
-    db.close()
+def delete_stored_tournament(tour_name: str) -> bool:
+    """Delete a tournament and its games in the derived tables (storage thread)
+
+    param tour_name: its name
+    return: True if it was found
+    """
+
+    if not storage.delete_tournament(tour_name):
+        return False
+
+    player_stats.remove_tournament_stats(tour_name)
+    head_to_head.remove_tournament_games(tour_name)
 
     return True
 
 
+def delete_tournament(tour_name: str) -> None:
+    """Delete a tournament in the database, in the background
+
+    param tournament_name: its name
+    return: Nothing
+    """
+
+    async_storage.submit(print_deletion, delete_stored_tournament, tour_name)
+
+    return
+
+
+def print_deletion(found: bool) -> None:
+    """Report the deletion of a tournament by the storage thread
+
+    param found: True if the tournament was in the database
+    return: Nothing
+    """
+
+    print("Tournament deleted" if found else "Tournament not found in the database")
+
+    return
+
+
 def main_loop() -> None:
     """Program main loop: takes input commands and interprets them
 
@@ -197,10 +375,21 @@ def main_loop() -> None:
     view.print_welcome()
     view.print_commands()
 
+    autosaver.start()
+
     while True:
         command = prompt_for_str("")
+
+        # Models lock themselves (see rwlock.py): the autosave thread snapshots them between two changes
+        if command == "quit":
+            prompt_quit()
+            continue
+
         execute_command(command)
 
+        # Report the storage operations that ended meanwhile (the I/O thread never prints on its own)
+        async_storage.poll()
+
 
 def prompt_quit() -> None:
     """Prompts user to quit
@@ -209,6 +398,9 @@ def prompt_quit() -> None:
     """
 
     if prompt_confirm("Unsaved data will be lost - quit anyway?"):
+        # Pending changes are still written if autosave is enabled, then queued operations are finished
+        autosaver.stop()
+        async_storage.wait()
         quit()
 
     return
@@ -234,12 +426,16 @@ def add_player() -> None:
     rating = prompt_for_int_in_range("Enter player rank", 1, max_rating)
 
     # Player will be added if all infos are consistant (except rating from now)
-    if not players.add_player(first_name, last_name, birth_day, birth_mon,
-                              birth_year, sex, max_rating + 1, 0.0, insertion_sort=True):
+    try:
+        players.add_player(first_name, last_name, birth_day, birth_mon,
+                           birth_year, sex, max_rating + 1, 0, insertion_sort=True)
+    except ValidationError as error:
+        view.print_error(error)
         print("Could not add player, check whether your inputs are valid")
+        return
 
     # Rating is patched afterwards (easier to implement this way)
-    players.modify_player_rating(first_name, last_name, rating)
+    run_checked(players.modify_player_rating, first_name, last_name, rating)
 
     return
 
@@ -251,7 +447,8 @@ def print_players() -> None:
     """
 
     sort_1 = prompt_for_int_in_range("Order in alphabetical order = 1 / ranking order = 2", 1, 2)
-    players.print_list(sort_1, 1)
+    offset, size = prompt_for_page()
+    players.print_list(sort_1, 1, offset, size)
 
     return
 
@@ -265,14 +462,94 @@ def del_player() -> None:
     first_name = prompt_for_str("Player First Name")
     last_name = prompt_for_str("Player Last Name")
 
+    # Stored tournaments only keep a reference to their players (read after the saves still queued)
+    index = players.find_player_by_names(first_name, last_name)
+    if index != -1 and async_storage.run_sync(player_stats.get_player_stats, players.get_player_id(index)):
+        print("This player takes part in stored tournaments, delete them first")
+        return
+
     # Ask to confirm before deleting anything
     if prompt_confirm(f"Are you sure you want to delete player {first_name} {last_name}?"):
-        if not players.remove_player(first_name, last_name, True):
-            print("Could not remove player from list")
+        run_checked(players.remove_player, first_name, last_name, True)
+
+    return
+
+
+def print_player_stats() -> None:
+    """Print the statistics of a player over all stored tournaments
+
+    return: Nothing
+    """
+
+    first_name = prompt_for_str("Player First Name")
+    last_name = prompt_for_str("Player Last Name")
+
+    index = players.find_player_by_names(first_name, last_name)
+    if index < 0:
+        print("Player not found")
+        return
+
+    # Read after the deletions still queued on the storage thread
+    stats = async_storage.run_sync(player_stats.get_player_stats, players.get_player_id(index))
+    if not stats:
+        print("No game stored for this player")
+        return
+
+    view.print_player_stats(stats)
+
+    return
+
+
+def print_head_to_head() -> None:
+    """Print all stored games between two players
+
+    return: Nothing
+    """
+
+    player_ids = []
+    for prompt in ("First player", "Second player"):
+        first_name = prompt_for_str(f"{prompt} - First Name")
+        last_name = prompt_for_str(f"{prompt} - Last Name")
+        index = players.find_player_by_names(first_name, last_name)
+        if index < 0:
+            print("Player not found")
+            return
+        player_ids.append(players.get_player_id(index))
+
+    games = async_storage.run_sync(head_to_head.get_games, player_ids[0], player_ids[1])
+    if not games:
+        print("These players never met")
+        return
+
+    view.print_head_to_head(games, players.names_by_id())
+
+    return
+
+
+def db_stats_rebuild() -> None:
+    """Rebuild the player statistics and the head-to-head index from all stored tournaments
+
+    return: Nothing
+    """
+
+    count = async_storage.run_sync(rebuild_derived_tables)
+    print(f"Player statistics and head-to-head index rebuilt from {count} tournament(s)")
 
     return
 
 
+def rebuild_derived_tables() -> int:
+    """Rebuild the player statistics and the head-to-head index (storage thread)
+
+    return: number of tournaments read
+    """
+
+    count = player_stats.rebuild_player_stats()
+    head_to_head.rebuild_head_to_head()
+
+    return count
+
+
 def clear_players() -> None:
     """Clear the player list
 
@@ -294,7 +571,7 @@ def edit_first_name() -> None:
     first_name = prompt_for_str("Player First Name")
     last_name = prompt_for_str("Player Last Name")
     new_name = prompt_for_str("New First Name")
-    players.modify_player_first_name(first_name, last_name, new_name)
+    run_checked(players.modify_player_first_name, first_name, last_name, new_name)
 
     return
 
@@ -309,7 +586,7 @@ def edit_last_name() -> None:
     first_name = prompt_for_str("Player First Name")
     last_name = prompt_for_str("Player Last Name")
     new_name = prompt_for_str("New Last Name")
-    players.modify_player_last_name(first_name, last_name, new_name)
+    run_checked(players.modify_player_last_name, first_name, last_name, new_name)
 
     return
 
@@ -323,7 +600,7 @@ def edit_sex() -> None:
     first_name = prompt_for_str("Player First Name")
     last_name = prompt_for_str("Player Last Name")
     new_sex = prompt_for_str("New Sex")
-    players.modify_player_sex(first_name, last_name, new_sex)
+    run_checked(players.modify_player_sex, first_name, last_name, new_sex)
 
     return
 
@@ -339,7 +616,7 @@ def edit_birthday() -> None:
     day = prompt_for_int("Player Birthday - New Day")
     mon = prompt_for_int_in_range("Player Birthday - New Mon", 1, 12)
     year = prompt_for_int_in_range("Player Birthday - New Year", 1900, 2015)
-    players.modify_player_birthday(first_name, last_name, day, year, mon)
+    run_checked(players.modify_player_birthday, first_name, last_name, day, year, mon)
 
     return
 
@@ -354,7 +631,7 @@ def edit_rating() -> None:
     last_name = prompt_for_str("Player Last Name")
     max_rating = players.get_number_of_players()
     rating = prompt_for_int_in_range("Enter player new rank", 1, max_rating)
-    players.modify_player_rating(first_name, last_name, rating)
+    run_checked(players.modify_player_rating, first_name, last_name, rating)
 
     return
 
@@ -365,9 +642,34 @@ def save_list() -> None:
     return: Nothing
     """
 
-    # Ask to confirm before overwriting database
+    # Ask to confirm before overwriting database, the snapshot is written in the background
     if prompt_confirm("This operation will overwrite the database on the hard drive. Are you sure?"):
-        players.save_list()
+        async_storage.save_players(players_saved, players_not_saved, *players.snapshot_for_save())
+
+    return
+
+
+def players_saved(_) -> None:
+    """The player table was written by the storage thread
+
+    return: Nothing
+    """
+
+    global players_in_database
+
+    players_in_database = True
+    print("Players saved")
+
+    return
+
+
+def players_not_saved(_) -> None:
+    """The player table could not be written (or was refused, the reason was printed): keep the change pending
+
+    return: Nothing
+    """
+
+    players.dirty = True
 
     return
 
@@ -378,9 +680,35 @@ def load_list() -> None:
     return: Nothing
     """
 
-    # Ask to confirm before overwriting the whole list
+    # Ask to confirm before overwriting the whole list, it is filled when the storage thread has read it
     if prompt_confirm("This operation will overwrite the players in memory. Continue?"):
-        players.load_list(insertion_sort=True)
+        async_storage.load_players(players_loaded)
+
+    return
+
+
+def players_loaded(player_table: tuple) -> None:
+    """Fill the player list with the table read by the storage thread
+
+    param player_table: (stored players, next free ID)
+    return: Nothing
+    """
+
+    global players_in_database
+
+    serialized_players, next_id = player_table
+
+    # Test I/O error (or empty table)
+    if not serialized_players:
+        print("Could not load players in database")
+        return
+
+    # Invalid players are left aside, all of them reported at once
+    report = players.fill_list(serialized_players, next_id, insertion_sort=True)
+    if report:
+        labels = [f"{player.get('last_name')} {player.get('first_name')}" for player in serialized_players]
+        view.print_validation_report("players", report, labels)
+    players_in_database = True
 
     return
 
@@ -402,7 +730,7 @@ def tournament_add() -> None:
 
     # To add player to the tournament, extract a copy of the player's object from the list
     new_player = players.get_player(player_index)
-    tournament.add_player(new_player)
+    run_checked(tournament.add_player, new_player)
 
     return
 
@@ -427,7 +755,21 @@ def db_tournament_print() -> None:
     """
 
     tour_name = prompt_for_str("Tournament name")
-    find_and_print_tournament(tour_name, True)
+    async_storage.submit(print_stored_tournament, read_printable_tournament, tour_name)
+
+    return
+
+
+def db_tournament_find() -> None:
+    """Print tournaments of the database matching a filter
+
+    return: Nothing
+    """
+
+    view.print_filter_help()
+    filter_text = prompt_for_str("Filter (empty = all)")
+    offset, size = prompt_for_page()
+    find_tournaments(filter_text, offset, size)
 
     return
 
@@ -441,8 +783,7 @@ def tournament_del() -> None:
     first_name = prompt_for_str("Player First Name")
     last_name = prompt_for_str("Player Last Name")
 
-    if not tournament.remove_player(first_name, last_name):
-        print("User was not found in this tournament")
+    run_checked(tournament.remove_player, first_name, last_name)
 
     return
 
@@ -454,7 +795,7 @@ def tournament_location() -> None:
     """
 
     tour_location = prompt_for_str("Tournament location")
-    tournament.set_location(tour_location)
+    run_checked(tournament.set_location, tour_location)
 
     return
 
@@ -467,8 +808,10 @@ def tournament_name() -> None:
 
     tour_name = prompt_for_str("Tournament name")
 
-    if not find_and_print_tournament(tour_name, False):
-        tournament.set_name(tour_name)
+    if sessions.find_session_by_tournament(tour_name):
+        print("Name already used by a tournament in memory")
+    elif not find_and_print_tournament(tour_name, False):
+        run_checked(tournament.set_name, tour_name)
     else:
         print("Name already used for a previous tournament")
 
@@ -487,7 +830,7 @@ def tournament_dates() -> None:
     end_day = prompt_for_int("Tournament end date - Day")
     end_mon = prompt_for_int_in_range("Tournament end date - Mon", 1, 12)
     end_year = prompt_for_int_in_range("Tournament end date - Year", 1900, 2030)
-    tournament.set_dates(start_day, start_mon, start_year, end_day, end_mon, end_year)
+    run_checked(tournament.set_dates, start_day, start_mon, start_year, end_day, end_mon, end_year)
 
     return
 
@@ -511,7 +854,19 @@ def tournament_time() -> None:
     """
 
     time_val = prompt_for_time_control()
-    tournament.set_time_control(time_val)
+    run_checked(tournament.set_time_control, time_val)
+
+    return
+
+
+def tournament_pairing() -> None:
+    """Set the pairing system for the tournament
+
+    return: Nothing
+    """
+
+    pairing_val = prompt_for_pairing_system()
+    run_checked(tournament.set_pairing_system, pairing_val)
 
     return
 
@@ -523,7 +878,33 @@ def tournament_players() -> None:
     """
 
     sort_1 = prompt_for_int_in_range("Order in alphabetical order = 1 / ranking order = 2", 1, 2)
-    tournament.print_players(sort_1, 2)
+    offset, size = prompt_for_page()
+    tournament.print_players(sort_1, 2, offset, size)
+
+    return
+
+
+def tournament_standings() -> None:
+    """Print a page of the standings for the tournament
+
+    return: Nothing
+    """
+
+    offset, size = prompt_for_page()
+    tournament.print_standings(offset, size)
+
+    return
+
+
+def tournament_position() -> None:
+    """Print the position of a player in the standings of the tournament
+
+    return: Nothing
+    """
+
+    first_name = prompt_for_str("Player First Name")
+    last_name = prompt_for_str("Player Last Name")
+    tournament.print_player_position(first_name, last_name)
 
     return
 
@@ -535,7 +916,27 @@ def tournament_save() -> None:
     """
 
     if prompt_confirm("This operation will overwrite the database on the hard drive. Are you sure?"):
-        tournament.save_tournament()
+        # Snapshot now, write in the background: later changes go into the next save
+        serialized = tournament.snapshot_for_save()
+        if serialized:
+            submit_tournament_write(tournament, serialized)
+        elif serialized is not None:
+            print("Nothing to save")
+
+    return
+
+
+def submit_tournament_write(saved_tournament: Tournament, serialized: dict) -> None:
+    """Write a tournament snapshot on the storage thread, a failed write keeps the change pending
+
+    param saved_tournament: the tournament the snapshot was taken from
+    param serialized: its snapshot (dirty flag already cleared)
+    return: Nothing
+    """
+
+    async_storage.submit_write(lambda _: print("Tournament saved"),
+                               lambda _: setattr(saved_tournament, 'dirty', True),
+                               Tournament.write_serialized, serialized)
 
     return
 
@@ -560,11 +961,147 @@ def tournament_load() -> None:
 
     if prompt_confirm("This operation will overwrite the tournament in memory. Continue?"):
         tour_name = prompt_for_str("Tournament name")
-        serialized_tournament = find_and_print_tournament(tour_name, False)
-        if not serialized_tournament:
-            print("Could not find tournament")
-        else:
-            tournament.load_tournament(serialized_tournament)
+
+        # Already resident in another session: just switch to it
+        session_name = sessions.find_session_by_tournament(tour_name)
+        if session_name and session_name != sessions.get_current_name():
+            print(f"Tournament already loaded in session {session_name}, selecting it")
+            select_session(session_name)
+            return
+
+        # Loaded into the tournament selected now, even if another session is selected when the read ends
+        loaded_tournament = tournament
+        async_storage.load_tournament(lambda loaded: load_into(loaded_tournament, loaded), tour_name)
+
+    return
+
+
+def load_into(loaded_tournament: Tournament, loaded: tuple) -> None:
+    """Load a tournament read and completed by the storage thread
+
+    param loaded_tournament: tournament receiving it
+    param loaded: (stored tournament with complete players - empty if not found, IDs of missing players)
+    return: Nothing
+    """
+
+    serialized_tournament, missing = loaded
+    if not serialized_tournament:
+        print("Could not find tournament")
+    elif missing:
+        # Players are stored as references to the player table: all of them must still be there
+        print(f"Players {missing} of this tournament are missing from the player list (players_save?)")
+    else:
+        report = loaded_tournament.load_tournament(serialized_tournament)
+        if report:
+            labels = [f"{player['last_name']} {player['first_name']}" for player in serialized_tournament['players']]
+            view.print_validation_report("players", report, labels)
+
+    return
+
+
+def select_session(name: str) -> bool:
+    """Make a session the target of tournament/round commands (no reload needed)
+
+    param name: session name
+    return: False if unknown session
+    """
+
+    global tournament
+
+    if not sessions.select(name):
+        return False
+
+    tournament = sessions.get_current()
+
+    return True
+
+
+def session_new() -> None:
+    """Create a new session (empty tournament) and select it
+
+    return: Nothing
+    """
+
+    name = prompt_for_str("Session name")
+    if sessions.new_session(name):
+        select_session(name)
+
+    return
+
+
+def session_select() -> None:
+    """Select another session
+
+    return: Nothing
+    """
+
+    name = prompt_for_str("Session name")
+    select_session(name)
+
+    return
+
+
+def session_close() -> None:
+    """Remove a session from memory
+
+    return: Nothing
+    """
+
+    name = prompt_for_str("Session name")
+    if prompt_confirm(f"Unsaved data in session {name} will be lost. Continue?"):
+        if sessions.close(name):
+            select_session(sessions.get_current_name())
+
+    return
+
+
+def autosave_delay() -> None:
+    """Set the quiet period of the autosave thread
+
+    return: Nothing
+    """
+
+    delay = prompt_for_int_in_range("Seconds without change before autosave (0 = disabled)", 0, 3600)
+    autosaver.set_quiet_period(delay)
+
+    return
+
+
+def db_migrate() -> None:
+    """Split the former single-file database into the sharded layout
+
+    return: Nothing
+    """
+
+    if prompt_confirm(f"This operation will copy {storage.DB_MONOLITHIC} into {storage.DB_FOLDER}. Continue?"):
+        async_storage.run_sync(migrate_database)
+
+    return
+
+
+def migrate_database() -> bool:
+    """Split the former single-file database, then rebuild the tables derived from the tournaments (storage thread)
+
+    return: False if there was nothing to migrate
+    """
+
+    if not storage.migrate_monolithic():
+        return False
+
+    rebuild_derived_tables()
+
+    return True
+
+
+def db_archive() -> None:
+    """Move all finished tournaments to the compressed archive
+
+    return: Nothing
+    """
+
+    if prompt_confirm("This operation will compress all finished tournaments. Continue?"):
+        archived = async_storage.run_sync(storage.archive_finished_tournaments)
+        print(f"{archived} tournament(s) archived")
 
     return
 
@@ -577,7 +1114,63 @@ def match_result() -> None:
 
     match_nbr = prompt_for_int("Enter match number")
     result_code = prompt_for_match_result()
-    tournament.set_match_result(match_nbr, result_code)
+    run_checked(tournament.set_match_result, match_nbr, result_code)
+
+    return
+
+
+def parse_results(text: str) -> list:
+    """Read a list of results written as "board=code" (or "board:code"), separated by spaces, commas or lines
+    Anything after a "#" on a line is a comment
+
+    param text: e.g. "0=1 1=3 2=2"
+    return: list of (match index, result code), or None if something cannot be read
+    """
+
+    results = []
+    for line in text.splitlines():
+        for token in re.split(r"[\s,;]+", line.split("#", 1)[0]):
+            if not token:
+                continue
+            match = re.fullmatch(r"(\d+)[=:](\d+)", token)
+            if match is None:
+                print(f"Cannot read result: {token}")
+                return None
+            results.append((int(match.group(1)), int(match.group(2))))
+
+    return results
+
+
+def match_results() -> None:
+    """Set the results of several matches at once, typed inline or read from a file, then save the tournament
+
+    return: Nothing
+    """
+
+    view.print_prompt_for_match_result()
+    text = prompt_for_str("Results as board=code separated by spaces (or @file to read them from a file)")
+
+    if text.startswith("@"):
+        try:
+            with open(text[1:].strip(), "r", encoding="utf-8") as results_file:
+                text = results_file.read()
+        except OSError as error:
+            print(f"Cannot read file: {error}")
+            return
+
+    results = parse_results(text)
+    if results is None:
+        return
+
+    errors = tournament.set_match_results(results)
+    if errors:
+        view.print_match_errors(errors)
+        return
+
+    # One write for the whole batch, in the background like tournament_save
+    serialized = tournament.snapshot_for_save()
+    if serialized:
+        submit_tournament_write(tournament, serialized)
 
     return
 
@@ -631,6 +1224,14 @@ def process_player_commands(command: str) -> None:
     elif command == "player_del":
         del_player()
 
+    # Games, wins, draws, losses and score over all stored tournaments
+    elif command == "player_stats":
+        print_player_stats()
+
+    # All stored games between two players
+    elif command == "player_h2h":
+        print_head_to_head()
+
     # Clear all players
     elif command == "players_clear":
         clear_players()
@@ -659,7 +1260,12 @@ def process_db_tournament_commands(command: str) -> None:
 
     # Print general infos about all tournaments in the database
     elif command == "db_tournament_print_all":
-        print_all_tournaments()
+        offset, size = prompt_for_page()
+        print_all_tournaments(offset, size)
+
+    # Print tournaments matching conditions on location, time control, status or dates
+    elif command == "db_tournament_find":
+        db_tournament_find()
 
     # Find a tournament by name and delete it
     elif command == "db_tournament_del":
@@ -668,6 +1274,91 @@ def process_db_tournament_commands(command: str) -> None:
     return
 
 
+def process_session_commands(command: str) -> None:
+    """Execute commands starting with session prefix
+
+    param command: the command
+    return: Nothing
+    """
+
+    if command == "session_new":
+        session_new()
+    elif command == "session_select":
+        session_select()
+    elif command == "session_close":
+        session_close()
+    elif command == "session_list":
+        view.print_sessions(sessions.get_summaries())
+
+    return
+
+
+def db_upgrade() -> None:
+    """Rewrite tournaments stored by former versions of the program in the current format
+
+    return: Nothing
+    """
+
+    upgraded = async_storage.run_sync(storage.upgrade_stored_tournaments)
+    print(f"{upgraded} tournament(s) upgraded")
+
+    return
+
+
+def db_validate() -> None:
+    """Check every stored player and tournament in one pass and print all the errors found
+
+    return: Nothing
+    """
+
+    # Files are read by the storage thread, after the writes already queued
+    serialized_players = async_storage.run_sync(storage.read_table, storage.PLAYERS_FILE, "table_players")
+    report = validation.validate_records(serialized_players, validation.validate_player)
+    labels = [f"{player.get('last_name')} {player.get('first_name')}" for player in serialized_players]
+    view.print_validation_report("players", report, labels)
+
+    summaries = async_storage.run_sync(storage.list_tournaments)
+    report = validation.validate_records(summaries, validation.validate_tournament)
+    labels = [summary.get('name') for summary in summaries]
+    view.print_validation_report("tournaments", report, labels)
+
+    return
+
+
+def process_db_commands(command: str) -> None:
+    """Execute commands related to the database itself
+
+    param command: the command
+    return: Nothing
+    """
+
+    # Report the queued storage operations first: each command then runs on the storage thread after them,
+    # so that the autosave never writes a file while one of these commands reads or rewrites it
+    async_storage.wait()
+
+    # Split the former single-file database
+    if command == "db_migrate":
+        db_migrate()
+
+    # Compress finished tournaments
+    elif command == "db_archive":
+        db_archive()
+
+    # Rewrite documents of former versions (e.g. dates) in the current format
+    elif command == "db_upgrade":
+        db_upgrade()
+
+    # Compute the player statistics again from scratch
+    elif command == "db_stats_rebuild":
+        db_stats_rebuild()
+
+    # Check all stored records and report every error at once
+    elif command == "db_validate":
+        db_validate()
+
+    return
+
+
 def process_tournament_commands(command: str) -> None:
     """Execute commands starting with tournament prefix
 
@@ -690,10 +1381,18 @@ def process_tournament_commands(command: str) -> None:
         tournament_desc()
     elif command == "tournament_time":
         tournament_time()
+    elif command == "tournament_pairing":
+        tournament_pairing()
     elif command == "tournament_print":
         tournament.print_tournament()
     elif command == "tournament_players":
         tournament_players()
+    elif command == "tournament_standings":
+        tournament_standings()
+    elif command == "tournament_position":
+        tournament_position()
+    elif command == "tournament_timing":
+        tournament.print_timing_stats()
     elif command == "tournament_start":
         tournament.start_tournament()
     elif command == "tournament_clear":
@@ -706,6 +1405,40 @@ def process_tournament_commands(command: str) -> None:
     return
 
 
+def arena_availability(available: bool) -> None:
+    """A player leaves the arena for a while or comes back
+
+    param available: False = leave, True = come back
+    return: Nothing
+    """
+
+    first_name = prompt_for_str("Player First Name")
+    last_name = prompt_for_str("Player Last Name")
+    tournament.set_arena_availability(first_name, last_name, available)
+
+    return
+
+
+def process_arena_commands(command: str) -> None:
+    """Execute commands starting with arena prefix
+
+    param command: the command
+    return: Nothing
+    """
+
+    # Results are entered with round_match_result: both players are paired again at once
+    if command == "arena_queue":
+        tournament.print_arena_queue()
+    elif command == "arena_leave":
+        arena_availability(False)
+    elif command == "arena_join":
+        arena_availability(True)
+    elif command == "arena_close":
+        tournament.close_arena()
+
+    return
+
+
 def process_round_commands(command: str) -> None:
     """Execute commands starting with round prefix
 
@@ -721,6 +1454,10 @@ def process_round_commands(command: str) -> None:
     elif command == "round_match_result":
         match_result()
 
+    # Set results for many matches at once (all or nothing) and save
+    elif command == "round_results":
+        match_results()
+
     # Finish this round and start next one
     elif command == "round_next":
         tournament.next_round()
@@ -761,10 +1498,30 @@ def execute_command(command: str) -> None:
     elif command.startswith("db_tournament"):
         process_db_tournament_commands(command)
 
+    # Execute commands related to the database itself
+    elif command.startswith("db"):
+        process_db_commands(command)
+
     # Execute commands related to tournaments in database
     elif command.startswith("round"):
         process_round_commands(command)
 
+    # Execute commands related to the arena of the tournament
+    elif command.startswith("arena"):
+        process_arena_commands(command)
+
+    # Execute commands related to the tournaments kept in memory
+    elif command.startswith("session"):
+        process_session_commands(command)
+
+    # Autosave settings
+    elif command == "autosave":
+        autosave_delay()
+
+    # Wait for the storage operations still running
+    elif command == "io_wait":
+        async_storage.wait()
+
     # Default: unknown command
     else:
         print("Unknown command")
@@ -0,0 +1,48 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Exceptions raised when a value is refused by the model
+They are never printed by the model itself: printing them is the job of the view
+"""
+
+
+class ValidationError(ValueError):
+    """A value refused by the model: which field, why, and in a batch which record (or match) it is about"""
+
+    def __init__(self, field: str, message: str, index: int = None):
+        super().__init__(message)
+        self.field = field
+        self.message = message
+        self.index = index
+
+
+class InvalidNameError(ValidationError):
+    """Empty, too long or badly formed name"""
+
+
+class InvalidDateError(ValidationError):
+    """Date that does not exist, out of range, or incoherent with another one"""
+
+
+class InvalidChoiceError(ValidationError):
+    """Value outside of a fixed list (sex, time control, pairing system...)"""
+
+
+class InvalidNumberError(ValidationError):
+    """Rating or score out of range"""
+
+
+class DuplicatePlayerError(ValidationError):
+    """Name or ID already used by another player of the list"""
+
+
+class ReferencedPlayerError(ValidationError):
+    """Player table refused: a stored tournament still references a player, or an ID would designate someone else"""
+
+
+class PlayerNotFoundError(ValidationError):
+    """No player of the list bears this name or ID"""
+
+
+class TournamentStateError(ValidationError):
+    """Operation not allowed at this stage of the tournament (not started yet, already started...)"""
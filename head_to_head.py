@@ -0,0 +1,176 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Persistent index of the games played between two players, over all stored tournaments
+Games are filed under the unordered pair of player IDs: "all games between A and B" is a dictionary lookup
+The index is updated when a tournament is saved or deleted and can be rebuilt from the stored tournaments
+"""
+
+import os
+import json
+import storage
+from round import decode_matches
+
+
+HEAD_TO_HEAD_FILE = os.path.join(storage.DB_FOLDER, "head_to_head.json")
+
+
+def pair_key(player_id_1: int, player_id_2: int) -> str:
+    """Key of an unordered pair of players
+
+    param player_id_1: ID of a player
+    param player_id_2: ID of the other player
+    return: "<lower ID>-<higher ID>"
+    """
+
+    return f"{min(player_id_1, player_id_2)}-{max(player_id_1, player_id_2)}"
+
+
+def tournament_games(serialized_tournament: dict) -> dict:
+    """Games of a tournament between players of the player table, by pair of players (pending games of the current
+    round included). Games involving other players are left aside: their ID is only valid in this tournament
+
+    param serialized_tournament: tournament document in the current schema
+    return: {pair key: list of games}
+    """
+
+    registered = storage.registered_players(serialized_tournament['players'])
+
+    games = {}
+    rounds = serialized_tournament['round_list'] + [serialized_tournament['current_round']]
+    for round_desc in rounds:
+        for player_id_1, player_id_2, score_1, score_2 in decode_matches(round_desc):
+            if player_id_1 not in registered or player_id_2 not in registered:
+                continue
+            games.setdefault(pair_key(player_id_1, player_id_2), []).append({
+                'tournament': serialized_tournament['name'],
+                'round': round_desc['round_name'],
+                'white': player_id_1,
+                'black': player_id_2,
+                'white_score': score_1,
+                'black_score': score_2
+            })
+
+    return games
+
+
+def read_index_file() -> dict:
+    """Read the index file for an update (private copy, to be called under its lock)
+
+    return: {'table_head_to_head': {...}, 'table_h2h_sources': {...}}
+    """
+
+    data = storage.read_json_for_update(HEAD_TO_HEAD_FILE)
+    if data is None:
+        return {'table_head_to_head': {}, 'table_h2h_sources': {}}
+
+    return data
+
+
+def apply_games(data: dict, tour_name: str, games: dict) -> None:
+    """Replace the games of a tournament in the index
+
+    param data: content of the index file, updated in place
+    param tour_name: name of the tournament
+    param games: new games by pair key (empty = remove the tournament)
+    return: Nothing
+    """
+
+    pairs = data['table_head_to_head']
+    sources = data['table_h2h_sources']
+    previous_keys = sources.pop(tour_name, [])
+
+    # Only the pairs of players who met in this tournament are touched
+    for key in set(previous_keys) | set(games):
+        pair_games = [game for game in pairs.get(key, []) if game['tournament'] != tour_name]
+        pair_games.extend(games.get(key, []))
+
+        if pair_games:
+            pairs[key] = pair_games
+        else:
+            pairs.pop(key, None)
+
+    if games:
+        sources[tour_name] = sorted(games)
+
+    return
+
+
+def write_index_file(data: dict) -> None:
+    """Write the index file (to be called under its lock)
+
+    param data: whole content
+    return: Nothing
+    """
+
+    storage.replace_file(HEAD_TO_HEAD_FILE, json.dumps(data).encode("utf-8"))
+
+    return
+
+
+def update_tournament_games(serialized_tournament: dict) -> None:
+    """Update the index with the games of a tournament that was just saved - one write
+
+    param serialized_tournament: tournament document in the current schema
+    return: Nothing
+    """
+
+    games = tournament_games(serialized_tournament)
+
+    with storage.write_lock(HEAD_TO_HEAD_FILE):
+        data = read_index_file()
+        apply_games(data, serialized_tournament['name'], games)
+        write_index_file(data)
+
+    return
+
+
+def remove_tournament_games(tour_name: str) -> None:
+    """Remove the games of a deleted tournament from the index
+
+    param tour_name: name of the tournament
+    return: Nothing
+    """
+
+    with storage.write_lock(HEAD_TO_HEAD_FILE):
+        data = read_index_file()
+        if tour_name in data['table_h2h_sources']:
+            apply_games(data, tour_name, {})
+            write_index_file(data)
+
+    return
+
+
+def rebuild_head_to_head() -> int:
+    """Rebuild the whole index from the stored tournaments (archived ones included)
+
+    return: number of tournaments read
+    """
+
+    data = {'table_head_to_head': {}, 'table_h2h_sources': {}}
+    count = 0
+    for summary in storage.list_tournaments():
+        serialized_tournament = storage.load_tournament(summary['name'])
+        if serialized_tournament:
+            apply_games(data, summary['name'], tournament_games(serialized_tournament))
+            count += 1
+
+    with storage.write_lock(HEAD_TO_HEAD_FILE):
+        write_index_file(data)
+
+    return count
+
+
+def get_games(player_id_1: int, player_id_2: int) -> list:
+    """All games between two players - dictionary lookup in the cached index
+
+    param player_id_1: ID of a player
+    param player_id_2: ID of the other player
+    return: list of games (read-only), empty if they never met
+    """
+
+    data = storage.read_json_cached(HEAD_TO_HEAD_FILE)
+    if not data:
+        return []
+
+    return data['table_head_to_head'].get(pair_key(player_id_1, player_id_2), [])
@@ -0,0 +1,126 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Class implementing a leaderboard: players kept sorted by score, then rating, as scores change
+"""
+
+import bisect
+
+
+class Leaderboard:
+
+    def __init__(self):
+        # Sorted keys (-score, rating, player_id): best player first
+        self.keys = []
+        self.key_by_id = {}
+
+    @staticmethod
+    def make_key(player_id: int, score: int, rating: int) -> tuple:
+        """Build the sort key of a player (higher score first, then better rating)
+
+        param player_id: integer ID, breaks remaining ties
+        param score: score in half-points
+        param rating: rank (1 = best)
+        return: tuple
+        """
+
+        return -score, rating, player_id
+
+    def clear(self) -> None:
+        """Remove all players
+
+        return: Nothing
+        """
+
+        self.keys.clear()
+        self.key_by_id.clear()
+
+        return
+
+    def add(self, player_id: int, score: int, rating: int) -> None:
+        """Insert a player at his position - O(log n) search
+
+        param player_id: integer ID
+        param score: score in half-points
+        param rating: rank
+        return: Nothing
+        """
+
+        key = self.make_key(player_id, score, rating)
+        bisect.insort(self.keys, key)
+        self.key_by_id[player_id] = key
+
+        return
+
+    def remove(self, player_id: int) -> None:
+        """Remove a player (if he is in the leaderboard)
+
+        param player_id: integer ID
+        return: Nothing
+        """
+
+        key = self.key_by_id.pop(player_id, None)
+        if key is None:
+            return
+
+        del self.keys[bisect.bisect_left(self.keys, key)]
+
+        return
+
+    def update(self, player_id: int, score: int, rating: int) -> None:
+        """Move a player after a change of score or rating
+
+        param player_id: integer ID
+        param score: new score in half-points
+        param rating: new rank
+        return: Nothing
+        """
+
+        # Nothing to move if the key did not change
+        if self.key_by_id.get(player_id) == self.make_key(player_id, score, rating):
+            return
+
+        self.remove(player_id)
+        self.add(player_id, score, rating)
+
+        return
+
+    def get_size(self) -> int:
+        """Number of players in the leaderboard
+
+        return: integer value
+        """
+
+        return len(self.keys)
+
+    def top(self, k: int) -> list:
+        """IDs of the k best players, best first
+
+        param k: number of players
+        return: list of IDs
+        """
+
+        return [key[2] for key in self.keys[:k]]
+
+    def page(self, offset: int, size: int) -> list:
+        """IDs of the players between two positions
+
+        param offset: index of the first player (0 = leader)
+        param size: number of players
+        return: list of IDs
+        """
+
+        return [key[2] for key in self.keys[offset:offset + size]]
+
+    def position_of(self, player_id: int) -> int:
+        """Current position of a player - O(log n)
+
+        param player_id: integer ID
+        return: 1 for the leader, 0 if the player is unknown
+        """
+
+        key = self.key_by_id.get(player_id)
+        if key is None:
+            return 0
+
+        return bisect.bisect_left(self.keys, key) + 1
@@ -5,13 +5,46 @@ Class implementing a player
 """
 
 import re
-import datetime
+import sys
+import functools
+import unicodedata
 import view
+import validation
+
+
+# Name filters, compiled once: anything but letters (any alphabet, accents kept) and spaces, then runs of spaces
+NAME_FORBIDDEN_CHARACTERS = re.compile(r'[^\w\s]|[\d_]')
+NAME_SPACES = re.compile(r'\s+')
+
+# Number of distinct raw names remembered by the normalization cache
+NAME_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
+def normalize_name(name: str) -> str:
+    """Formats a given string as a name (cached: a reload formats the same names again and again)
+
+    param name: Input name
+    return: Formatted name, interned so that all players bearing it share the same string
+    """
+
+    # Compose accents typed as separate marks ("e" + "´" = "é"), they would be filtered out otherwise
+    filtered_name = unicodedata.normalize('NFC', name)
+
+    # First filter pass: eliminate forbidden characters (including hyphens and digits) and excessive spaces
+    filtered_name = NAME_FORBIDDEN_CHARACTERS.sub('', filtered_name)
+    filtered_name = NAME_SPACES.sub(' ', filtered_name).strip()
+
+    # Enforce capital letters at beginning of "words" and remove them elsewhere
+    filtered_name = filtered_name.title()
+
+    return sys.intern(filtered_name)
 
 
 class Player:
 
     def __init__(self):
+        self.player_id = 0
         self.first_name = ""
         self.last_name = ""
         self.birth_day = 1
@@ -60,6 +93,7 @@ class Player:
 
         # Translate everything in a dictionary
         serialized_player = {
+            'player_id': self.player_id,
             'first_name': self.first_name,
             'last_name': self.last_name,
             'birth_day': self.birth_day,
@@ -67,7 +101,7 @@ class Player:
             'birth_year': self.birth_year,
             'sex': self.sex,
             'rating': self.rating,
-            'tournament_score': self.tournament_score
+            'half_points': self.tournament_score
         }
 
         return serialized_player
@@ -80,51 +114,43 @@ class Player:
         return: Formatted name
         """
 
-        # First filter pass: eliminate forbidden characters (including hyphens) and excessive spaces
-        pattern = re.compile(r'[^a-zA-Z\s]')
-        filtered_name = re.sub(pattern, '', name)
-        pattern = re.compile(r'\s+')
-        filtered_name = re.sub(pattern, ' ', filtered_name).strip()
-
-        # Enforce capital letters at beginning of "words" and remove them elsewhere
-        filtered_name = filtered_name.lower()
-        filtered_name = filtered_name.title()
+        return normalize_name(name)
 
-        return filtered_name
-
-    def set_first_name(self, name: str) -> bool:
+    def set_first_name(self, name: str) -> None:
         """Sets player first name (and filters it if not properly formatted)
 
         param self: This player
         param name: string containing the name: contains letters and hyphens
-        return: True if name could be added (len < 25 or empty)
+        return: Nothing, raises InvalidNameError if the length is invalid (empty or > 25)
         """
 
         # Check size consistency
-        if len(name) < 1 or len(name) > 25:
-            print("First name length invalid")
-            return False
+        validation.check_person_name("first_name", name)
 
         # Everything OK
         self.first_name = self.format_name(name)
-        return True
 
-    def set_last_name(self, name: str) -> bool:
+    def set_last_name(self, name: str) -> None:
         """Sets player last name (and filters it if not properly formatted)
 
         param self: This player
         param name: string containing the name: contains letters and hyphens
-        return: True if name could be added (len < 25 or empty)
+        return: Nothing, raises InvalidNameError if the length is invalid (empty or > 25)
         """
 
         # Check size consistency
-        if len(name) < 1 or len(name) > 25:
-            print("Last name length invalid")
-            return False
+        validation.check_person_name("last_name", name)
 
         # Everything OK
         self.last_name = self.format_name(name)
-        return True
+
+    def get_player_id(self) -> int:
+        """Retrieve the integer ID of this player (0 = not assigned yet)
+
+        return: integer ID
+        """
+
+        return self.player_id
 
     def get_first_name(self) -> str:
         """Retrieve first name for this player
@@ -142,99 +168,73 @@ class Player:
 
         return self.last_name
 
-    def set_birthday(self, day: int, year: int, mon: int) -> bool:
+    def set_birthday(self, day: int, year: int, mon: int) -> None:
         """Sets player birthday with basic consistency check
 
         param self: This player
         param day: 1-29, 30 or 31 depending on the month
         param year: between 1900 and 2015 to be reasonable, could be modified
         param mon: 1-12 of course
-        return: True if valid birthday
+        return: Nothing, raises InvalidDateError if the birthday is invalid
         """
 
         # Check date validity
-        if year < 1900 or year > 2015:
-            print("Invalid year")
-            return False
-
-        try:
-            new_date = datetime.datetime(year=year, month=mon, day=day)
-        except ValueError:
-            print("Invalid date")
-            return False
+        new_date = validation.check_birthday(day, year, mon)
 
         # Everything OK
         self.birth_day = new_date.day
         self.birth_mon = new_date.month
         self.birth_year = new_date.year
 
-        return True
-
-    def set_sex(self, sex: str) -> bool:
+    def set_sex(self, sex: str) -> None:
         """Sets player sex
 
         param self: This player
         param sex: "M" or "F"
-        return: True if valid sex
+        return: Nothing, raises InvalidChoiceError if the sex is invalid
         """
 
-        if sex != "M" and sex != "F":
-            print("Invalid sex")
-            return False
+        validation.check_sex(sex)
 
         self.sex = sex
-        return True
 
-    def set_rating(self, rating: int) -> bool:
+    def set_rating(self, rating: int) -> None:
         """Sets player rating
 
         param self: This player
         param rating: positive number
-        return: True if valid rating
+        return: Nothing, raises InvalidNumberError if the rating is invalid
         """
 
-        if rating < 1:
-            print("Invalid rating")
-            return False
+        validation.check_rating(rating)
 
         self.rating = rating
-        return True
 
-    def set_tournament_score(self, tournament_score: float) -> bool:
+    def set_tournament_score(self, tournament_score: int) -> None:
         """Set player score for a tournament
 
         param self: This player
-        param tournament_score: float value, > 0 and multiple of 0.5
-        return: True if valid score
+        param tournament_score: integer number of half-points, >= 0
+        return: Nothing, raises InvalidNumberError if the score is invalid
         """
 
-        # Score must be positive
-        if tournament_score < 0.0:
-            return False
-
-        # And a multiple of 0.5
-        if not (tournament_score*2.0).is_integer():
-            return False
+        # Score must be a positive number of half-points
+        validation.check_score(tournament_score)
 
         # It's OK, fill the field
         self.tournament_score = tournament_score
 
-        return True
-
-    def increase_tournament_score(self, points: float) -> bool:
-        """Update player score during a tournament (+0.5, +1)
+    def increase_tournament_score(self, points: int) -> None:
+        """Update player score during a tournament (+1/2, +1)
 
         param self: This player
-        param points: 0, 1/2 or 1 to add
-        return: True if valid score
+        param points: 0, 1 or 2 half-points to add
+        return: Nothing, raises InvalidNumberError if the points are invalid
         """
 
-        if points != 0 and points != 0.5 and points != 1:
-            print("Invalid score")
-            return False
+        validation.check_points(points)
 
         self.tournament_score += points
-        return True
 
     def get_rating(self) -> int:
         """Retrieve user rating - necessary for tournament organization, among others
@@ -247,7 +247,7 @@ class Player:
     def get_tournament_score(self) -> int:
         """Retrieve user tournament score - necessary for tournament organization, among others
 
-        return: True if valid birthday
+        return: score in half-points
         """
 
         return self.tournament_score
@@ -5,15 +5,67 @@ Class implementing a player list (8 for a tournament, but undefined number in ge
 """
 
 from player import Player
-from tinydb import TinyDB
+from leaderboard import Leaderboard
+import view
 import copy
+import itertools
+import threading
+from errors import ValidationError, DuplicatePlayerError, InvalidNumberError, PlayerNotFoundError
+from rwlock import ReadWriteLock, reader, writer
 
 
 class PlayerList:
 
     def __init__(self):
         self.players = []
+        self.players_by_id = {}
+        self.next_id = 1
+        self.leaderboard = Leaderboard()
+
+        # IDs of the players read from the player table, and of those renamed since (their new name replaces
+        # the stored one, any other name under a stored ID is refused when saving)
+        self.table_ids = set()
+        self.renamed_ids = set()
+
+        # Unsaved changes, cached serialized form (None = must be rebuilt),
+        # and who to tell when a change happens (autosave, owning tournament...)
+        self.dirty = False
+        self.serialized = None
+        self.on_change = None
+
+        # Many threads may read the list at once (standings, serialization), one at a time modifies it
+        # Helpers only called from locked methods (register_id, rebuild_leaderboard) do not lock again
+        # Readers filling the serialized cache at the same time take turns on cache_lock
+        self.lock = ReadWriteLock()
+        self.cache_lock = threading.Lock()
+
+    def mark_dirty(self) -> None:
+        """Record a change that was not saved yet, drop the cached serialized form and notify the listener
+
+        return: Nothing
+        """
+
+        self.dirty = True
+        self.serialized = None
+        if self.on_change is not None:
+            self.on_change()
+
+        return
+
+    def mark_renamed(self, player_id: int) -> None:
+        """Record the new name of a player read from the player table (see storage.save_players), then the change
+
+        param player_id: ID of the renamed player
+        return: Nothing
+        """
+
+        if player_id in self.table_ids:
+            self.renamed_ids.add(player_id)
+        self.mark_dirty()
+
+        return
 
+    @reader
     def get_number_of_players(self) -> int:
         """Returns the number of players in the list
 
@@ -22,6 +74,7 @@ class PlayerList:
 
         return len(self.players)
 
+    @writer
     def clean_list(self) -> bool:
         """Delete all players in the list
 
@@ -31,14 +84,22 @@ class PlayerList:
         # Sweep through the list
         while self.get_number_of_players() != 0:
             del self.players[0]
+        self.players_by_id.clear()
+        self.leaderboard.clear()
+        self.table_ids.clear()
+        self.renamed_ids.clear()
+        self.mark_dirty()
 
         return True
 
-    def print_list(self, sort_1: int, sort_2: int) -> bool:
-        """Print all players in the list in a readable format
+    @writer
+    def print_list(self, sort_1: int, sort_2: int, offset: int = 0, size: int = 0) -> bool:
+        """Print a page of players in the list as a table
 
         param sort_1: print in : 1 = alphabetical order / 2 = rank order
         param sort_2: reorder list before leaving (same codes as sort_1)
+        param offset: index of the first player to print
+        param size: number of players on the page, 0 = all of them
         return: True in any case
         """
 
@@ -48,9 +109,11 @@ class PlayerList:
         else:
             self.sort_list()
 
-        # Print list elements one by one
-        for player in self.players:
-            player.print_player()
+        # Only the players of this page are serialized (one more to know whether a next page exists)
+        stop = offset + size + 1 if size else None
+        page = [player.serialize_player() for player in itertools.islice(self.players, offset, stop)]
+        more = bool(size) and len(page) > size
+        view.print_players_page(page[:size] if size else page, offset, more)
 
         # Sort before leaving
         if sort_2 == 1:
@@ -60,6 +123,7 @@ class PlayerList:
 
         return True
 
+    @writer
     def reset_scores(self) -> bool:
         """Initialize all player scores to 0
 
@@ -67,66 +131,93 @@ class PlayerList:
         """
         for player in self.players:
             player.tournament_score = 0
+        self.rebuild_leaderboard()
+        self.mark_dirty()
 
         return True
 
-    def save_list(self) -> bool:
-        """Save players in a database
+    def rebuild_leaderboard(self) -> None:
+        """Fill the leaderboard again after a change affecting many players
 
-        param db_name: name for output file
-        param table_name: name for the table where data are stored
-        return: True in any case in this version
+        return: Nothing
         """
 
-        # Open database and reset the table of tables
-        db = TinyDB("ChessDB.json")
-        table = db.table("table_players")
-        table.truncate()
-
-        # Serialize and add players one by one
+        self.leaderboard.clear()
         for player in self.players:
-            serialized_player = player.serialize_player()
-            table.insert(serialized_player)
+            self.leaderboard.add(player.get_player_id(), player.get_tournament_score(), player.get_rating())
 
-        # Done
-        db.close()
-        return True
+        return
 
-    def load_list(self, insertion_sort: bool) -> bool:
-        """Load players from database
+    @writer
+    def snapshot_for_save(self, only_if_dirty: bool = False) -> tuple:
+        """Take the serialized list to be written (never modified afterwards): from now on the list counts as saved
+        The dirty flag is tested and cleared under the write lock: two savers (REPL, autosave) never take one change
 
-        param db_name: name for output file
-        param table_name: name for the table where data are stored
-        param insertion_sort: do we sort players by alphabetical order?
-        return: True if no I/O exception was caught
+        param only_if_dirty: True = nothing to take if the list did not change since the last snapshot
+        return: (list of dictionaries, next free ID, IDs of the renamed players), None if only_if_dirty and nothing
+                changed
         """
 
-        # Open database and test I/O error (or empty database)
-        db = TinyDB("ChessDB.json")
-        serialized_players = db.table("table_players")
-        if not serialized_players:
-            print("Could not load players in database")
-            return False
+        if only_if_dirty and not self.dirty:
+            return None
+
+        self.dirty = False
+
+        return self.serialize_list(), self.next_id, sorted(self.renamed_ids)
+
+    @reader
+    def serialize_list(self) -> list:
+        """Serialize players one by one, in standings order (so that sorting the list does not change the result)
+        The result is cached until a player changes, do not modify it
+
+        return: list of dictionaries
+        """
+
+        with self.cache_lock:
+            if self.serialized is None:
+                self.serialized = [self.players_by_id[player_id].serialize_player()
+                                   for player_id in self.leaderboard.top(self.get_number_of_players())]
+
+            return self.serialized
 
-        # Start with a new clean list
+    @writer
+    def fill_list(self, serialized_players: list, next_id: int = 1, insertion_sort: bool = False) -> dict:
+        """Replace the whole list by players read from the database
+        Invalid players are left aside and reported all at once, nothing is printed
+
+        param serialized_players: content of the player table (not empty)
+        param next_id: next free ID stored with the table (IDs of deleted players are never given again)
+        param insertion_sort: do we sort players by alphabetical order?
+        return: error report {index of the player in the table: list of ValidationError}, empty if all were added
+        """
+
+        # Start with a new clean list, new players continue after every ID the table ever gave
         self.clean_list()
+        self.next_id = max(self.next_id, next_id)
 
         # Convert back serialized players and add them
-        for player in serialized_players:
-            self.add_player(first_name=player['first_name'],
-                            last_name=player['last_name'],
-                            birth_day=player['birth_day'],
-                            birth_mon=player['birth_mon'],
-                            birth_year=player['birth_year'],
-                            sex=player['sex'],
-                            rating=player['rating'],
-                            tournament_score=player['tournament_score'],
-                            insertion_sort=insertion_sort)
-
-        # Done
-        db.close()
-        return True
-
+        report = {}
+        for i, player in enumerate(serialized_players):
+            try:
+                self.add_player(first_name=player['first_name'],
+                                last_name=player['last_name'],
+                                birth_day=player['birth_day'],
+                                birth_mon=player['birth_mon'],
+                                birth_year=player['birth_year'],
+                                sex=player['sex'],
+                                rating=player['rating'],
+                                tournament_score=player['half_points'],
+                                insertion_sort=insertion_sort,
+                                player_id=player.get('player_id', 0))
+            except ValidationError as error:
+                report[i] = [error]
+        self.table_ids = set(self.players_by_id)
+
+        # Done, the list matches the database
+        self.dirty = False
+        return report
+
+    @reader
     def find_player_by_names(self, first_name: str, last_name: str) -> int:
         """Returns the index of a player corresponding
 
@@ -142,6 +233,40 @@ class PlayerList:
 
         return -1
 
+    @reader
+    def find_player_by_id(self, player_id: int) -> Player:
+        """Returns the player bearing a given ID (the object itself, not a copy)
+
+        param player_id: integer ID
+        return: Player or None if not found
+        """
+
+        return self.players_by_id.get(player_id)
+
+    @reader
+    def get_player_id(self, index: int) -> int:
+        """Retrieve the ID of a player from the list (by index)
+
+        param index: index
+        return: integer ID
+        """
+
+        return self.players[index].get_player_id()
+
+    @reader
+    def names_by_id(self) -> dict:
+        """Build a table giving the complete name of each player from his ID (for printing purposes)
+
+        return: Dictionary ID -> "first_name last_name"
+        """
+
+        names = {}
+        for player in self.players:
+            names[player.get_player_id()] = player.get_first_name() + " " + player.get_last_name()
+
+        return names
+
+    @writer
     def update_ratings(self, upper_rank: int, lower_rank: int, increase: bool) -> bool:
         """Increments or decrements ranks in player list to "patch" it when a player is removed/modified
 
@@ -161,11 +286,15 @@ class PlayerList:
                     rank -= 1
                 player.set_rating(rating=rank)
 
+        # Positions may have changed for many players
+        self.rebuild_leaderboard()
+
         return True
 
+    @writer
     def add_player(self, first_name: str, last_name: str, birth_day: int, birth_mon: int,
-                   birth_year: int, sex: str, rating: int, tournament_score: float,
-                   insertion_sort: bool) -> bool:
+                   birth_year: int, sex: str, rating: int, tournament_score: int,
+                   insertion_sort: bool, player_id: int = 0) -> bool:
         """Create a new player and add it in the list
 
         param first_name: < 25 letters, non alpha characters will be filtered
@@ -175,24 +304,28 @@ class PlayerList:
         param birth_year: no comment
         param sex: "M" or "F"
         param rating: rank (integer)
-        param tournament_score: default=0, current score if a tournament is ongoing
+        param tournament_score: default=0, current score in half-points if a tournament is ongoing
         param insertion_sort: True = respect alphabetical order while inserting
-        return: false if any inconsistency is found in parameters
+        param player_id: stable integer ID, 0 = assign the next free one
+        return: True once added, raises a ValidationError if any inconsistency is found in parameters
         """
 
-        new_player = Player()
+        # IDs must stay unique in the list
+        if player_id in self.players_by_id:
+            raise DuplicatePlayerError("player_id", "Player ID already used")
 
-        if not new_player.set_first_name(first_name) \
-                or not new_player.set_last_name(last_name) \
-                or not new_player.set_birthday(birth_day, birth_year, birth_mon) \
-                or not new_player.set_sex(sex) \
-                or not new_player.set_tournament_score(tournament_score) \
-                or not new_player.set_rating(rating):
-            return False
+        new_player = Player()
+        new_player.set_first_name(first_name)
+        new_player.set_last_name(last_name)
+        new_player.set_birthday(birth_day, birth_year, birth_mon)
+        new_player.set_sex(sex)
+        new_player.set_tournament_score(tournament_score)
+        new_player.set_rating(rating)
 
         # First player in the list, easy
         if not self.players:
             self.players.append(new_player)
+            self.register_id(new_player, player_id)
             return True
 
         # Else, insert name and maintain alphabetical order (insertion sort)
@@ -203,8 +336,7 @@ class PlayerList:
 
             # Detect whether this name already exists
             if player.complete_name() == complete_name:
-                print("Player name already used")
-                return False
+                raise DuplicatePlayerError("name", "Player name already used")
 
             # Detect whether we reach the first string < in alphabetical order: insertion position
             if player.complete_name() > complete_name and insertion_sort:
@@ -219,66 +351,96 @@ class PlayerList:
                 self.players.append(new_player)
                 break
 
+        self.register_id(new_player, player_id)
         return True
 
+    def register_id(self, player: Player, player_id: int) -> None:
+        """Give its ID to a player that was just added to the list
+
+        param player: the new player
+        param player_id: ID to use, 0 = assign the next free one
+        return: Nothing
+        """
+
+        if player_id == 0:
+            player_id = self.next_id
+
+        player.player_id = player_id
+        self.players_by_id[player_id] = player
+        self.next_id = max(self.next_id, player_id + 1)
+        self.leaderboard.add(player_id, player.get_tournament_score(), player.get_rating())
+        self.mark_dirty()
+
+        return
+
+    @writer
     def remove_player(self, first_name: str, last_name: str, patch_ranks: bool) -> bool:
         """Remove a player from the list (if he exists...)
 
         param first_name: first name...
         param last_name: last name...
         param patch_ranks: adjust the rank of the other players after deletion?
-        return: True if he was found and removed
+        return: True once removed, raises PlayerNotFoundError if the user is unknown
         """
 
         # Does this user exist in our list?
         index = self.find_player_by_names(first_name, last_name)
         if index == -1:
-            print("User not found")
-            return False
+            raise PlayerNotFoundError("player", "User not found")
 
         # Found it, delete and increase rank of all players who were behind him (if required)
         rank = self.players[index].get_rating()
-        if patch_ranks:
-            self.update_ratings(upper_rank=self.get_number_of_players(), lower_rank=rank, increase=False)
+        player_id = self.players[index].get_player_id()
+        del self.players_by_id[player_id]
         del self.players[index]
+        self.leaderboard.remove(player_id)
+        if patch_ranks:
+            self.update_ratings(upper_rank=self.get_number_of_players() + 1, lower_rank=rank, increase=False)
+        self.mark_dirty()
 
         return True
 
-    def update_player_score(self, first_name: str, last_name: str, points: float) -> bool:
+    @writer
+    def update_player_score(self, player_id: int, points: int) -> bool:
         """Update a player score
 
-        param first_name: first name...
-        param last_name: last name...
-        param points: 0, 0.5 or 1 to be added to the total score
-        return: True if no mistake was encountered (invalid score or unknown user)
+        param player_id: integer ID of the player
+        param points: 0, 1 or 2 half-points to be added to the total score
+        return: True, raises PlayerNotFoundError if the user is unknown, InvalidNumberError if the points are invalid
         """
 
         # Find user
-        index = self.find_player_by_names(first_name, last_name)
-        if index == -1:
-            print("User not found")
-            return False
+        player = self.find_player_by_id(player_id)
+        if player is None:
+            raise PlayerNotFoundError("player", "User not found")
 
-        # Update score
-        return self.players[index].increase_tournament_score(points=points)
+        # Update score, then the position of the player
+        player.increase_tournament_score(points=points)
+        self.leaderboard.update(player_id, player.get_tournament_score(), player.get_rating())
+        self.mark_dirty()
 
+        return True
+
+    @writer
     def modify_player_sex(self, first_name: str, last_name: str, sex: str) -> bool:
         """Update a player's sex
 
         param first_name: first name...
         param last_name: last name...
         param sex: "M" or "F"
-        return: True if no mistake was encountered
+        return: True, raises PlayerNotFoundError if the user is unknown, a ValidationError if the new value is invalid
         """
 
         # Find user
         index = self.find_player_by_names(first_name, last_name)
         if index == -1:
-            print("User not found - cannot change player sex")
-            return False
+            raise PlayerNotFoundError("player", "User not found - cannot change player sex")
 
-        return self.players[index].set_sex(sex)
+        self.players[index].set_sex(sex)
+        self.mark_dirty()
+        return True
 
+    @writer
     def modify_player_birthday(self, first_name: str, last_name: str, day: int, year: int, mon: int) -> bool:
         """Update a player's birthday
 
@@ -287,69 +449,74 @@ class PlayerList:
         param day: valid month day
         param year: year
         param mon: 1-12
-        return: True if no mistake was encountered
+        return: True, raises PlayerNotFoundError if the user is unknown, a ValidationError if the new value is invalid
         """
 
         # Find user
         index = self.find_player_by_names(first_name, last_name)
         if index == -1:
-            print("User not found - cannot change player birthday")
-            return False
+            raise PlayerNotFoundError("player", "User not found - cannot change player birthday")
 
-        return self.players[index].set_birthday(day, year, mon)
+        self.players[index].set_birthday(day, year, mon)
+        self.mark_dirty()
+        return True
 
+    @writer
     def modify_player_first_name(self, first_name: str, last_name: str, new_name: str) -> bool:
         """Update a player's first name
 
         param first_name: first name...
         param last_name: last name...
         param new_name: new name...
-        return: True if no mistake was encountered
+        return: True, raises PlayerNotFoundError if the user is unknown, a ValidationError if the new value is invalid
         """
 
         # Find user
         index = self.find_player_by_names(first_name, last_name)
         if index == -1:
-            print("User not found - cannot change player first name")
-            return False
+            raise PlayerNotFoundError("player", "User not found - cannot change player first name")
 
-        return self.players[index].set_first_name(new_name)
+        self.players[index].set_first_name(new_name)
+        self.mark_renamed(self.players[index].get_player_id())
+        return True
 
+    @writer
     def modify_player_last_name(self, first_name: str, last_name: str, new_name: str) -> bool:
         """Update a player's last name
 
         param first_name: first name...
         param last_name: last name...
         param new_name: new name...
-        return: True if no mistake was encountered
+        return: True, raises PlayerNotFoundError if the user is unknown, a ValidationError if the new value is invalid
         """
 
         # Find user
         index = self.find_player_by_names(first_name, last_name)
         if index == -1:
-            print("User not found - cannot change player last name")
-            return False
+            raise PlayerNotFoundError("player", "User not found - cannot change player last name")
 
-        return self.players[index].set_last_name(new_name)
+        self.players[index].set_last_name(new_name)
+        self.mark_renamed(self.players[index].get_player_id())
+        return True
 
+    @writer
     def modify_player_rating(self, first_name: str, last_name: str, new_rating: int) -> bool:
         """Update a player rating (if he exists...) and correct all the ratings accordingly
 
         param first_name: first name...
         param last_name: last name...
         param rating: new value, must be > 0 and < number of players, of course
-        return: True if no mistake was encountered
+        return: True, raises PlayerNotFoundError if the user is unknown, InvalidNumberError if the rating is out of
+                range
         """
 
         if new_rating < 1 or new_rating > self.get_number_of_players():
-            print("Invalid rating, must be > 0 and < number of players")
-            return False
+            raise InvalidNumberError("rating", "Invalid rating, must be > 0 and < number of players")
 
         # Find user
         index = self.find_player_by_names(first_name, last_name)
         if index == -1:
-            print("User not found - cannot change player rating")
-            return False
+            raise PlayerNotFoundError("player", "User not found - cannot change player rating")
 
         # Retrieve the current rating for the player to be modified
         current_rating = self.players[index].get_rating()
@@ -367,82 +534,69 @@ class PlayerList:
             self.update_ratings(upper_rank=current_rating, lower_rank=new_rating, increase=True)
 
         # Last operation: modify the player itself
-        self.players[index].set_rating(rating=new_rating)
+        player = self.players[index]
+        player.set_rating(rating=new_rating)
+        self.leaderboard.update(player.get_player_id(), player.get_tournament_score(), new_rating)
+        self.mark_dirty()
 
         return True
 
+    @writer
     def sort_list(self) -> bool:
         """Sort player list by tournament_score, and rating when scores are equal
 
         return: Always True
         """
 
-        """This will point the last unsorted player (+1)
-            The best player found among this part of the list will be moved to the end.
-            Thus current_pos will be decreased until all players have been moved to eof list.
-            And we finally get best player in position 0, and so on...
-        """
-        current_pos = self.get_number_of_players()
-
-        # Main loop - leave it when the remaining players are reduced to nothing
-        while current_pos > 0:
-            # Init "best player" stats with the first one, for instance
-            best_rank = self.players[0].get_rating()
-            best_score = self.players[0].get_tournament_score()
-            best_index = 0
+        # The leaderboard is always sorted: just follow its order - O(n)
+        self.players[:] = [self.players_by_id[player_id] for player_id in self.leaderboard.top(len(self.players))]
 
-            # Explore all remaining players
-            for i in range(current_pos):
-                player_rank = self.players[i].get_rating()
-                player_score = self.players[i].get_tournament_score()
+        return True
 
-                # Better score found, or same score but better rating -> update our "best player"
-                if player_score > best_score or (player_score == best_score and player_rank < best_rank):
-                    best_rank = player_rank
-                    best_score = player_score
-                    best_index = i
+    @writer
+    def sort_list_alpha(self) -> bool:
+        """Sort player list in alphabetical order
 
-            # Now we know who is the best -> move it to the end
-            tmp_player = self.players.pop(best_index)
-            self.players.append(tmp_player)
+        return: Always True
+        """
 
-            # Loop goes on with one less player
-            current_pos -= 1
+        self.players.sort(key=lambda player: player.complete_name())
 
         return True
 
-    def sort_list_alpha(self) -> bool:
-        """Sort player list in alphabetical order
+    @reader
+    def get_position(self, player_id: int) -> int:
+        """Current position of a player in the standings - O(log n)
 
-        return: Always True
+        param player_id: integer ID
+        return: 1 for the leader, 0 if the player is unknown
         """
 
-        # Same algorithm as in the previous method, but simpler
-        current_pos = self.get_number_of_players()
+        return self.leaderboard.position_of(player_id)
 
-        # Main loop
-        while current_pos > 0:
-            best_index = 0
-            lowest_complete_name = self.players[0].complete_name()
+    @reader
+    def print_standings(self, offset: int, size: int) -> None:
+        """Print a page of the standings without sorting the list
 
-            # Explore all remaining players
-            for i in range(current_pos):
-                complete_name = self.players[i].complete_name()
+        param offset: index of the first player (0 = leader)
+        param size: number of players on the page, 0 = all of them
+        return: Nothing
+        """
 
-                # "Lower" name found, update
-                if complete_name < lowest_complete_name:
-                    lowest_complete_name = complete_name
-                    best_index = i
+        if not size:
+            size = self.leaderboard.get_size()
 
-            # Now we know who is the best -> move it to the end
-            tmp_player = self.players.pop(best_index)
-            self.players.append(tmp_player)
+        rows = []
+        for i, player_id in enumerate(self.leaderboard.page(offset, size)):
+            player = self.players_by_id[player_id]
+            rows.append((offset + i + 1, player.get_first_name() + " " + player.get_last_name(),
+                         player.get_tournament_score(), player.get_rating()))
 
-            # Loop goes on with one less player
-            current_pos -= 1
+        view.print_standings(rows, offset, offset + size < self.leaderboard.get_size())
 
-        return True
+        return
 
+    @reader
     def get_player(self, index: int) -> Player:
         """Retrieve a copy of a player object from the list (by index)
 
@@ -0,0 +1,223 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Materialized statistics of each player over all stored tournaments, by player ID:
+games, wins, draws, losses and score, for each tournament and for each time control
+The table is updated when a tournament is saved and can be rebuilt from the stored tournaments
+"""
+
+import os
+import json
+import storage
+from round import decode_matches
+
+
+PLAYER_STATS_FILE = os.path.join(storage.DB_FOLDER, "player_stats.json")
+
+
+def new_record() -> dict:
+    """Empty record of games
+
+    return: Dictionary
+    """
+
+    return {'games': 0, 'wins': 0, 'draws': 0, 'losses': 0, 'half_points': 0}
+
+
+def add_game(record: dict, half_points: int) -> None:
+    """Count a finished game in a record
+
+    param record: record to update in place
+    param half_points: score of the player in this game (0, 1 or 2)
+    return: Nothing
+    """
+
+    record['games'] += 1
+    record['half_points'] += half_points
+    if half_points == 2:
+        record['wins'] += 1
+    elif half_points == 1:
+        record['draws'] += 1
+    else:
+        record['losses'] += 1
+
+    return
+
+
+def tournament_records(serialized_tournament: dict) -> dict:
+    """Games of each player of the player table in a tournament (closed rounds only)
+    Other players are left aside: their ID is only valid in this tournament
+
+    param serialized_tournament: tournament document in the current schema
+    return: {player ID: {'first_name', 'last_name', 'time_control', 'games', 'wins', ...}}
+    """
+
+    records = {}
+    for player_id, player in storage.registered_players(serialized_tournament['players']).items():
+        record = new_record()
+        record['first_name'] = player['first_name']
+        record['last_name'] = player['last_name']
+        record['time_control'] = serialized_tournament['time_control']
+        records[player_id] = record
+
+    # The last round of a finished tournament stays the current round
+    rounds = list(serialized_tournament['round_list'])
+    if serialized_tournament['current_round']['round_finished']:
+        rounds.append(serialized_tournament['current_round'])
+
+    for round_desc in rounds:
+        for player_id_1, player_id_2, score_1, score_2 in decode_matches(round_desc):
+            if score_1 + score_2 == 0:
+                continue
+            if player_id_1 in records:
+                add_game(records[player_id_1], score_1)
+            if player_id_2 in records:
+                add_game(records[player_id_2], score_2)
+
+    return records
+
+
+def sum_by_time_control(tournaments: dict) -> dict:
+    """Totals of the games of a player, by time control
+
+    param tournaments: records of the player, by tournament name
+    return: {time control: record}
+    """
+
+    totals = {}
+    for record in tournaments.values():
+        total = totals.setdefault(record['time_control'], new_record())
+        for field in total:
+            total[field] += record[field]
+
+    return totals
+
+
+def read_stats_file() -> dict:
+    """Read the statistics file for an update (private copy, to be called under its lock)
+
+    return: {'table_player_stats': {...}, 'table_stats_sources': {...}}
+    """
+
+    data = storage.read_json_for_update(PLAYER_STATS_FILE)
+    if data is None:
+        return {'table_player_stats': {}, 'table_stats_sources': {}}
+
+    return data
+
+
+def apply_records(data: dict, tour_name: str, records: dict) -> None:
+    """Replace the contribution of a tournament to the statistics of its players
+
+    param data: content of the statistics file, updated in place
+    param tour_name: name of the tournament
+    param records: new records by player ID (empty = remove the tournament)
+    return: Nothing
+    """
+
+    # JSON keys are strings, as TinyDB document IDs
+    stats_table = data['table_player_stats']
+    sources = data['table_stats_sources']
+    previous_ids = sources.pop(tour_name, [])
+
+    # Only the players of this tournament are touched
+    for player_id in set(previous_ids) | set(records):
+        key = str(player_id)
+        stats = stats_table.get(key, {'player_id': player_id, 'tournaments': {}})
+        stats['tournaments'].pop(tour_name, None)
+
+        record = records.get(player_id)
+        if record is not None:
+            stats['first_name'] = record['first_name']
+            stats['last_name'] = record['last_name']
+            stats['tournaments'][tour_name] = {field: record[field] for field in ('time_control', *new_record())}
+
+        if stats['tournaments']:
+            stats['by_time_control'] = sum_by_time_control(stats['tournaments'])
+            stats_table[key] = stats
+        else:
+            stats_table.pop(key, None)
+
+    if records:
+        sources[tour_name] = sorted(records)
+
+    return
+
+
+def write_stats_file(data: dict) -> None:
+    """Write the statistics file (to be called under its lock)
+
+    param data: whole content
+    return: Nothing
+    """
+
+    storage.replace_file(PLAYER_STATS_FILE, json.dumps(data).encode("utf-8"))
+
+    return
+
+
+def update_tournament_stats(serialized_tournament: dict) -> None:
+    """Update the statistics of the players of a tournament that was just saved - one write
+
+    param serialized_tournament: tournament document in the current schema
+    return: Nothing
+    """
+
+    records = tournament_records(serialized_tournament)
+
+    with storage.write_lock(PLAYER_STATS_FILE):
+        data = read_stats_file()
+        apply_records(data, serialized_tournament['name'], records)
+        write_stats_file(data)
+
+    return
+
+
+def remove_tournament_stats(tour_name: str) -> None:
+    """Remove the games of a deleted tournament from the statistics
+
+    param tour_name: name of the tournament
+    return: Nothing
+    """
+
+    with storage.write_lock(PLAYER_STATS_FILE):
+        data = read_stats_file()
+        if tour_name in data['table_stats_sources']:
+            apply_records(data, tour_name, {})
+            write_stats_file(data)
+
+    return
+
+
+def rebuild_player_stats() -> int:
+    """Rebuild the whole statistics table from the stored tournaments (archived ones included)
+
+    return: number of tournaments read
+    """
+
+    data = {'table_player_stats': {}, 'table_stats_sources': {}}
+    count = 0
+    for summary in storage.list_tournaments():
+        serialized_tournament = storage.load_tournament(summary['name'])
+        if serialized_tournament:
+            apply_records(data, summary['name'], tournament_records(serialized_tournament))
+            count += 1
+
+    with storage.write_lock(PLAYER_STATS_FILE):
+        write_stats_file(data)
+
+    return count
+
+
+def get_player_stats(player_id: int) -> dict:
+    """Statistics of a player - dictionary lookup in the cached table
+
+    param player_id: integer ID
+    return: statistics (read-only), or an empty dictionary if the player never played
+    """
+
+    data = storage.read_json_cached(PLAYER_STATS_FILE)
+    if not data:
+        return {}
+
+    return data['table_player_stats'].get(str(player_id), {})
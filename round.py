@@ -2,23 +2,96 @@
 Chess Tournament Manager
 OpenClassroom Project 4
 Class implementing a round (4 rounds = 1 tournament)
+Matches are kept in parallel columns (white IDs, black IDs, result codes), stored as such in the database
 """
 
 import random
 import datetime
-import copy
+import time
+import threading
+import validation
+from errors import ValidationError, InvalidChoiceError
+
+
+# Result codes -> (white score, black score) in half-points
+# 0 = not finished, 1 = white wins, 2 = black wins, 3 = draw
+RESULT_SCORES = {0: (0, 0), 1: (2, 0), 2: (0, 2), 3: (1, 1)}
+RESULT_CODES = {scores: code for code, scores in RESULT_SCORES.items()}
+
+# Stored form of the result codes: one digit per board ("1302...")
+RESULT_DIGITS = bytes.maketrans(b"\x00\x01\x02\x03", b"0123")
+DIGIT_RESULTS = bytes.maketrans(b"0123", b"\x00\x01\x02\x03")
+
+
+def encode_results(results: bytearray) -> str:
+    """Pack result codes for the database
+
+    param results: one code (0-3) per board
+    return: one digit per board
+    """
+
+    return results.translate(RESULT_DIGITS).decode("ascii")
+
+
+def decode_results(packed_results: str) -> bytearray:
+    """Unpack result codes read from the database
+
+    param packed_results: one digit per board
+    return: one code (0-3) per board
+    """
+
+    return bytearray(packed_results.encode("ascii").translate(DIGIT_RESULTS))
+
+
+def decode_matches(serialized_round: dict) -> list:
+    """Matches of a serialized round, for readers of the database (statistics, printing...)
+
+    param serialized_round: round in the current schema
+    return: list of (white ID, black ID, white score, black score)
+    """
+
+    scores = [RESULT_SCORES[code] for code in decode_results(serialized_round['results'])]
+
+    return [(player_id_1, player_id_2, score_1, score_2) for player_id_1, player_id_2, (score_1, score_2)
+            in zip(serialized_round['white_ids'], serialized_round['black_ids'], scores)]
 
 
 class Round:
 
     def __init__(self):
         self.round_name = ""
-        self.match_list = []
+        self.white_ids = []
+        self.black_ids = []
+        self.results = bytearray()
+        self.busy_players = set()
         self.date_start = "None"
         self.date_stop = "None"
         self.round_started = False
         self.round_finished = False
 
+        # Monotonic clock at the round start, time of each result and round duration (seconds after the start)
+        self.start_clock = None
+        self.result_times = []
+        self.duration = None
+
+        # Cached serialized form (None = must be rebuilt) and listener called on each change
+        # Readers of the tournament filling the cache at the same time take turns on cache_lock
+        self.serialized = None
+        self.on_change = None
+        self.cache_lock = threading.Lock()
+
+    def mark_changed(self) -> None:
+        """Drop the cached serialized form and notify the listener (the owning tournament)
+
+        return: Nothing
+        """
+
+        self.serialized = None
+        if self.on_change is not None:
+            self.on_change()
+
+        return
+
     def set_name(self, name: str) -> bool:
         """Set the name for a round
 
@@ -27,6 +100,7 @@ class Round:
         """
 
         self.round_name = name
+        self.mark_changed()
         return True
 
     def get_name(self) -> str:
@@ -37,58 +111,55 @@ class Round:
 
         return self.round_name
 
-    def player_already_busy(self, first_name: str, last_name: str) -> bool:
+    def player_already_busy(self, player_id: int) -> bool:
         """Check whether a player took part to a match in this round
 
-        param first_name: player first name
-        param last_name: player last name
+        param player_id: player integer ID
         return: True if player was found
         """
 
-        # Loop over the list of matches
-        for i in range(len(self.match_list)):
-            match = self.match_list[i]
-            if (match["first_name_1"] == first_name and match["last_name_1"] == last_name) or \
-                    (match["first_name_2"] == first_name and match["last_name_2"] == last_name):
-                return True
-
-        return False
+        return player_id in self.busy_players
 
-    def add_match(self, first_name_1, first_name_2, last_name_1, last_name_2) -> bool:
+    def add_match(self, player_id_1: int, player_id_2: int, random_colors: bool = True) -> bool:
         """Add a new match between two players (chose colors randomly)
 
-        param first_name_1: first name for the first player
-        param first_name_2: first name for the second player
-        param last_name_1: last name for the first player
-        param last_name_2: last name for the second player
+        param player_id_1: ID of the first player
+        param player_id_2: ID of the second player
+        param random_colors: False = player 1 plays white (colors given by a schedule)
         return: True if OK, False if match already exists
         """
 
         # Chose who will be player 1 (white) vs 2 (black)
-        random_0_1 = random.randint(0, 1)
-        match = {
-            "color_1": "white",
-            "color_2": "black",
-            "score_1": 0,
-            "score_2": 0
-        }
-
-        # Add names as white or black, depending on the random value
-        if random_0_1 == 0:
-            match["first_name_1"] = first_name_1
-            match["first_name_2"] = first_name_2
-            match["last_name_1"] = last_name_1
-            match["last_name_2"] = last_name_2
-        else:
-            match["first_name_1"] = first_name_2
-            match["first_name_2"] = first_name_1
-            match["last_name_1"] = last_name_2
-            match["last_name_2"] = last_name_1
-
-        # Done, add to list and return
-        self.match_list.append(match)
+        if random_colors and random.randint(0, 1) == 1:
+            player_id_1, player_id_2 = player_id_2, player_id_1
+
+        # Done, add to the columns and return
+        self.white_ids.append(player_id_1)
+        self.black_ids.append(player_id_2)
+        self.results.append(0)
+        self.result_times.append(None)
+        self.busy_players.add(player_id_1)
+        self.busy_players.add(player_id_2)
+        self.mark_changed()
         return True
 
+    def match_count(self) -> int:
+        """Number of matches in this round
+
+        return: integer
+        """
+
+        return len(self.white_ids)
+
+    def get_matches(self) -> list:
+        """All matches of this round
+
+        return: list of (white ID, black ID, white score, black score)
+        """
+
+        return [(player_id_1, player_id_2, *RESULT_SCORES[code])
+                for player_id_1, player_id_2, code in zip(self.white_ids, self.black_ids, self.results)]
+
     def clear_round(self) -> bool:
         """Clear match list
 
@@ -96,12 +167,18 @@ class Round:
         """
 
         self.round_name = ""
-        self.match_list = []
+        self.white_ids = []
+        self.black_ids = []
+        self.results = bytearray()
+        self.busy_players.clear()
         self.date_start = "None"
         self.date_stop = "None"
         self.round_started = False
         self.round_finished = False
-        self.match_list.clear()
+        self.start_clock = None
+        self.result_times = []
+        self.duration = None
+        self.mark_changed()
 
         return True
 
@@ -111,12 +188,8 @@ class Round:
         return: True/False
         """
 
-        # Sweep through list and look for a single match still not finished
-        for match in self.match_list:
-            if match['score_1'] + match['score_2'] == 0:
-                return False
-
-        return True
+        # Look for a single match still not finished
+        return 0 not in self.results
 
     def record_start_time(self) -> None:
         """Get datetime for the round start
@@ -124,9 +197,11 @@ class Round:
          return: Nothing
          """
 
-        datetime_start = datetime.datetime.now()
-        self.date_start = datetime_start.strftime("%H:%M:%S on %A, %B the %dth, %Y")
+        # ISO-8601 timestamp ("YYYY-MM-DDTHH:MM:SS"), formatted by the view
+        self.date_start = datetime.datetime.now().isoformat(timespec="seconds")
+        self.start_clock = time.monotonic()
         self.round_started = True
+        self.mark_changed()
 
         return
 
@@ -136,60 +211,160 @@ class Round:
         return: Nothing
         """
 
-        datetime_stop = datetime.datetime.now()
-        self.date_stop = datetime_stop.strftime("%H:%M:%S on %A, %B the %dth, %Y")
+        self.date_stop = datetime.datetime.now().isoformat(timespec="seconds")
+        self.duration = self.elapsed_time()
         self.round_finished = True
+        self.mark_changed()
 
         return
 
-    def get_match(self, match_index: int) -> dict:
-        """Print
+    def elapsed_time(self) -> float:
+        """Seconds since the round start (monotonic clock, not affected by changes of the system time)
+
+        return: seconds (rounded to the millisecond), None if the round did not start
+        """
+
+        if self.start_clock is None:
+            return None
+
+        return round(time.monotonic() - self.start_clock, 3)
+
+    def restart_clock(self) -> None:
+        """Set the monotonic start of a round loaded from the database, from its wall-clock start time
+
+        return: Nothing
+        """
+
+        self.start_clock = None
+        if not self.round_started or self.round_finished:
+            return
+
+        try:
+            started = datetime.datetime.fromisoformat(self.date_start)
+        except ValueError:
+            started = datetime.datetime.now()
+
+        # Time spent before the load is estimated with the system clock, then measured
+        already_elapsed = max((datetime.datetime.now() - started).total_seconds(), 0)
+        self.start_clock = time.monotonic() - already_elapsed
+
+        return
+
+    def get_match(self, match_index: int) -> tuple:
+        """Retrieve a match of this round
+
+        param match_index: index of the match (must be valid)
+        return: (white ID, black ID, white score, black score)
+        """
+
+        return (self.white_ids[match_index], self.black_ids[match_index],
+                *RESULT_SCORES[self.results[match_index]])
+
+    def check_match_result(self, match_index: int, score_1: int, score_2: int) -> None:
+        """Check a match result without applying it
 
         param match_index: which match to modify in the table
-        return: True if OK - False = out-of-range index or invalid score (win, lose or equality)
+        param score_1: white score in half-points (0, 1 or 2)
+        param score_2: black score in half-points (0, 1 or 2)
+        return: Nothing, raises InvalidChoiceError (index) or InvalidNumberError (scores)
         """
 
-        return self.match_list[match_index]
+        validation.check_match_index(match_index, self.match_count())
 
-    def set_match_result(self, match_index: int, score_1: float, score_2: float) -> bool:
+        # Demi-points = 0, 1 ou 2 et leur somme vaut 0 (match en cours) ou 2 (victoire - match nul)
+        validation.check_match_scores(score_1, score_2)
+
+        return
+
+    def check_match_results(self, results: list) -> list:
+        """Check a batch of match results without applying them
+
+        param results: list of (match index, white score, black score)
+        return: list of ValidationError (index = match index), empty if the whole batch is valid
+        """
+
+        errors = []
+        seen = set()
+        for match_index, score_1, score_2 in results:
+            try:
+                self.check_match_result(match_index, score_1, score_2)
+                if match_index in seen:
+                    raise InvalidChoiceError("match_index", "Given twice")
+            except ValidationError as error:
+                error.index = match_index
+                errors.append(error)
+            seen.add(match_index)
+
+        return errors
+
+    def set_match_results(self, results: list) -> list:
+        """Modify several match results at once: nothing is applied if one of them is invalid
+
+        param results: list of (match index, white score, black score)
+        return: list of ValidationError, empty if the batch was applied
+        """
+
+        errors = self.check_match_results(results)
+        if errors:
+            return errors
+
+        # All results of the batch share the same time
+        elapsed = self.elapsed_time()
+        for match_index, score_1, score_2 in results:
+            self.results[match_index] = RESULT_CODES[(score_1, score_2)]
+            self.result_times[match_index] = elapsed if score_1 + score_2 else None
+        self.mark_changed()
+
+        return []
+
+    def set_match_result(self, match_index: int, score_1: int, score_2: int) -> bool:
         """Modify match results
 
         param match_index: which match to modify in the table
-        return: True if OK - False = out-of-range index or invalid score (win, lose or equality)
+        param score_1: white score in half-points (0, 1 or 2)
+        param score_2: black score in half-points (0, 1 or 2)
+        return: True, raises a ValidationError for an out-of-range index or invalid scores (win, lose or equality)
         """
 
         # Check consistency
-        if match_index < 0 or match_index >= len(self.match_list):
-            print("Invalid index in match list")
-            return False
-
-        # Scores = 0, 1/2 ou 1 et leur somme vaut 0 (match en cours) ou 1 (victoire - match nul)
-        if (score_1 != 0 and score_1 != 1/2 and score_1 != 1) or \
-                (score_2 != 0 and score_2 != 1 / 2 and score_2 != 1) or \
-                (score_2 + score_1 != 0 and score_2 + score_1 != 1):
-            print("Invalid scores")
-            return False
+        self.check_match_result(match_index, score_1, score_2)
 
-        # Update
-        self.match_list[match_index]["score_1"] = score_1
-        self.match_list[match_index]["score_2"] = score_2
+        # Update (and remember when the result came, erased along with the result)
+        self.results[match_index] = RESULT_CODES[(score_1, score_2)]
+        self.result_times[match_index] = self.elapsed_time() if score_1 + score_2 else None
+        self.mark_changed()
 
         return True
 
     def serialize_round(self) -> dict:
-        """Save round in a database
+        """Save round in a database - the result is cached until the round changes, do not modify it
+
+        return: Dictionary containing a round description
+        """
+
+        with self.cache_lock:
+            if self.serialized is None:
+                self.serialized = self.build_serialized_round()
+
+            return self.serialized
+
+    def build_serialized_round(self) -> dict:
+        """Serialize the round without the cache (see serialize_round)
 
         return: Dictionary containing a round description
         """
 
-        # Serialization of data
+        # Matches are stored as columns: white IDs, black IDs and one digit per result code
         serialized_round = {
             'round_name': self.round_name,
             'date_start': self.date_start,
             'date_stop': self.date_stop,
             'round_started': self.round_started,
             'round_finished': self.round_finished,
-            'match_list': copy.deepcopy(self.match_list)
+            'white_ids': list(self.white_ids),
+            'black_ids': list(self.black_ids),
+            'results': encode_results(self.results),
+            'timing': {'result_times': list(self.result_times), 'duration': self.duration}
         }
 
         return serialized_round
@@ -207,9 +382,15 @@ class Round:
         self.round_started = serialized_round["round_started"]
         self.round_finished = serialized_round["round_finished"]
 
-        # Start with a new clean list of matches and add them one by one
-        self.match_list.clear()
-        for match in serialized_round["match_list"]:
-            self.match_list.append(match)
+        # Columns are copied as they are
+        self.white_ids = list(serialized_round["white_ids"])
+        self.black_ids = list(serialized_round["black_ids"])
+        self.results = decode_results(serialized_round["results"])
+        self.busy_players = set(self.white_ids)
+        self.busy_players.update(self.black_ids)
+        self.result_times = list(serialized_round["timing"]["result_times"])
+        self.duration = serialized_round["timing"]["duration"]
+        self.restart_clock()
+        self.mark_changed()
 
         return True
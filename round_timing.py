@@ -0,0 +1,99 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Functions computing duration statistics from the timing stored with each round:
+time of each result (seconds after the round start) and round duration (start to close)
+"""
+
+import heapq
+import math
+import statistics
+
+
+# Number of boards listed as the slowest ones
+SLOWEST_BOARDS = 3
+
+
+def percentile(values: list, rank: int) -> float:
+    """Nearest-rank percentile
+
+    param values: list of numbers (not empty)
+    param rank: 1-100 (e.g. 95)
+    return: the smallest value greater than or equal to rank % of the values
+    """
+
+    ordered = sorted(values)
+
+    return ordered[max(math.ceil(rank * len(ordered) / 100), 1) - 1]
+
+
+def duration_stats(durations: list) -> dict:
+    """Summarize a list of durations
+
+    param durations: durations in seconds (None values are ignored)
+    return: dictionary with count, mean, p95 and max (None if there is no duration)
+    """
+
+    values = [duration for duration in durations if duration is not None]
+    if not values:
+        return {'count': 0, 'mean': None, 'p95': None, 'max': None}
+
+    return {
+        'count': len(values),
+        'mean': round(statistics.fmean(values), 3),
+        'p95': percentile(values, 95),
+        'max': max(values)
+    }
+
+
+def round_timing_stats(serialized_round: dict) -> dict:
+    """Statistics of a round: duration, time of the results, delay between the last result and the close
+
+    param serialized_round: round as stored in a tournament document
+    return: dictionary
+    """
+
+    result_times = serialized_round['timing']['result_times']
+    duration = serialized_round['timing']['duration']
+
+    # Arbiter latency: only known once the round is closed with all results
+    close_delay = None
+    if duration is not None and result_times and None not in result_times:
+        close_delay = round(duration - max(result_times), 3)
+
+    # Boards keep the match index printed by the round (MATCH 0, MATCH 1...) and typed in round_match_result
+    boards = [(time, i) for i, time in enumerate(result_times) if time is not None]
+
+    return {
+        'round_name': serialized_round['round_name'],
+        'duration': duration,
+        'close_delay': close_delay,
+        'boards': duration_stats(result_times),
+        'slowest': [(board, time) for time, board in heapq.nlargest(SLOWEST_BOARDS, boards)]
+    }
+
+
+def tournament_timing_stats(serialized_rounds: list) -> dict:
+    """Statistics over all rounds of a tournament
+
+    param serialized_rounds: rounds as stored in a tournament document
+    return: dictionary with the stats of each round and overall stats
+    """
+
+    rounds = [round_timing_stats(serialized_round) for serialized_round in serialized_rounds
+              if serialized_round['round_started']]
+
+    # Slowest boards of the whole tournament: (round name, match index, seconds)
+    boards = []
+    for serialized_round in serialized_rounds:
+        for i, time in enumerate(serialized_round['timing']['result_times']):
+            if time is not None:
+                boards.append((time, serialized_round['round_name'], i))
+
+    return {
+        'rounds': rounds,
+        'round_durations': duration_stats([stats['duration'] for stats in rounds]),
+        'close_delays': duration_stats([stats['close_delay'] for stats in rounds]),
+        'boards': duration_stats([board[0] for board in boards]),
+        'slowest': [(name, board, time) for time, name, board in heapq.nlargest(SLOWEST_BOARDS, boards)]
+    }
@@ -0,0 +1,163 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Reader-writer lock protecting a model shared between threads (REPL, autosave, any other front end):
+many threads may read at the same time, a writer has the object for itself
+"""
+
+import threading
+import functools
+import contextlib
+
+
+class ReadWriteLock:
+
+    def __init__(self):
+        # Readers by thread (count of nested reads), writer thread and its nesting depth, waiting writers
+        # A waiting writer blocks new readers, so that a steady flow of readers cannot starve it
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = {}
+        self.writer = None
+        self.writer_depth = 0
+        self.waiting_writers = 0
+
+    def acquire_read(self) -> None:
+        """Wait until no writer holds or waits for the lock, then read (nested reads never wait)
+
+        return: Nothing
+        """
+
+        me = threading.get_ident()
+        with self.condition:
+            if self.writer != me and me not in self.readers:
+                while self.writer is not None or self.waiting_writers:
+                    self.condition.wait()
+            self.readers[me] = self.readers.get(me, 0) + 1
+
+        return
+
+    def release_read(self) -> None:
+        """End a read, the last reader lets a waiting writer in
+
+        return: Nothing
+        """
+
+        me = threading.get_ident()
+        with self.condition:
+            self.readers[me] -= 1
+            if not self.readers[me]:
+                del self.readers[me]
+                if not self.readers:
+                    self.condition.notify_all()
+
+        return
+
+    def acquire_write(self) -> None:
+        """Wait until nobody else reads or writes (the writer may write and read again)
+
+        return: Nothing, raises RuntimeError if the thread only holds a read (it would wait for itself)
+        """
+
+        me = threading.get_ident()
+        with self.condition:
+            if self.writer == me:
+                self.writer_depth += 1
+                return
+            if me in self.readers:
+                raise RuntimeError("A read lock cannot be upgraded to a write lock")
+
+            self.waiting_writers += 1
+            while self.writer is not None or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = me
+            self.writer_depth = 1
+
+        return
+
+    def release_write(self) -> None:
+        """End a write, waiting readers and writers compete again
+
+        return: Nothing
+        """
+
+        with self.condition:
+            self.writer_depth -= 1
+            if not self.writer_depth:
+                self.writer = None
+                self.condition.notify_all()
+
+        return
+
+    @contextlib.contextmanager
+    def read(self):
+        """Context manager: hold the lock for reading
+
+        return: Nothing
+        """
+
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def write(self):
+        """Context manager: hold the lock for writing
+
+        return: Nothing
+        """
+
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def reader(method):
+    """Decorator: the method reads the object, under its "lock" attribute (a ReadWriteLock)
+
+    param method: method of a model class
+    return: the locked method
+    """
+
+    @functools.wraps(method)
+    def locked_method(self, *args, **kwargs):
+        # Nested call: the thread already holds the lock (only this thread can change that, no race)
+        lock = self.lock
+        me = threading.get_ident()
+        if lock.writer == me or me in lock.readers:
+            return method(self, *args, **kwargs)
+
+        lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_read()
+
+    return locked_method
+
+
+def writer(method):
+    """Decorator: the method modifies the object, under its "lock" attribute (a ReadWriteLock)
+
+    param method: method of a model class
+    return: the locked method
+    """
+
+    @functools.wraps(method)
+    def locked_method(self, *args, **kwargs):
+        # Nested call: the thread already holds the lock (only this thread can change that, no race)
+        lock = self.lock
+        if lock.writer == threading.get_ident():
+            return method(self, *args, **kwargs)
+
+        lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_write()
+
+    return locked_method
@@ -0,0 +1,244 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Functions upgrading tournament documents written by former versions of the program
+Documents without a "schema" field were written before the schema was versioned (version 1)
+"""
+
+import copy
+import datetime
+
+
+# Version 2: integer player IDs, matches stored as [white ID, black ID, white score, black score]
+# Version 3: scores stored as integer half-points ("half_points" field for players)
+# Version 4: ISO-8601 dates ("YYYY-MM-DD") and round timestamps ("YYYY-MM-DDTHH:MM:SS")
+# Version 5: round timing (time of each result and round duration, in seconds after the round start)
+# Version 6: pairing system ("swiss", "round_robin", "double_round_robin") and precomputed round-robin schedule
+# Version 7: players who left an arena for a while ("arena_paused") and closing arenas ("arena_closing")
+# Version 8: players found in the player table are stored as references (ID and tournament score only)
+# Version 9: matches of a round stored as columns ("white_ids", "black_ids", "results": one digit per result code)
+# Version 10: references keep the name of the player, to check that the ID still designates the same player
+SCHEMA_VERSION = 10
+
+# Formats of the dates written by versions 1 to 3 (the day always had a "th" suffix)
+LEGACY_DATE_FORMAT = "%A, %B the %dth, %Y"
+LEGACY_DATETIME_FORMAT = "%H:%M:%S on %A, %B the %dth, %Y"
+
+# Digit stored by version 9 for the scores of a match (white, black): not finished, white wins, black wins, draw
+RESULT_DIGITS = {(0, 0): "0", (2, 0): "1", (0, 2): "2", (1, 1): "3"}
+
+
+def upgrade_tournament(serialized_tournament: dict, ids_by_name: dict = None) -> dict:
+    """Bring a serialized tournament to the current schema version
+
+    param serialized_tournament: document read from the database
+    param ids_by_name: {(first name, last name): ID} of the player table, for documents written before players
+                       had IDs (see upgrade_v1_to_v2)
+    return: the upgraded document (the input itself if it is already up to date)
+    """
+
+    version = serialized_tournament.get('schema', 1)
+    if version == SCHEMA_VERSION:
+        return serialized_tournament
+
+    # Work on a copy, documents may come from a cache
+    upgraded = copy.deepcopy(serialized_tournament)
+
+    if version < 2:
+        upgrade_v1_to_v2(upgraded, ids_by_name or {})
+    if version < 3:
+        upgrade_v2_to_v3(upgraded)
+    if version < 4:
+        upgrade_v3_to_v4(upgraded)
+    if version < 5:
+        upgrade_v4_to_v5(upgraded)
+    if version < 6:
+        upgrade_v5_to_v6(upgraded)
+    if version < 7:
+        upgrade_v6_to_v7(upgraded)
+    if version < 8:
+        upgrade_v7_to_v8(upgraded)
+    if version < 9:
+        upgrade_v8_to_v9(upgraded)
+    if version < 10:
+        upgrade_v9_to_v10(upgraded)
+
+    upgraded['schema'] = SCHEMA_VERSION
+    return upgraded
+
+
+def upgrade_v1_to_v2(serialized_tournament: dict, table_ids: dict) -> None:
+    """Assign integer IDs to players and replace names by IDs in matches
+
+    param serialized_tournament: document to upgrade in place
+    param table_ids: {(first name, last name): ID} of the player table
+    return: Nothing
+    """
+
+    # Players of the player table get their ID there, the others a negative ID in their stored order:
+    # the table never gives it, so that they are not mistaken for a registered player (statistics...)
+    ids_by_name = {}
+    for i, player in enumerate(serialized_tournament['players']):
+        name = (player['first_name'], player['last_name'])
+        player['player_id'] = table_ids.get(name, -(i + 1))
+        ids_by_name[name] = player['player_id']
+
+    # Translate each match of each round
+    rounds = serialized_tournament['round_list'] + [serialized_tournament['current_round']]
+    for round_desc in rounds:
+        serialized_matches = []
+        for match in round_desc['match_list']:
+            player_id_1 = ids_by_name[(match['first_name_1'], match['last_name_1'])]
+            player_id_2 = ids_by_name[(match['first_name_2'], match['last_name_2'])]
+            serialized_matches.append([player_id_1, player_id_2, match['score_1'], match['score_2']])
+        round_desc['match_list'] = serialized_matches
+
+    return
+
+
+def upgrade_player(serialized_player: dict) -> dict:
+    """Replace the former float score of a serialized player by integer half-points
+
+    param serialized_player: player read from the database
+    return: the upgraded player (the input itself if it is already up to date)
+    """
+
+    if 'half_points' in serialized_player:
+        return serialized_player
+
+    upgraded = dict(serialized_player)
+    upgraded['half_points'] = round(upgraded.pop('tournament_score', 0) * 2)
+
+    return upgraded
+
+
+def upgrade_v2_to_v3(serialized_tournament: dict) -> None:
+    """Convert player and match scores into integer half-points
+
+    param serialized_tournament: document to upgrade in place
+    return: Nothing
+    """
+
+    serialized_tournament['players'] = [upgrade_player(player) for player in serialized_tournament['players']]
+
+    rounds = serialized_tournament['round_list'] + [serialized_tournament['current_round']]
+    for round_desc in rounds:
+        for match in round_desc['match_list']:
+            match[2] = round(match[2] * 2)
+            match[3] = round(match[3] * 2)
+
+    return
+
+
+def legacy_to_iso(legacy_date: str, with_time: bool) -> str:
+    """Convert a date written by versions 1 to 3 into ISO-8601
+
+    param legacy_date: e.g. "Wednesday, March the 01th, 2023"
+    param with_time: True for round timestamps ("14:05:00 on ...")
+    return: ISO-8601 string, or the input unchanged if it cannot be read (e.g. empty)
+    """
+
+    try:
+        if with_time:
+            return datetime.datetime.strptime(legacy_date, LEGACY_DATETIME_FORMAT).isoformat(timespec="seconds")
+        return datetime.datetime.strptime(legacy_date, LEGACY_DATE_FORMAT).date().isoformat()
+    except ValueError:
+        return legacy_date
+
+
+def upgrade_v3_to_v4(serialized_tournament: dict) -> None:
+    """Convert tournament dates and round timestamps into ISO-8601
+
+    param serialized_tournament: document to upgrade in place
+    return: Nothing
+    """
+
+    serialized_tournament['start_date'] = legacy_to_iso(serialized_tournament['start_date'], False)
+    serialized_tournament['end_date'] = legacy_to_iso(serialized_tournament['end_date'], False)
+
+    rounds = serialized_tournament['round_list'] + [serialized_tournament['current_round']]
+    for round_desc in rounds:
+        round_desc['date_start'] = legacy_to_iso(round_desc['date_start'], True)
+        round_desc['date_stop'] = legacy_to_iso(round_desc['date_stop'], True)
+
+    return
+
+
+def upgrade_v4_to_v5(serialized_tournament: dict) -> None:
+    """Add an empty timing to each round (former rounds were not measured)
+
+    param serialized_tournament: document to upgrade in place
+    return: Nothing
+    """
+
+    rounds = serialized_tournament['round_list'] + [serialized_tournament['current_round']]
+    for round_desc in rounds:
+        round_desc['timing'] = {'result_times': [None] * len(round_desc['match_list']), 'duration': None}
+
+    return
+
+
+def upgrade_v5_to_v6(serialized_tournament: dict) -> None:
+    """Former tournaments were all swiss tournaments
+
+    param serialized_tournament: document to upgrade in place
+    return: Nothing
+    """
+
+    serialized_tournament['pairing_system'] = "swiss"
+    serialized_tournament['schedule'] = []
+
+    return
+
+
+def upgrade_v6_to_v7(serialized_tournament: dict) -> None:
+    """Former tournaments had no arena
+
+    param serialized_tournament: document to upgrade in place
+    return: Nothing
+    """
+
+    serialized_tournament['arena_paused'] = []
+    serialized_tournament['arena_closing'] = False
+
+    return
+
+
+def upgrade_v7_to_v8(serialized_tournament: dict) -> None:
+    """Former tournaments embedded a copy of each player, which stays valid: only the player table can tell
+    which players can be replaced by references, this is done when the tournament is written again
+    (storage.compact_tournament, see db_upgrade)
+
+    param serialized_tournament: document to upgrade in place
+    return: Nothing
+    """
+
+    return
+
+
+def upgrade_v8_to_v9(serialized_tournament: dict) -> None:
+    """Replace the list of matches of each round by columns
+
+    param serialized_tournament: document to upgrade in place
+    return: Nothing
+    """
+
+    rounds = serialized_tournament['round_list'] + [serialized_tournament['current_round']]
+    for round_desc in rounds:
+        matches = round_desc.pop('match_list')
+        round_desc['white_ids'] = [match[0] for match in matches]
+        round_desc['black_ids'] = [match[1] for match in matches]
+        round_desc['results'] = "".join(RESULT_DIGITS[(match[2], match[3])] for match in matches)
+
+    return
+
+
+def upgrade_v9_to_v10(serialized_tournament: dict) -> None:
+    """References without a name are still resolved by ID: only the player table knows the names, they are
+    added when the tournament is written again (storage.reference_players, see db_upgrade)
+
+    param serialized_tournament: document to upgrade in place
+    return: Nothing
+    """
+
+    return
@@ -0,0 +1,125 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Class keeping several tournaments (sessions) in memory at once, one of them being selected
+"""
+
+from tournament import Tournament
+
+
+class SessionRegistry:
+
+    def __init__(self):
+        self.sessions = {}
+        self.current_name = ""
+
+        # Listener given to every new tournament (autosave)
+        self.on_change = None
+
+    def new_session(self, name: str) -> bool:
+        """Create an empty tournament under a new session name and select it
+
+        param name: session name (e.g. "Open A")
+        return: False if the name is empty or already used
+        """
+
+        if not name:
+            print("Session name must not be empty")
+            return False
+
+        if name in self.sessions:
+            print("Session name already used")
+            return False
+
+        self.sessions[name] = Tournament()
+        self.sessions[name].on_change = self.on_change
+        self.current_name = name
+
+        return True
+
+    def select(self, name: str) -> bool:
+        """Select the session that commands will target (tournament stays in memory)
+
+        param name: session name
+        return: False if unknown session
+        """
+
+        if name not in self.sessions:
+            print("Unknown session")
+            return False
+
+        self.current_name = name
+
+        return True
+
+    def close(self, name: str) -> bool:
+        """Remove a session from memory (unsaved data is lost)
+
+        param name: session name
+        return: False if unknown session or if it is the last one
+        """
+
+        if name not in self.sessions:
+            print("Unknown session")
+            return False
+
+        if len(self.sessions) == 1:
+            print("Cannot close the last session")
+            return False
+
+        del self.sessions[name]
+
+        # Fall back on any remaining session
+        if self.current_name == name:
+            self.current_name = next(iter(self.sessions))
+
+        return True
+
+    def get_current(self) -> Tournament:
+        """Retrieve the selected tournament
+
+        return: Tournament
+        """
+
+        return self.sessions[self.current_name]
+
+    def get_current_name(self) -> str:
+        """Retrieve the name of the selected session
+
+        return: session name
+        """
+
+        return self.current_name
+
+    def get_tournaments(self) -> list:
+        """Retrieve all tournaments kept in memory
+
+        return: list of Tournament
+        """
+
+        return list(self.sessions.values())
+
+    def find_session_by_tournament(self, tour_name: str) -> str:
+        """Find which session holds a tournament
+
+        param tour_name: name of the tournament
+        return: session name, or an empty string if the tournament is not in memory
+        """
+
+        for name, tournament in self.sessions.items():
+            if tournament.name == tour_name:
+                return name
+
+        return ""
+
+    def get_summaries(self) -> list:
+        """List sessions with a few infos about their tournament
+
+        return: list of (session name, tournament name, round number, selected?)
+        """
+
+        summaries = []
+        for name, tournament in self.sessions.items():
+            summaries.append((name, tournament.name, tournament.round_number, name == self.current_name))
+
+        return summaries
@@ -0,0 +1,973 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Functions handling the database layout on the hard drive
+A small catalog lists the tournaments, each tournament lives in its own file (shard) and the
+player table has a dedicated file: saving/loading a tournament only touches its own shard
+Writers are serialized by an advisory lock per file and replace files atomically (temporary file,
+fsync, rename): readers never take the lock and always see a complete file
+"""
+
+import os
+import re
+import gzip
+import json
+import hashlib
+import tempfile
+import contextlib
+import collections
+import schema
+from errors import ReferencedPlayerError
+from tinydb import TinyDB
+from tinydb import Query
+from tinydb.storages import Storage
+
+# Advisory locks are only available on POSIX systems, writes stay atomic elsewhere
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Former single-file database (only read by the migration command)
+DB_MONOLITHIC = "ChessDB.json"
+
+# Sharded layout
+DB_FOLDER = "ChessDB"
+CATALOG_FILE = os.path.join(DB_FOLDER, "catalog.json")
+PLAYERS_FILE = os.path.join(DB_FOLDER, "players.json")
+TOURNAMENTS_FOLDER = os.path.join(DB_FOLDER, "tournaments")
+
+# Compressed tier for finished tournaments (one gzip file per tournament)
+ARCHIVE_FOLDER = os.path.join(DB_FOLDER, "archive")
+
+# Parsed files kept in memory, by path: (file signature, parsed content)
+# Content handed out from this cache is shared: it must never be modified
+read_cache = {}
+
+# Stored players by ID, rebuilt only when the player table is parsed again: (parsed content, {ID: player})
+player_index = {'current': (None, {})}
+
+# Messages about the database (missing files, migration...): functions of this module run on the storage
+# thread, which never prints - they are printed by the REPL (see async_storage.poll)
+notices = collections.deque()
+
+# Fields a tournament keeps for each registered player, the others are read from the player table
+# (the name is kept to check that the ID still designates the same person)
+TOURNAMENT_PLAYER_FIELDS = ('player_id', 'first_name', 'last_name', 'half_points')
+
+
+def notify(message: str) -> None:
+    """Leave a message for the user, printed by the REPL thread
+
+    param message: text to print
+    return: Nothing
+    """
+
+    notices.append(message)
+
+    return
+
+
+def file_signature(path: str) -> tuple:
+    """Cheap signature of a file: any rewrite changes it (atomic renames change the inode)
+
+    param path: path of the file
+    return: (modification time in ns, size, inode)
+    """
+
+    file_stat = os.stat(path)
+
+    return file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino
+
+
+def read_json_cached(path: str) -> dict:
+    """Read a JSON file, parsing it only if it changed since the last read
+
+    param path: path of the file
+    return: parsed content (shared, read-only), or None if the file is missing or empty
+    """
+
+    try:
+        signature = file_signature(path)
+    except FileNotFoundError:
+        read_cache.pop(path, None)
+        return None
+
+    cached = read_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    data = None
+    if signature[1] != 0:
+        with open(path, "r", encoding="utf-8") as json_file:
+            data = json.load(json_file)
+
+    read_cache[path] = (signature, data)
+
+    return data
+
+
+def read_json_for_update(path: str) -> dict:
+    """Read a JSON file without the cache, to modify it (to be called under the lock of the file)
+
+    param path: path of the file
+    return: parsed content (private copy), or None if the file is missing or empty
+    """
+
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+
+    with open(path, "r", encoding="utf-8") as json_file:
+        return json.load(json_file)
+
+
+def read_table(path: str, table_name: str) -> list:
+    """Read all documents of a TinyDB table through the read cache
+
+    param path: path of the TinyDB file
+    param table_name: name of the table
+    return: list of documents (shared, read-only)
+    """
+
+    data = read_json_cached(path)
+    if not data:
+        return []
+
+    return list(data.get(table_name, {}).values())
+
+
+def replace_file(path: str, data: bytes) -> None:
+    """Atomically replace the content of a file: temporary file, fsync, then rename
+
+    param path: path of the file
+    param data: new content
+    return: Nothing
+    """
+
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+
+    # The temporary file lives in the same folder so that the rename stays on the same file system
+    handle, tmp_path = tempfile.mkstemp(dir=folder, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as tmp_file:
+            tmp_file.write(data)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        remove_file(tmp_path)
+        raise
+    finally:
+        # Our own write: the cached content is obsolete
+        read_cache.pop(path, None)
+
+    # Make the rename itself durable (POSIX only)
+    if hasattr(os, "O_DIRECTORY"):
+        folder_handle = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(folder_handle)
+        finally:
+            os.close(folder_handle)
+
+    return
+
+
+class AtomicJSONStorage(Storage):
+    """TinyDB storage reading a JSON file without locking and writing it with replace_file()"""
+
+    def __init__(self, path: str, create_dirs: bool = False, **kwargs):
+        super().__init__()
+        self.path = path
+        self.kwargs = kwargs
+        if create_dirs:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def read(self):
+        # Missing or empty file: TinyDB initializes the database
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return None
+
+        with open(self.path, "r", encoding="utf-8") as json_file:
+            return json.load(json_file)
+
+    def write(self, data) -> None:
+        replace_file(self.path, json.dumps(data, **self.kwargs).encode("utf-8"))
+
+    def close(self) -> None:
+        pass
+
+
+def open_db(path: str) -> TinyDB:
+    """Open a TinyDB file for reading, creating its folder if needed
+
+    param path: path of the file
+    return: TinyDB object (to be closed by the caller)
+    """
+
+    return TinyDB(path, storage=AtomicJSONStorage, create_dirs=True)
+
+
+@contextlib.contextmanager
+def write_lock(path: str):
+    """Hold the advisory lock of a file: writers of the same file are serialized, readers are not blocked
+
+    param path: path of the file to protect
+    return: context manager
+    """
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def open_db_for_write(path: str):
+    """Open a TinyDB file for a whole read-modify-write cycle under its lock
+
+    param path: path of the file
+    return: context manager giving the TinyDB object
+    """
+
+    with write_lock(path):
+        db = open_db(path)
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+def shard_file_name(tour_name: str) -> str:
+    """Build the file name of the shard storing a tournament
+
+    param tour_name: name of the tournament
+    return: file name, relative to the tournaments folder
+    """
+
+    # Readable part + short hash, so that names only differing by case never share a file
+    slug = re.sub(r'[^a-z0-9]+', '_', tour_name.lower()).strip('_')
+    digest = hashlib.sha1(tour_name.encode("utf-8")).hexdigest()[:8]
+
+    return f"{slug}_{digest}.json"
+
+
+def summarize_tournament(serialized_tournament: dict) -> dict:
+    """Extract the general infos about a tournament to be stored in the catalog, with the players it references
+    (so that the player table can be checked without reading every tournament)
+
+    param serialized_tournament: serialized tournament as it is written (see compact_tournament)
+    return: Dictionary containing the summary
+    """
+
+    summary = {
+        'name': serialized_tournament['name'],
+        'description': serialized_tournament['description'],
+        'time_control': serialized_tournament['time_control'],
+        'location': serialized_tournament['location'],
+        'start_date': serialized_tournament['start_date'],
+        'end_date': serialized_tournament['end_date'],
+        'tournament_finished': serialized_tournament['tournament_finished'],
+        'file': shard_file_name(serialized_tournament['name']),
+        'archived': False,
+        'references': [[player['player_id'], player.get('first_name'), player.get('last_name')]
+                       for player in serialized_tournament['players'] if is_reference(player)]
+    }
+
+    return summary
+
+
+def remove_file(path: str) -> None:
+    """Delete a file if it exists
+
+    param path: path of the file
+    return: Nothing
+    """
+
+    if os.path.exists(path):
+        os.remove(path)
+    read_cache.pop(path, None)
+
+    return
+
+
+def archive_path(file_name: str) -> str:
+    """Path of the compressed copy of a tournament shard
+
+    param file_name: file name of the shard
+    return: path in the archive folder
+    """
+
+    return os.path.join(ARCHIVE_FOLDER, file_name + ".gz")
+
+
+def write_archive(file_name: str, serialized_tournament: dict) -> None:
+    """Write a tournament in the compressed archive
+
+    param file_name: file name of the shard
+    param serialized_tournament: serialized tournament (dictionary)
+    return: Nothing
+    """
+
+    path = archive_path(file_name)
+    data = json.dumps(compact_tournament(serialized_tournament), separators=(',', ':')).encode("utf-8")
+    with write_lock(path):
+        replace_file(path, gzip.compress(data))
+
+    return
+
+
+def read_archive(file_name: str) -> dict:
+    """Read a tournament from the compressed archive
+
+    param file_name: file name of the shard
+    return: the serialized tournament, or an empty dictionary if the file is missing
+    """
+
+    path = archive_path(file_name)
+    if not os.path.exists(path):
+        notify(f"Missing archive file {path}")
+        return {}
+
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        return json.load(archive)
+
+
+def save_players(serialized_players: list, next_id: int = 1, renamed_ids: list = ()) -> bool:
+    """Overwrite the player table, refused if stored tournaments would lose a referenced player, or if an ID
+    already given would designate someone else. References to renamed players are renamed as well
+
+    param serialized_players: list of serialized players
+    param next_id: next free ID of the list that is written (the stored counter never goes back)
+    param renamed_ids: IDs of the players renamed in the list since it was loaded from the table
+    return: True if written, raises ReferencedPlayerError if the table is refused
+    """
+
+    with open_db_for_write(PLAYERS_FILE) as db:
+        conflicts = check_player_table(serialized_players, renamed_ids)
+        if conflicts:
+            raise ReferencedPlayerError("player_id", "Player table not saved: " + "; ".join(conflicts))
+
+        used_ids = [player['player_id'] + 1 for player in serialized_players if player.get('player_id')]
+        next_id = max([next_id, stored_next_id()] + used_ids)
+
+        table = db.table("table_players")
+        table.truncate()
+        table.insert_multiple(serialized_players)
+        counter = db.table("table_player_ids")
+        counter.truncate()
+        counter.insert({'next_id': next_id})
+
+    rename_references({player['player_id']: player for player in serialized_players
+                       if player.get('player_id') in renamed_ids})
+
+    return True
+
+
+def load_players() -> list:
+    """Read the player table
+
+    return: list of serialized players (empty if nothing was stored), upgraded to the current format
+    """
+
+    serialized_players = read_table(PLAYERS_FILE, "table_players")
+
+    return [schema.upgrade_player(player) for player in serialized_players]
+
+
+def load_player_table() -> tuple:
+    """Read the player table and its ID counter
+
+    return: (list of serialized players, next free ID)
+    """
+
+    return load_players(), stored_next_id()
+
+
+def stored_next_id() -> int:
+    """Next free ID of the player table: an ID is never given twice, even once its player was deleted
+    Tables written before the counter existed continue after the highest ID stored or referenced
+
+    return: integer ID
+    """
+
+    counters = read_table(PLAYERS_FILE, "table_player_ids")
+    if counters:
+        return counters[0]['next_id']
+
+    used_ids = list(stored_players_by_id()) + list(referenced_players())
+
+    return max(used_ids, default=0) + 1
+
+
+def stored_players_by_id() -> dict:
+    """Index of the player table by ID (built again only if the file changed)
+
+    return: {player ID: serialized player} (shared, read-only)
+    """
+
+    data, players_by_id = player_index['current']
+    current_data = read_json_cached(PLAYERS_FILE)
+    if current_data is data:
+        return players_by_id
+
+    # Players written before IDs existed cannot be referenced
+    players_by_id = {}
+    for player in load_players():
+        if player.get('player_id'):
+            players_by_id[player['player_id']] = player
+    player_index['current'] = (current_data, players_by_id)
+
+    return players_by_id
+
+
+def is_reference(serialized_player: dict) -> bool:
+    """Check whether a player of a tournament is a reference to the player table or an embedded copy
+
+    param serialized_player: player of a tournament
+    return: True for a reference
+    """
+
+    return 'birth_year' not in serialized_player
+
+
+def same_person(serialized_player: dict, stored_player: dict) -> bool:
+    """Check that a player of a tournament is the player stored under the same ID
+    (references written before they kept the name can only be trusted by ID)
+
+    param serialized_player: player of a tournament, embedded or referenced
+    param stored_player: player of the player table bearing the same ID (None if there is none)
+    return: True if the names match
+    """
+
+    if stored_player is None:
+        return False
+
+    if 'first_name' not in serialized_player:
+        return True
+
+    return serialized_player['first_name'] == stored_player['first_name'] \
+        and serialized_player['last_name'] == stored_player['last_name']
+
+
+def referenced_players() -> dict:
+    """Players of the player table referenced by stored tournaments (catalog entries, or the tournaments
+    themselves for entries written before the catalog listed them)
+
+    return: {player ID: (first name, last name, list of tournament names)} - names are None for references
+            written before they kept them
+    """
+
+    references = {}
+    for summary in list_tournaments():
+        for player_id, first_name, last_name in summary_references(summary):
+            references.setdefault(player_id, (first_name, last_name, []))[2].append(summary['name'])
+
+    return references
+
+
+def summary_references(summary: dict) -> list:
+    """Players of the player table referenced by a stored tournament
+
+    param summary: catalog entry of the tournament
+    return: list of [player ID, first name, last name] (read from the tournament itself if the entry was
+            written before the catalog listed them)
+    """
+
+    if 'references' in summary:
+        return summary['references']
+
+    serialized_tournament = read_stored_tournament(summary)
+    if not serialized_tournament:
+        return []
+
+    return [[player['player_id'], player.get('first_name'), player.get('last_name')]
+            for player in upgrade_document(serialized_tournament)['players'] if is_reference(player)]
+
+
+def check_player_table(serialized_players: list, renamed_ids: list) -> list:
+    """Check a new content of the player table against the stored tournaments and the stored IDs
+
+    param serialized_players: players to be written
+    param renamed_ids: IDs of the players renamed in the list since it was loaded from the table
+    return: list of messages, empty if the table can be written
+    """
+
+    new_players = {player['player_id']: player for player in serialized_players if player.get('player_id')}
+    conflicts = []
+
+    # Every referenced player must stay
+    for player_id, (first_name, last_name, tour_names) in sorted(referenced_players().items()):
+        if player_id not in new_players:
+            name = f"{first_name} {last_name}" if first_name is not None else "unknown name"
+            conflicts.append(f"player #{player_id} ({name}) is still referenced by {', '.join(tour_names)}")
+
+    # An ID already given by the table keeps designating the same player, unless the player was renamed in a list
+    # loaded from the table (another list, not loaded or loaded before, may have given the same ID again)
+    first_free_id = stored_next_id()
+    stored_players = stored_players_by_id()
+    for player_id, player in sorted(new_players.items()):
+        stored_player = stored_players.get(player_id)
+        if stored_player is not None and player_id in renamed_ids:
+            continue
+        if stored_player is not None and not same_person(player, stored_player):
+            conflicts.append(f"ID #{player_id} of {player['first_name']} {player['last_name']} designates "
+                             f"{stored_player['first_name']} {stored_player['last_name']} in the stored table "
+                             f"(players_load first)")
+        elif stored_player is None and player_id < first_free_id:
+            conflicts.append(f"ID #{player_id} of {player['first_name']} {player['last_name']} was already given "
+                             f"to another player (players_load first)")
+
+    return conflicts
+
+
+def rename_references(players_by_id: dict) -> int:
+    """Write the new name of renamed players in the references of the stored tournaments
+
+    param players_by_id: {player ID: serialized player} of the renamed players
+    return: number of rewritten tournaments
+    """
+
+    renamed = 0
+    for summary in list_tournaments():
+        outdated = [player_id for player_id, first_name, last_name in summary_references(summary)
+                    if first_name is not None and player_id in players_by_id
+                    and (first_name, last_name) != (players_by_id[player_id]['first_name'],
+                                                    players_by_id[player_id]['last_name'])]
+        if not outdated:
+            continue
+
+        serialized_tournament = upgrade_document(read_stored_tournament(summary))
+        serialized_players = []
+        for player in serialized_tournament['players']:
+            if is_reference(player) and player['player_id'] in outdated:
+                player = {**player, 'first_name': players_by_id[player['player_id']]['first_name'],
+                          'last_name': players_by_id[player['player_id']]['last_name']}
+            serialized_players.append(player)
+
+        rewrite_tournament(summary, {**serialized_tournament, 'players': serialized_players})
+        renamed += 1
+
+    return renamed
+
+
+def reference_players(serialized_players: list) -> list:
+    """Replace the players of a tournament found in the player table by a reference (ID, name, tournament score)
+    Players missing from the table (not saved yet, or IDs of former versions) keep their embedded copy
+
+    param serialized_players: players of a tournament, embedded or already referenced
+    return: list of references and embedded players
+    """
+
+    players_by_id = stored_players_by_id()
+
+    referenced = []
+    for player in serialized_players:
+        stored_player = players_by_id.get(player['player_id'])
+        if not is_reference(player) and not same_person(player, stored_player):
+            referenced.append(player)
+        elif 'first_name' not in player and stored_player is not None:
+            # Reference written before they kept the name: the name is taken from the table
+            referenced.append({'player_id': player['player_id'], 'first_name': stored_player['first_name'],
+                               'last_name': stored_player['last_name'], 'half_points': player['half_points']})
+        else:
+            referenced.append({field: player[field] for field in TOURNAMENT_PLAYER_FIELDS if field in player})
+
+    return referenced
+
+
+def missing_players(serialized_players: list) -> list:
+    """Players of a tournament referenced by ID but absent from the player table, or replaced by someone else
+
+    param serialized_players: players of a tournament, embedded or referenced
+    return: list of IDs (empty if everybody can be resolved)
+    """
+
+    players_by_id = stored_players_by_id()
+
+    return [player['player_id'] for player in serialized_players
+            if is_reference(player) and not same_person(player, players_by_id.get(player['player_id']))]
+
+
+def resolve_players(serialized_players: list) -> list:
+    """Complete the references of a tournament with the current infos of the player table
+
+    param serialized_players: players of a tournament, embedded or referenced
+    return: list of complete serialized players (a placeholder for players missing from the table or whose ID now
+            designates someone else: the name kept by the reference, if any)
+    """
+
+    players_by_id = stored_players_by_id()
+
+    resolved_players = []
+    for player in serialized_players:
+        if not is_reference(player):
+            resolved_players.append(player)
+            continue
+
+        stored_player = players_by_id.get(player['player_id'])
+        if not same_person(player, stored_player):
+            stored_player = {'first_name': "Unknown", 'last_name': f"player #{player['player_id']}",
+                             'birth_day': 1, 'birth_mon': 1, 'birth_year': 1900, 'sex': "M", 'rating': 0}
+        resolved_players.append({**stored_player, **player})
+
+    return resolved_players
+
+
+def registered_players(serialized_players: list) -> dict:
+    """Players of a tournament that are players of the player table (same ID, same name)
+    The IDs of the others (embedded copies of unknown or replaced players) are only valid in their tournament
+
+    param serialized_players: players of a tournament, embedded or referenced
+    return: {player ID: stored player} (shared, read-only)
+    """
+
+    players_by_id = stored_players_by_id()
+
+    return {player['player_id']: players_by_id[player['player_id']] for player in serialized_players
+            if same_person(player, players_by_id.get(player['player_id']))}
+
+
+def compact_tournament(serialized_tournament: dict) -> dict:
+    """Tournament as it is written: registered players are replaced by references
+    Documents of former versions (migration) are written as they are, they are upgraded when read
+
+    param serialized_tournament: serialized tournament (read-only)
+    return: shallow copy with referenced players
+    """
+
+    if serialized_tournament.get('schema', 1) != schema.SCHEMA_VERSION:
+        return serialized_tournament
+
+    compact = dict(serialized_tournament)
+    compact['players'] = reference_players(serialized_tournament['players'])
+
+    return compact
+
+
+def list_tournaments() -> list:
+    """Read the summaries of all tournaments in the catalog (parsed again only if the file changed)
+
+    return: list of summaries (dictionaries, read-only)
+    """
+
+    return read_table(CATALOG_FILE, "table_catalog")
+
+
+def iter_tournaments():
+    """Stream the catalog entries one by one (the catalog is parsed at most once, tournaments are not read)
+
+    return: generator of summaries (dictionaries, read-only)
+    """
+
+    data = read_json_cached(CATALOG_FILE)
+    if not data:
+        return
+
+    yield from data.get("table_catalog", {}).values()
+
+
+def find_summary(tour_name: str) -> dict:
+    """Find the catalog entry of a tournament
+
+    param tour_name: name of the tournament
+    return: the summary, or an empty dictionary if not found
+    """
+
+    for summary in iter_tournaments():
+        if summary['name'] == tour_name:
+            return summary
+
+    return {}
+
+
+def save_tournament(serialized_tournament: dict) -> bool:
+    """Write a tournament in its own shard and update the catalog
+
+    param serialized_tournament: serialized tournament (dictionary)
+    return: True in any case in this version
+    """
+
+    compact = compact_tournament(serialized_tournament)
+    summary = summarize_tournament(compact)
+
+    # Rewrite the shard: only this tournament is touched
+    with open_db_for_write(os.path.join(TOURNAMENTS_FOLDER, summary['file'])) as db:
+        table = db.table("table_tournament")
+        table.truncate()
+        table.insert(compact)
+
+    # Then the catalog entry
+    with open_db_for_write(CATALOG_FILE) as db:
+        catalog = db.table("table_catalog")
+        my_query = Query()
+        catalog.upsert(summary, my_query.name == summary['name'])
+
+    # A tournament saved again leaves the archive
+    remove_file(archive_path(summary['file']))
+
+    return True
+
+
+def rewrite_tournament(summary: dict, serialized_tournament: dict) -> None:
+    """Write a stored tournament again where it is: its shard, or the archive (it stays archived)
+
+    param summary: its current catalog entry
+    param serialized_tournament: serialized tournament in the current schema
+    return: Nothing
+    """
+
+    if not summary.get('archived', False):
+        save_tournament(serialized_tournament)
+        return
+
+    compact = compact_tournament(serialized_tournament)
+    new_summary = summarize_tournament(compact)
+    new_summary['archived'] = True
+    write_archive(summary['file'], compact)
+    with open_db_for_write(CATALOG_FILE) as db:
+        my_query = Query()
+        db.table("table_catalog").update(new_summary, my_query.name == summary['name'])
+
+    return
+
+
+def stored_ids_by_name() -> dict:
+    """IDs of the player table by player name
+
+    return: {(first name, last name): player ID}
+    """
+
+    return {(player['first_name'], player['last_name']): player_id
+            for player_id, player in stored_players_by_id().items()}
+
+
+def upgrade_document(serialized_tournament: dict) -> dict:
+    """Bring a stored tournament to the current schema: players of documents written before IDs existed are
+    given the ID of the stored player bearing the same name (see schema.upgrade_v1_to_v2)
+
+    param serialized_tournament: document read from the database (read-only)
+    return: the upgraded document (the input itself if it is already up to date)
+    """
+
+    ids_by_name = None
+    if serialized_tournament.get('schema', 1) < 2:
+        ids_by_name = stored_ids_by_name()
+
+    return schema.upgrade_tournament(serialized_tournament, ids_by_name)
+
+
+def read_stored_tournament(summary: dict) -> dict:
+    """Read a tournament as it was written, from its shard or from the archive
+
+    param summary: catalog entry of the tournament
+    return: the serialized tournament (read-only, not upgraded), or an empty dictionary if not found
+    """
+
+    # Archived tournaments are decompressed on demand
+    if summary.get('archived', False):
+        return read_archive(summary['file'])
+
+    path = os.path.join(TOURNAMENTS_FOLDER, summary['file'])
+    if not os.path.exists(path):
+        notify(f"Missing file for tournament {summary['name']}")
+        return {}
+
+    documents = read_table(path, "table_tournament")
+    if not documents:
+        return {}
+
+    return documents[0]
+
+
+def load_tournament(tour_name: str) -> dict:
+    """Read a tournament from its shard (or from the archive), upgraded to the current schema
+
+    param tour_name: name of the tournament
+    return: the serialized tournament (read-only), or an empty dictionary if not found
+    """
+
+    summary = find_summary(tour_name)
+    if not summary:
+        return {}
+
+    serialized_tournament = read_stored_tournament(summary)
+    if not serialized_tournament:
+        return {}
+
+    return upgrade_document(serialized_tournament)
+
+
+def load_resolved_tournament(tour_name: str) -> tuple:
+    """Read a tournament and complete its players from the player table, in one go (storage thread)
+
+    param tour_name: name of the tournament
+    return: (serialized tournament with complete players, IDs of the players missing from the player table),
+            ({}, []) if not found
+    """
+
+    serialized_tournament = load_tournament(tour_name)
+    if not serialized_tournament:
+        return {}, []
+
+    missing = missing_players(serialized_tournament['players'])
+    resolved_tournament = {**serialized_tournament, 'players': resolve_players(serialized_tournament['players'])}
+
+    return resolved_tournament, missing
+
+
+def upgrade_stored_tournaments() -> int:
+    """Rewrite the tournaments written by former versions in the current schema (with their catalog entry)
+
+    return: number of rewritten tournaments
+    """
+
+    upgraded = 0
+    for summary in list_tournaments():
+        serialized_tournament = read_stored_tournament(summary)
+        if not serialized_tournament:
+            continue
+
+        # Up to date documents are returned as is (their catalog entry or their players may still be outdated)
+        upgraded_tournament = upgrade_document(serialized_tournament)
+        compact = compact_tournament(upgraded_tournament)
+        new_summary = summarize_tournament(compact)
+        new_summary['archived'] = summary.get('archived', False)
+        if compact == serialized_tournament and new_summary == summary:
+            continue
+
+        rewrite_tournament(summary, upgraded_tournament)
+        upgraded += 1
+
+    return upgraded
+
+
+def delete_tournament(tour_name: str) -> bool:
+    """Delete a tournament: catalog entry and shard
+
+    param tour_name: name of the tournament
+    return: True if it was found
+    """
+
+    summary = find_summary(tour_name)
+    if not summary:
+        return False
+
+    with open_db_for_write(CATALOG_FILE) as db:
+        my_query = Query()
+        db.table("table_catalog").remove(my_query.name == tour_name)
+
+    remove_file(os.path.join(TOURNAMENTS_FOLDER, summary['file']))
+    remove_file(archive_path(summary['file']))
+
+    return True
+
+
+def archive_tournament(tour_name: str) -> bool:
+    """Move a finished tournament from its shard to the compressed archive
+
+    param tour_name: name of the tournament
+    return: True if it was archived
+    """
+
+    summary = find_summary(tour_name)
+    if not summary or summary.get('archived', False):
+        return False
+
+    if not summary['tournament_finished']:
+        notify(f"Tournament {tour_name} is not finished, it cannot be archived")
+        return False
+
+    serialized_tournament = load_tournament(tour_name)
+    if not serialized_tournament:
+        return False
+
+    # Compressed copy first, then flag the catalog entry and only then remove the shard
+    write_archive(summary['file'], serialized_tournament)
+
+    with open_db_for_write(CATALOG_FILE) as db:
+        my_query = Query()
+        db.table("table_catalog").update({'archived': True}, my_query.name == tour_name)
+
+    remove_file(os.path.join(TOURNAMENTS_FOLDER, summary['file']))
+
+    return True
+
+
+def archive_finished_tournaments() -> int:
+    """Archive every finished tournament still in the hot storage
+
+    return: number of archived tournaments
+    """
+
+    archived = 0
+    for summary in list_tournaments():
+        if summary['tournament_finished'] and not summary.get('archived', False):
+            if archive_tournament(summary['name']):
+                archived += 1
+
+    return archived
+
+
+def merge_players(serialized_players: list) -> dict:
+    """Add players of a former database to the player table: players already stored (same name) keep their ID,
+    the others get new IDs (former IDs were only valid in the former database)
+
+    param serialized_players: players of the former database
+    return: {(first name, last name): ID in the player table} for every stored player
+    """
+
+    stored_players = load_players()
+    ids_by_name = {(player['first_name'], player['last_name']): player['player_id']
+                   for player in stored_players if player.get('player_id')}
+    next_id = stored_next_id()
+
+    merged_players = list(stored_players)
+    for player in serialized_players:
+        name = (player['first_name'], player['last_name'])
+        if name in ids_by_name:
+            continue
+        merged_players.append({**schema.upgrade_player(dict(player)), 'player_id': next_id})
+        ids_by_name[name] = next_id
+        next_id += 1
+
+    save_players(merged_players, next_id)
+
+    return ids_by_name
+
+
+def migrate_monolithic(db_name: str = DB_MONOLITHIC) -> bool:
+    """Split a former single-file database into the sharded layout
+
+    param db_name: path of the former database
+    return: False if there is nothing to migrate
+    """
+
+    if not os.path.exists(db_name):
+        notify(f"{db_name} does not exist")
+        return False
+
+    db = TinyDB(db_name)
+    serialized_players = db.table("table_players").all()
+    serialized_tournaments = db.table("table_tournament").all()
+    db.close()
+
+    if not serialized_players and not serialized_tournaments:
+        notify(f"Nothing to migrate in {db_name}")
+        return False
+
+    # Stored players are kept with their ID (stored tournaments reference them), the others are added
+    ids_by_name = merge_players(serialized_players) if serialized_players else stored_ids_by_name()
+
+    # Former tournaments are written in the current schema, their players under the IDs of the player table
+    for serialized_tournament in serialized_tournaments:
+        save_tournament(schema.upgrade_tournament(dict(serialized_tournament), ids_by_name))
+
+    notify(f"Migrated {len(serialized_players)} players and {len(serialized_tournaments)} tournaments")
+    return True
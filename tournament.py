@@ -1,18 +1,27 @@
 """
 Chess Tournament Manager
 OpenClassroom Project 4
-Class implementing a tournament - following swiss-type rules
+Class implementing a tournament - following swiss-type rules, as a round-robin or as an arena
 """
 
-from round import Round
+from round import Round, RESULT_SCORES
 from player_list import PlayerList
 from player import Player
+from berger import berger_schedule
+from arena import ArenaQueue
 import view
-from tinydb import TinyDB
-from tinydb import Query
+import storage
+import async_storage
+import schema
+import round_timing
+import player_stats
+import head_to_head
+import validation
+from errors import ValidationError, InvalidChoiceError, InvalidNumberError, TournamentStateError
+from rwlock import ReadWriteLock, reader, writer
 import copy
 import re
-import datetime
+import threading
 
 
 class Tournament:
@@ -21,8 +30,10 @@ class Tournament:
         self.players = PlayerList()
         self.current_round = Round()
         self.previous_rounds = []
+        self.played_pairs = set()
         self.round_number = 0
         self.max_round = 4
+        self.pairing_system = "swiss"
         self.tournament_finished = False
         self.tournament_started = False
         self.time_control = ""
@@ -32,85 +43,143 @@ class Tournament:
         self.start_date = ""
         self.end_date = ""
 
+        # Round-robin: all rounds computed at start, each round = flat list [white ID, black ID, white ID, ...]
+        self.schedule = []
+
+        # Arena: players waiting for an opponent, players in a game, players who left for a while,
+        # and whether the arena is closing (no new game, it ends with the last game in progress)
+        self.arena = ArenaQueue()
+        self.arena_playing = set()
+        self.arena_paused = set()
+        self.arena_closing = False
+
+        # Unsaved changes, cached serialized form (None = must be rebuilt),
+        # and who to tell when a change happens (autosave)
+        # The round and the player list keep their own cache and report their changes here
+        self.dirty = False
+        self.serialized = None
+        self.on_change = None
+        self.players.on_change = self.mark_dirty
+        self.current_round.on_change = self.mark_dirty
+
+        # Many threads may read the tournament at once, one at a time modifies it (the round, the arena
+        # queue and the sets above are only reached through the tournament, its lock protects them too)
+        # The player list has its own lock, always taken after this one
+        # Helpers only called from locked methods (create_match_list, add_played_pair...) do not lock again
+        # Readers filling the serialized cache at the same time take turns on cache_lock
+        self.lock = ReadWriteLock()
+        self.cache_lock = threading.Lock()
+
+    def mark_dirty(self) -> None:
+        """Record a change that was not saved yet, drop the cached serialized form and notify the listener
+
+        return: Nothing
+        """
+
+        self.dirty = True
+        self.serialized = None
+        if self.on_change is not None:
+            self.on_change()
+
+        return
+
+    @reader
+    def is_saveable(self) -> bool:
+        """Check silently whether the tournament can be saved (started, first round launched)
+
+        return: True/False
+        """
+
+        return self.tournament_started and self.round_number != 0
+
+    @writer
     def set_dates(self, start_day: int, start_mon: int, start_year: int,
                   end_day: int, end_mon: int, end_year: int):
         """Sets the start/stop dates for a tournament
 
         param name: alphanumeric characters + spaces only
-        return: False if invalid/incoherent dates
+        return: True, raises InvalidDateError if the dates are invalid/incoherent
         """
 
-        # Create dates and check validity
-        try:
-            start_datetime = datetime.datetime(year=start_year, month=start_mon, day=start_day)
-            end_datetime = datetime.datetime(year=end_year, month=end_mon, day=end_day)
-        except ValueError:
-            print("Invalid dates")
-            return False
-
-        # Check whether the end date comes after the start date
-        if start_datetime.date() > end_datetime.date():
-            print("End date must come after start date")
-            return False
+        # Create dates and check validity, then whether the end date comes after the start date
+        start_date = validation.build_date("start_date", start_day, start_mon, start_year)
+        end_date = validation.build_date("end_date", end_day, end_mon, end_year)
+        validation.check_dates(start_date, end_date)
 
-        # Convert dates in readable format to store them
-        self.start_date = start_datetime.strftime("%A, %B the %dth, %Y")
-        self.end_date = end_datetime.strftime("%A, %B the %dth, %Y")
+        # Store sortable ISO-8601 dates ("YYYY-MM-DD"), the view formats them
+        self.start_date = start_date.isoformat()
+        self.end_date = end_date.isoformat()
+        self.mark_dirty()
 
         return True
 
+    @writer
     def set_name(self, name: str):
         """Sets the name of the tournament (<= 25 characters)
 
         param name: alphanumeric characters + spaces only
-        return: False if too long
+        return: True, raises InvalidNameError if too long
         """
 
         # Validity check
-        if len(name) > 25:
-            print("Tournament name must be 25 characters long at most")
-            return False
+        validation.check_tournament_name(name)
 
         pattern = re.compile(r'[^a-zA-Z0-9\s]')
         self.name = re.sub(pattern, '', name)
+        self.mark_dirty()
 
         return True
 
+    @writer
     def set_location(self, location: str):
         """Sets the location of the tournament (<= 50 characters)
 
-        return: False if too long
+        return: True, raises InvalidNameError if too long
         """
 
         # Validity check
-        if len(location) > 50:
-            print("Tournament location must be 50 characters long at most")
-            return False
+        validation.check_location(location)
 
         self.location = location
+        self.mark_dirty()
 
         return True
 
+    @writer
     def set_time_control(self, time_control: int) -> bool:
         """Sets the type of time control
 
         param time_control: 1 = "rapid" / 2 = "blitz" / 3 = "bullet"
-        return: False if unknown time_control
+        return: True, raises InvalidChoiceError if unknown time_control
         """
 
         # Test allowed values and translate them
-        if time_control == 1:
-            self.time_control = "rapid"
-        elif time_control == 2:
-            self.time_control = "blitz"
-        elif time_control == 3:
-            self.time_control = "bullet"
-        else:
-            print("Unknown time control value")
-            return False
+        self.time_control = validation.choice_from_menu("time_control", time_control, validation.TIME_CONTROLS)
 
+        self.mark_dirty()
         return True
 
+    @writer
+    def set_pairing_system(self, pairing_system: int) -> bool:
+        """Sets how players are paired (cannot change once the tournament started)
+
+        param pairing_system: 1 = "swiss" (8 players, 4 rounds) / 2 = "round_robin" / 3 = "double_round_robin"
+                              / 4 = "arena" (players paired as soon as they are available)
+        return: True, raises TournamentStateError if the tournament already started, InvalidChoiceError if unknown
+                pairing system
+        """
+
+        if self.tournament_started:
+            raise TournamentStateError("pairing_system", "Cannot change the pairing system of a started tournament")
+
+        # Test allowed values and translate them
+        self.pairing_system = validation.choice_from_menu("pairing_system", pairing_system,
+                                                          validation.PAIRING_SYSTEMS)
+
+        self.mark_dirty()
+        return True
+
+    @writer
     def set_description(self, description: str) -> bool:
         """Sets the description for the tournament
 
@@ -119,9 +188,11 @@ class Tournament:
         """
 
         self.description = description
+        self.mark_dirty()
 
         return True
 
+    @writer
     def clear_rounds(self) -> bool:
         """Clean all data related to rounds
 
@@ -133,9 +204,17 @@ class Tournament:
 
         # Empty list of played rounds
         self.previous_rounds.clear()
+        self.played_pairs.clear()
+        self.schedule = []
+        self.arena.clear()
+        self.arena_playing.clear()
+        self.arena_paused.clear()
+        self.arena_closing = False
+        self.mark_dirty()
 
         return True
 
+    @writer
     def clear_tournament(self) -> bool:
         """Clear all variables to start with a brand-new tournament
 
@@ -148,44 +227,52 @@ class Tournament:
         self.location = ""
         self.start_date = ""
         self.end_date = ""
+        self.pairing_system = "swiss"
 
         self.players.clean_list()
         self.round_number = 0
         self.tournament_finished = False
         self.tournament_started = False
         self.clear_rounds()
+        self.mark_dirty()
 
         return True
 
+    @writer
     def add_player(self, new_player: Player) -> bool:
         """Clear all variables to start with a brand-new tournament
 
-        return: True if successfully added to the list
+        return: True once added to the list, raises a ValidationError if the player cannot be added
         """
 
         return self.players.add_player(new_player.first_name, new_player.last_name, new_player.birth_day,
                                        new_player.birth_mon, new_player.birth_year, new_player.sex, new_player.rating,
-                                       0.0, insertion_sort=True)
+                                       0, insertion_sort=True, player_id=new_player.player_id)
 
+    @writer
     def remove_player(self, first_name: str, last_name: str) -> bool:
         """Finds a player by name and remove it from the tournament
 
-        return: True if found and removed, False if he was not there anyway
+        return: True once removed, raises PlayerNotFoundError if the player is not in this tournament
         """
 
         self.players.remove_player(first_name, last_name, False)
         return True
 
+    @writer
     def start_tournament(self) -> bool:
         """Check if all infos are valid to start a tournament -> launch round 1
 
         return: True if the tournament started
         """
 
-        # Mandatory number of players = 8
-        if self.players.get_number_of_players() != 8:
+        # Mandatory number of players = 8 for a swiss tournament, any number (> 2) for a round-robin or an arena
+        if self.pairing_system == "swiss" and self.players.get_number_of_players() != 8:
             print("There must be 8 players for a tournament")
             return False
+        if self.pairing_system != "swiss" and self.players.get_number_of_players() < 3:
+            print("There must be at least 3 players for a round-robin or an arena")
+            return False
 
         # A name must be defined
         if not self.name:
@@ -224,6 +311,16 @@ class Tournament:
         self.players.reset_scores()
         self.players.sort_list()
 
+        # Round-robin: players are seeded by rating and all rounds are computed now
+        # Arena: a single round collects all games, paired on the fly
+        if self.pairing_system == "swiss":
+            self.max_round = 4
+        elif self.pairing_system == "arena":
+            self.max_round = 1
+        else:
+            self.create_schedule()
+            self.max_round = len(self.schedule)
+
         # Name round, create match list, record launch time and print everything
         self.create_match_list()
         self.current_round.set_name("Round 1")
@@ -232,22 +329,57 @@ class Tournament:
         self.current_round.record_start_time()
 
         # Inform user and return
+        self.mark_dirty()
         self.print_current_round()
         print("First round started!")
         return True
 
-    def print_players(self, sort_1: int, sort_2: int) -> None:
+    @reader
+    def print_players(self, sort_1: int, sort_2: int, offset: int = 0, size: int = 0) -> None:
         """Print the list of players for this tournament
 
         param sort_1: print in : 1 = alphabetical order / 2 = rank order
         param sort_2: reorder list before leaving (same codes as sort_1)
+        param offset: index of the first player to print
+        param size: number of players on the page, 0 = all of them
         return: Nothing
         """
 
-        self.players.print_list(sort_1, sort_2)
+        self.players.print_list(sort_1, sort_2, offset, size)
 
         return
 
+    @reader
+    def print_standings(self, offset: int, size: int) -> None:
+        """Print a page of the current standings (maintained while results are entered)
+
+        param offset: index of the first player (0 = leader)
+        param size: number of players on the page, 0 = all of them
+        return: Nothing
+        """
+
+        self.players.print_standings(offset, size)
+
+        return
+
+    @reader
+    def print_player_position(self, first_name: str, last_name: str) -> bool:
+        """Print the current position of a player in the standings
+
+        return: False if the player is not in this tournament
+        """
+
+        index = self.players.find_player_by_names(first_name, last_name)
+        if index == -1:
+            print("User was not found in this tournament")
+            return False
+
+        position = self.players.get_position(self.players.get_player_id(index))
+        view.print_position(f"{first_name} {last_name}", position, self.players.get_number_of_players())
+
+        return True
+
+    @reader
     def print_tournament(self) -> None:
         """Print a summary of all round results for this tournament
 
@@ -265,6 +397,7 @@ class Tournament:
 
         return
 
+    @writer
     def next_round(self) -> bool:
         """Get ready for next round (print matches, store previous round...)
 
@@ -276,6 +409,10 @@ class Tournament:
             print("Cannot go to next round if the tournament did not start yet")
             return False
 
+        if self.pairing_system == "arena":
+            print("Arena games are paired as players finish, use arena_close to end the arena")
+            return False
+
         if not self.current_round.is_round_over():
             print("Round is not over")
             return False
@@ -290,16 +427,11 @@ class Tournament:
         print("Round finished - Results:")
         self.print_current_round()
 
-        # Update total scores in player list...
-        for match in self.current_round.match_list:
-            first_name_1 = match["first_name_1"]
-            first_name_2 = match["first_name_2"]
-            last_name_1 = match["last_name_1"]
-            last_name_2 = match["last_name_2"]
-            score_1 = match["score_1"]
-            score_2 = match["score_2"]
-            self.players.update_player_score(first_name_1, last_name_1, score_1)
-            self.players.update_player_score(first_name_2, last_name_2, score_2)
+        # Update total scores in player list and remember who played whom...
+        for player_id_1, player_id_2, score_1, score_2 in self.current_round.get_matches():
+            self.players.update_player_score(player_id_1, score_1)
+            self.players.update_player_score(player_id_2, score_2)
+            self.add_played_pair(player_id_1, player_id_2)
 
         # And sort the players according to the new results
         self.players.sort_list()
@@ -307,6 +439,7 @@ class Tournament:
         # Is the tournament finished?
         if self.round_number == self.max_round:
             self.tournament_finished = True
+            self.mark_dirty()
             print("Tournament is over!")
             return True
 
@@ -326,10 +459,34 @@ class Tournament:
         self.current_round.record_start_time()
 
         # Inform user and return
+        self.mark_dirty()
         print("New round:")
         self.print_current_round()
         return True
 
+    @reader
+    def get_timing_stats(self) -> dict:
+        """Duration statistics of the rounds played so far (see round_timing)
+
+        return: Dictionary
+        """
+
+        rounds = self.previous_rounds + [self.current_round.serialize_round()]
+
+        return round_timing.tournament_timing_stats(rounds)
+
+    @reader
+    def print_timing_stats(self) -> None:
+        """Print how long rounds and results took
+
+        return: Nothing
+        """
+
+        view.print_timing_stats(self.get_timing_stats())
+
+        return
+
+    @reader
     def print_current_round(self) -> None:
         """Print ongoing matches and results
 
@@ -342,141 +499,433 @@ class Tournament:
             return None
 
         serialize_round = self.current_round.serialize_round()
-        view.print_round(serialize_round)
+        view.print_round(serialize_round, self.players.names_by_id())
+
+        return
+
+    def add_played_pair(self, player_id_1: int, player_id_2: int) -> None:
+        """Remember that two players met during a previous round
+
+        param player_id_1: player 1 ID
+        param player_id_2: player 2 ID
+        return: Nothing
+        """
+
+        self.played_pairs.add((min(player_id_1, player_id_2), max(player_id_1, player_id_2)))
 
         return
 
-    def match_already_played(self, first_name_1: str, first_name_2: str, last_name_1: str, last_name_2: str) -> bool:
+    def match_already_played(self, player_id_1: int, player_id_2: int) -> bool:
         """Explores previous rounds to determine if a given match was already played
 
-        param first_name_1: player 1 first name
-        param first_name_2: player 2 first name
-        param last_name_1: player 1 last name
-        param last_name_2: player 2 last name
+        param player_id_1: player 1 ID
+        param player_id_2: player 2 ID
         return: True if the match has already been played
         """
 
-        # Explore all previous rounds...
-        for prev_round in self.previous_rounds:
-            # Loop over the list of matches
-            for match in prev_round["match_list"]:
-                if (match["first_name_1"] == first_name_1 and match["first_name_2"] == first_name_2
-                    and match["last_name_1"] == last_name_1 and match["last_name_2"] == last_name_2) or \
-                    (match["first_name_1"] == first_name_2 and match["first_name_2"] == first_name_1
-                     and match["last_name_1"] == last_name_2 and match["last_name_2"] == last_name_1):
-                    return True
+        return (min(player_id_1, player_id_2), max(player_id_1, player_id_2)) in self.played_pairs
+
+    def create_schedule(self) -> None:
+        """Compute all rounds of a round-robin (Berger tables), players being seeded in their current order
 
-        # If we arrived here, the match was not found
-        return False
+        return: Nothing
+        """
+
+        seeds = [self.players.get_player_id(i) for i in range(self.players.get_number_of_players())]
+        rounds = berger_schedule(len(seeds), self.pairing_system == "double_round_robin")
+
+        self.schedule = []
+        for boards in rounds:
+            self.schedule.append([seeds[seed] for board in boards for seed in board])
+
+        return
 
     def create_match_list(self) -> bool:
-        """Associate players in both groups to create four matches
+        """Associate players in both groups to create four matches (or read the round-robin schedule)
 
         return: Always true in this version
         """
 
+        # Arena: everybody joins the waiting queue
+        if self.pairing_system == "arena":
+            self.pair_arena([self.players.get_player_id(i) for i in range(self.players.get_number_of_players())])
+            return True
+
+        # Round-robin: matches and colors come from the schedule computed at start
+        if self.pairing_system != "swiss":
+            scheduled = self.schedule[self.round_number - 1]
+            for i in range(0, len(scheduled), 2):
+                self.current_round.add_match(scheduled[i], scheduled[i + 1], random_colors=False)
+            return True
+
         # Now we can associate players with each others
         for i in range(0, 4, 1):
-            first_name_1 = self.players.get_player(i).get_first_name()
-            last_name_1 = self.players.get_player(i).get_last_name()
+            player_id_1 = self.players.get_player_id(i)
 
-            # Store names for the first possible match we will encounter
-            free_first_name_2 = ""
-            free_last_name_2 = ""
+            # Store the first possible match we will encounter
+            free_player_id_2 = 0
 
             for j in range(4, 8, 1):
-                first_name_2 = self.players.get_player(j).get_first_name()
-                last_name_2 = self.players.get_player(j).get_last_name()
+                player_id_2 = self.players.get_player_id(j)
 
                 # Skip if player 2 was already selected for a match during a previous iteration
-                if not self.current_round.player_already_busy(first_name_2, last_name_2):
+                if not self.current_round.player_already_busy(player_id_2):
                     # Store the first possible match, in any case
-                    if not free_first_name_2:
-                        free_first_name_2 = first_name_2
-                        free_last_name_2 = last_name_2
+                    if not free_player_id_2:
+                        free_player_id_2 = player_id_2
 
                     # We found a match that was not played yet
-                    if not self.match_already_played(first_name_1, first_name_2, last_name_1, last_name_2):
-                        self.current_round.add_match(first_name_1, first_name_2, last_name_1, last_name_2)
+                    if not self.match_already_played(player_id_1, player_id_2):
+                        self.current_round.add_match(player_id_1, player_id_2)
                         break
 
                 # All combinations unsuccessfully tried - take first possibility by default
                 if j == 7:
-                    self.current_round.add_match(first_name_1, free_first_name_2, last_name_1, free_last_name_2)
+                    self.current_round.add_match(player_id_1, free_player_id_2)
+
+        return True
+
+    @writer
+    def pair_arena(self, available: list) -> list:
+        """Put players who became available in the arena queue and pair them with waiting players
+
+        param available: IDs of the players (paused players are left aside)
+        return: indexes of the new matches in the current round
+        """
+
+        if self.arena_closing:
+            return []
+
+        first_new = self.current_round.match_count()
+        for player_id in available:
+            if player_id in self.arena_paused or player_id in self.arena_playing:
+                continue
+            player = self.players.find_player_by_id(player_id)
+            self.arena.add(player_id, player.get_tournament_score(), player.get_rating())
+
+        # Only newcomers look for an opponent: the other waiting players could not be paired together
+        for player_id in available:
+            if not self.arena.is_waiting(player_id):
+                continue
+            game = self.arena.pair(player_id, self.played_pairs)
+            if game is not None:
+                self.start_arena_game(game[0], game[1])
+
+        return list(range(first_new, self.current_round.match_count()))
+
+    def start_arena_game(self, white_id: int, black_id: int) -> None:
+        """Add an arena game to the current round and to the history
+
+        param white_id: ID of the white player
+        param black_id: ID of the black player
+        return: Nothing
+        """
+
+        self.current_round.add_match(white_id, black_id, random_colors=False)
+        self.arena.record_game(white_id, black_id)
+        self.add_played_pair(white_id, black_id)
+        self.arena_playing.add(white_id)
+        self.arena_playing.add(black_id)
+
+        return
+
+    @writer
+    def set_arena_result(self, match_index: int, score_1: int, score_2: int) -> bool:
+        """Record the result of an arena game: scores are updated at once and both players are paired again
+
+        param match_index: index of the game in the current round
+        param score_1: white score in half-points
+        param score_2: black score in half-points
+        return: True, raises a ValidationError if the index or the scores are invalid or if the game already has
+                a result
+        """
+
+        self.check_arena_result(match_index, score_1, score_2)
+        player_id_1, player_id_2, _, _ = self.current_round.get_match(match_index)
+        self.current_round.set_match_result(match_index, score_1, score_2)
+
+        self.players.update_player_score(player_id_1, score_1)
+        self.players.update_player_score(player_id_2, score_2)
+        self.arena_playing.discard(player_id_1)
+        self.arena_playing.discard(player_id_2)
+
+        # A closing arena ends with its last game
+        if self.arena_closing:
+            if self.current_round.is_round_over():
+                self.finish_arena()
+            return True
+
+        self.print_arena_games(self.pair_arena([player_id_1, player_id_2]))
 
         return True
 
+    @writer
+    def set_arena_availability(self, first_name: str, last_name: str, available: bool) -> bool:
+        """A player leaves the arena for a while (no new game) or comes back (paired at once)
+
+        param available: False = leave, True = come back
+        return: False if the player is not in this tournament or if the arena is not running
+        """
+
+        if not self.tournament_started or self.pairing_system != "arena" or self.arena_closing:
+            print("No arena is running")
+            return False
+
+        index = self.players.find_player_by_names(first_name, last_name)
+        if index == -1:
+            print("User was not found in this tournament")
+            return False
+
+        player_id = self.players.get_player_id(index)
+        if available:
+            self.arena_paused.discard(player_id)
+            self.print_arena_games(self.pair_arena([player_id]))
+        else:
+            self.arena_paused.add(player_id)
+            self.arena.remove(player_id)
+        self.mark_dirty()
+
+        return True
+
+    @writer
+    def close_arena(self) -> bool:
+        """Stop pairing players: the arena ends with the last game in progress
+
+        return: False if no arena is running
+        """
+
+        if not self.tournament_started or self.pairing_system != "arena" or self.arena_closing:
+            print("No arena is running")
+            return False
+
+        self.arena_closing = True
+        self.arena.clear()
+        self.mark_dirty()
+
+        if self.current_round.is_round_over():
+            self.finish_arena()
+        else:
+            print("No new game will be paired, the arena ends with the last game in progress")
+
+        return True
+
+    @writer
+    def finish_arena(self) -> None:
+        """Close the arena round and the tournament
+
+        return: Nothing
+        """
+
+        self.current_round.record_stop_time()
+        self.players.sort_list()
+        self.tournament_finished = True
+        self.mark_dirty()
+        print("Arena is over!")
+
+        return
+
+    @reader
+    def print_arena_games(self, match_indexes: list) -> None:
+        """Print new arena games
+
+        param match_indexes: indexes of the games in the current round
+        return: Nothing
+        """
+
+        if not match_indexes:
+            return
+
+        names = self.players.names_by_id()
+        print("New games:")
+        for i in match_indexes:
+            view.print_match(self.current_round.get_match(i), i, names)
+        print("")
+
+        return
+
+    @reader
+    def print_arena_queue(self) -> None:
+        """Print who is waiting, playing or away in the arena
+
+        return: Nothing
+        """
+
+        names = self.players.names_by_id()
+        view.print_arena_queue([names[player_id] for player_id in self.arena.get_waiting()],
+                               [names[player_id] for player_id in self.arena_playing],
+                               [names[player_id] for player_id in self.arena_paused])
+
+        return
+
+    @writer
     def set_match_result(self, match_index: int, result_code: int):
         """Set match result (for the current round)
 
         param match_index: 1-4 (Visible in the list printed in the terminal)
         param result_code: 0-3 (nothing, victory white, victory black, equality)
-        return: False if index or code is invalid
+        return: True, raises TournamentStateError if the tournament did not start, a ValidationError if index or code
+                is invalid
         """
 
         # Make sure that the tournament is started/validated for this operation
         if not self.tournament_started:
-            print("Cannot set match result if the tournament did not start yet")
-            return None
+            raise TournamentStateError("tournament", "Cannot set match result if the tournament did not start yet")
 
-        # Translate result_code into scores
-        if result_code == 0:
-            score_1 = 0
-            score_2 = 0
-        elif result_code == 1:
-            score_1 = 1
-            score_2 = 0
-        elif result_code == 2:
-            score_1 = 0
-            score_2 = 1
-        elif result_code == 3:
-            score_1 = 0.5
-            score_2 = 0.5
-        else:
-            print("Invalid result code")
-            return False
+        # Translate result_code into scores (half-points)
+        validation.check_result_code(result_code)
+        score_1, score_2 = RESULT_SCORES[result_code]
+
+        if self.pairing_system == "arena":
+            return self.set_arena_result(match_index, score_1, score_2)
 
         return self.current_round.set_match_result(match_index, score_1, score_2)
 
-    def save_tournament(self) -> bool:
-        """Saves all tournament data in TinyDB
+    @writer
+    def set_match_results(self, results: list) -> list:
+        """Set the results of several matches of the current round, saved by the caller in one write
+        The whole batch is validated first: nothing is applied if one result is invalid
 
-        return: False if something went wrong
+        param results: list of (match index, result code 0-3)
+        return: list of ValidationError (index = match index), empty if the batch was applied
+        """
+
+        if not self.tournament_started:
+            return [TournamentStateError("tournament", "Cannot set match result if the tournament did not start yet")]
+
+        if not results:
+            return [ValidationError("results", "No result given")]
+
+        # Translate codes and check everything before touching the round
+        errors = []
+        scored_results = []
+        for match_index, result_code in results:
+            try:
+                validation.check_result_code(result_code)
+                scored_results.append((match_index, *RESULT_SCORES[result_code]))
+            except ValidationError as error:
+                error.index = match_index
+                errors.append(error)
+        errors += self.current_round.check_match_results(scored_results)
+        if self.pairing_system == "arena":
+            errors += self.check_arena_results(scored_results)
+
+        if errors:
+            return errors
+
+        # Arena games are taken one by one: each result pairs its players again
+        if self.pairing_system == "arena":
+            for match_index, score_1, score_2 in scored_results:
+                self.set_arena_result(match_index, score_1, score_2)
+        else:
+            self.current_round.set_match_results(scored_results)
+
+        return []
+
+    def check_arena_result(self, match_index: int, score_1: int, score_2: int) -> None:
+        """Check an arena result: only a game in progress, only an actual result
+
+        param match_index: index of the game in the current round
+        param score_1: white score in half-points
+        param score_2: black score in half-points
+        return: Nothing, raises a ValidationError
+        """
+
+        validation.check_match_index(match_index, self.current_round.match_count())
+
+        _, _, previous_score_1, previous_score_2 = self.current_round.get_match(match_index)
+        if previous_score_1 + previous_score_2 != 0:
+            raise InvalidChoiceError("match_index", "The result of this arena game was already recorded")
+
+        if score_1 + score_2 == 0:
+            raise InvalidNumberError("scores", "An arena game needs a result")
+
+        return
+
+    @reader
+    def check_arena_results(self, results: list) -> list:
+        """Check a batch of arena results: only games in progress, only actual results
+
+        param results: list of (match index, white score, black score)
+        return: list of ValidationError (index = match index), invalid indexes are reported by the round
+        """
+
+        errors = []
+        for match_index, score_1, score_2 in results:
+            if match_index < 0 or match_index >= self.current_round.match_count():
+                continue
+            try:
+                self.check_arena_result(match_index, score_1, score_2)
+            except ValidationError as error:
+                error.index = match_index
+                errors.append(error)
+
+        return errors
+
+    def snapshot_for_save(self) -> dict:
+        """Take the serialized form to be written (never modified afterwards): from now on the tournament
+        counts as saved, the write itself may happen later on the storage thread
+
+        return: serialized tournament, empty dictionary if nothing changed, None if it cannot be saved
         """
 
         # Make sure that the tournament is started/validated for this operation
         if not self.tournament_started:
             print("Cannot save if the tournament did not start yet")
-            return False
+            return None
 
         # If tournament was not launched, save impossible (safer approach)
         if self.round_number == 0:
             print("Cannot save tournament, first round must be launched")
-            return False
+            return None
 
-        # Get infos to store
-        serialized_tournament = self.serialize_tournament()
+        # Nothing changed since the last save/load: nothing to write (unless the stored copy was deleted,
+        # the catalog is read by the storage thread, after the deletions still queued)
+        stored = not self.dirty and async_storage.run_sync(storage.find_summary, self.name)
+
+        # Get infos to store, the shard of this tournament only will be overwritten
+        serialized_tournament = self.take_snapshot(force=not stored)
+
+        return serialized_tournament or {}
+
+    @writer
+    def take_snapshot(self, force: bool = False) -> dict:
+        """Serialize the tournament and mark it as saved in one step: the dirty flag is tested and cleared
+        under the write lock, so that two savers (REPL, autosave) never take the same change
+
+        param force: True = even if nothing changed since the last snapshot
+        return: serialized tournament, None if nothing changed or if it cannot be saved (silent)
+        """
+
+        if not self.is_saveable() or not (self.dirty or force):
+            return None
 
-        # Open table in database
-        db = TinyDB("ChessDB.json")
-        table_tournaments = db.table("table_tournament")
+        self.dirty = False
 
-        # Search/delete by tournament name
-        my_query = Query()
-        table_tournaments.remove(my_query.name == self.name)
+        return self.serialize_tournament()
 
-        # Overwrite infos
-        table_tournaments.insert(serialized_tournament)
+    @staticmethod
+    def write_serialized(serialized_tournament: dict) -> bool:
+        """Store a serialized tournament, then update the statistics of its players and the head-to-head index
 
-        # Close the database
-        db.close()
+        param serialized_tournament: result of serialize_tournament()
+        return: False if something went wrong
+        """
+
+        if not storage.save_tournament(serialized_tournament):
+            return False
+        player_stats.update_tournament_stats(serialized_tournament)
+        head_to_head.update_tournament_games(serialized_tournament)
 
         return True
 
+    @writer
     def load_tournament(self, serialized_tournament: dict) -> bool:
         """Loads all tournament data from TinyDB
 
-        return: False if something went wrong
+        param serialized_tournament: stored tournament, its players completed from the player table
+                                     by the storage thread (see storage.load_resolved_tournament)
+        return: error report {index of the player in the document: list of ValidationError} for the players
+                that could not be added, empty if everything was loaded
         """
 
         # Database OK, we can safely clean the tournament to overwrite its content
@@ -487,6 +936,7 @@ class Tournament:
         self.description = serialized_tournament["description"]
         self.round_number = serialized_tournament["round_number"]
         self.max_round = serialized_tournament["max_round"]
+        self.pairing_system = serialized_tournament["pairing_system"]
         self.time_control = serialized_tournament["time_control"]
         self.location = serialized_tournament["location"]
         self.start_date = serialized_tournament["start_date"]
@@ -497,28 +947,67 @@ class Tournament:
         self.current_round.set_name(f"Round {self.round_number}")
         self.current_round.load_round(serialized_tournament["current_round"])
 
-        # Copy the list of finished rounds
+        # Copy the list of finished rounds and remember who already played whom
         self.previous_rounds = copy.deepcopy(serialized_tournament["round_list"])
-
-        # Load the list of participants from the dedicated table
-        for player in serialized_tournament["players"]:
-            self.players.add_player(first_name=player['first_name'],
-                                    last_name=player['last_name'],
-                                    birth_day=player['birth_day'],
-                                    birth_mon=player['birth_mon'],
-                                    birth_year=player['birth_year'],
-                                    sex=player['sex'],
-                                    rating=player['rating'],
-                                    tournament_score=player['tournament_score'],
-                                    insertion_sort=True)
+        self.schedule = copy.deepcopy(serialized_tournament["schedule"])
+        self.arena_paused = set(serialized_tournament["arena_paused"])
+        self.arena_closing = serialized_tournament["arena_closing"]
+        for prev_round in self.previous_rounds:
+            for player_id_1, player_id_2 in zip(prev_round["white_ids"], prev_round["black_ids"]):
+                self.add_played_pair(player_id_1, player_id_2)
+
+        # Load the list of participants: current infos from the player table, score from the tournament
+        report = {}
+        for i, player in enumerate(serialized_tournament["players"]):
+            try:
+                self.players.add_player(first_name=player['first_name'],
+                                        last_name=player['last_name'],
+                                        birth_day=player['birth_day'],
+                                        birth_mon=player['birth_mon'],
+                                        birth_year=player['birth_year'],
+                                        sex=player['sex'],
+                                        rating=player['rating'],
+                                        tournament_score=player['half_points'],
+                                        insertion_sort=True,
+                                        player_id=player['player_id'])
+            except ValidationError as error:
+                report[i] = [error]
 
         # This flag is always on for saved tournaments (don't need to save it)
         self.tournament_started = True
 
-        return True
+        # Tournament in memory matches the database
+        self.dirty = False
+        self.serialized = None
+
+        # Arena: replay the history, then pair the players who are not in a game
+        if self.pairing_system == "arena":
+            self.reload_arena()
+
+        return report
+
+    def reload_arena(self) -> None:
+        """Rebuild the arena queue and history from the games of the current round
+
+        return: Nothing
+        """
+
+        for player_id_1, player_id_2, score_1, score_2 in self.current_round.get_matches():
+            self.arena.record_game(player_id_1, player_id_2)
+            self.add_played_pair(player_id_1, player_id_2)
+            if score_1 + score_2 == 0:
+                self.arena_playing.add(player_id_1)
+                self.arena_playing.add(player_id_2)
+
+        if not self.tournament_finished and not self.arena_closing:
+            self.pair_arena([self.players.get_player_id(i) for i in range(self.players.get_number_of_players())])
 
+        return
+
+    @reader
     def serialize_tournament(self) -> dict:
         """Returns a serialized object containing the whole description for a tournament
+        The result is cached until something changes, do not modify it
 
         return: Dictionary
         """
@@ -528,30 +1017,43 @@ class Tournament:
             print("Cannot serialize if the tournament did not start yet")
             return {}
 
-        # Prepare previous rounds and current round
-        round_list = copy.deepcopy(self.previous_rounds)
-        current_round_serialized = self.current_round.serialize_round()
+        # Nothing changed since the last call
+        with self.cache_lock:
+            if self.serialized is None:
+                self.serialized = self.build_serialized_tournament()
 
-        # Create the list of players
-        tournament_players = []
-        for i in range(8):
-            player = self.players.get_player(i)
-            serialized_player = player.serialize_player()
-            tournament_players.append(serialized_player)
+            return self.serialized
+
+    def build_serialized_tournament(self) -> dict:
+        """Serialize the tournament without the cache (see serialize_tournament)
+
+        return: Dictionary
+        """
+
+        # Previous rounds never change once stored, current round and players come from their own cache
+        round_list = list(self.previous_rounds)
+        current_round_serialized = self.current_round.serialize_round()
+        tournament_players = self.players.serialize_list()
 
         serialized_tournament = {
+            'schema': schema.SCHEMA_VERSION,
             'name': self.name,
             'location': self.location,
             'start_date': self.start_date,
             'end_date': self.end_date,
             'round_number': self.round_number,
             'max_round': self.max_round,
+            'pairing_system': self.pairing_system,
+            'schedule': self.schedule,
+            'arena_paused': sorted(self.arena_paused),
+            'arena_closing': self.arena_closing,
             'time_control': self.time_control,
             'description': self.description,
             'tournament_finished': self.tournament_finished,
             'round_list': round_list,
             'current_round': current_round_serialized,
-            'players': tournament_players
+            'players': tournament_players,
+            'timing_stats': round_timing.tournament_timing_stats(round_list + [current_round_serialized])
         }
 
         return serialized_tournament
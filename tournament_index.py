@@ -0,0 +1,207 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Secondary indexes over the tournament catalog and a small filter language to query them
+Example of filter: time=blitz location=Lyon start>=2023-03 start<=2023-06 finished=no
+"""
+
+import re
+import bisect
+import shlex
+import datetime
+import storage
+import schema
+
+
+# Filter fields and the comparison operators they accept
+FILTER_FIELDS = {
+    'location': ('=',),
+    'time': ('=',),
+    'finished': ('=',),
+    'start': ('=', '>=', '<=', '>', '<')
+}
+
+FILTER_PATTERN = re.compile(r'^([a-z_]+)(>=|<=|=|>|<)(.+)$')
+DATE_PATTERN = re.compile(r'^\d{4}(-\d{2}(-\d{2})?)?$')
+
+
+def date_key(stored_date: str) -> str:
+    """Turn a stored tournament date into a sortable key
+
+    param stored_date: date as stored in the catalog ("YYYY-MM-DD", or prose if not upgraded yet)
+    return: "YYYY-MM-DD", or an empty string if the date cannot be read
+    """
+
+    iso_date = schema.legacy_to_iso(stored_date, False)
+    try:
+        datetime.date.fromisoformat(iso_date)
+    except ValueError:
+        return ""
+
+    return iso_date
+
+
+def date_bounds(value: str) -> tuple:
+    """First and last sortable keys covered by a (possibly partial) date
+
+    param value: "YYYY", "YYYY-MM" or "YYYY-MM-DD"
+    return: (lower key, upper key)
+    """
+
+    # Keys are compared as strings: "-31" is above any day of any month
+    lower = value + "-01-01"[len(value) - 4:]
+    upper = value + "-12-31"[len(value) - 4:]
+
+    return lower, upper
+
+
+def parse_filter(text: str) -> list:
+    """Parse a filter expression: conditions separated by spaces, all of them must match
+
+    param text: e.g. 'location="Saint Etienne" finished=no start>=2023-03'
+    return: list of (field, operator, value), or None if the expression is invalid
+    """
+
+    try:
+        tokens = shlex.split(text)
+    except ValueError:
+        print("Invalid filter: unbalanced quotes")
+        return None
+
+    conditions = []
+    for token in tokens:
+        match = FILTER_PATTERN.match(token)
+        if match is None:
+            print(f"Invalid condition: {token}")
+            return None
+
+        field, operator, value = match.groups()
+        if field not in FILTER_FIELDS:
+            print(f"Unknown field {field}, use one of: {', '.join(FILTER_FIELDS)}")
+            return None
+        if operator not in FILTER_FIELDS[field]:
+            print(f"Operator {operator} not allowed for field {field}")
+            return None
+        if field == 'finished' and value not in ('yes', 'no'):
+            print("Field finished expects yes or no")
+            return None
+        if field == 'start' and not DATE_PATTERN.match(value):
+            print("Field start expects YYYY, YYYY-MM or YYYY-MM-DD")
+            return None
+
+        conditions.append((field, operator, value))
+
+    return conditions
+
+
+class TournamentIndex:
+
+    def __init__(self):
+        # Parsed catalog the indexes were built from (rebuilt when the file changes)
+        self.source = None
+        self.summaries = {}
+        self.by_location = {}
+        self.by_time_control = {}
+        self.by_finished = {}
+        self.by_start = []
+
+    def refresh(self) -> None:
+        """Rebuild the indexes if the catalog changed on disk (a stat call otherwise)
+
+        return: Nothing
+        """
+
+        data = storage.read_json_cached(storage.CATALOG_FILE)
+        if data is not None and data is self.source:
+            return
+
+        self.source = data
+        self.summaries.clear()
+        self.by_location.clear()
+        self.by_time_control.clear()
+        self.by_finished.clear()
+        self.by_start = []
+
+        if not data:
+            return
+
+        # Only catalog summaries are used: tournament files are never opened
+        for summary in data.get("table_catalog", {}).values():
+            name = summary['name']
+            self.summaries[name] = summary
+            self.by_location.setdefault(summary['location'].lower(), set()).add(name)
+            self.by_time_control.setdefault(summary['time_control'], set()).add(name)
+            self.by_finished.setdefault(summary['tournament_finished'], set()).add(name)
+            start = date_key(summary['start_date'])
+            if start:
+                self.by_start.append((start, name))
+        self.by_start.sort()
+
+        return
+
+    def start_range(self, lower: str, upper: str) -> set:
+        """Names of the tournaments starting from a key (included) up to another (excluded) - binary search
+
+        param lower: lowest key
+        param upper: first key out of the range
+        return: set of names
+        """
+
+        # (key,) sorts before every (key, name) entry
+        first = bisect.bisect_left(self.by_start, (lower,))
+        last = bisect.bisect_left(self.by_start, (upper,))
+
+        return {name for _, name in self.by_start[first:last]}
+
+    def candidates(self, condition: tuple) -> set:
+        """Names of the tournaments matching one condition, read from the matching index
+
+        param condition: (field, operator, value)
+        return: set of names
+        """
+
+        field, operator, value = condition
+
+        if field == 'location':
+            return self.by_location.get(value.lower(), set())
+        if field == 'time':
+            return self.by_time_control.get(value, set())
+        if field == 'finished':
+            return self.by_finished.get(value == 'yes', set())
+
+        # Date ranges: partial dates cover a whole month or year, "~" sorts after any digit
+        lower, upper = date_bounds(value)
+        if operator == '=':
+            return self.start_range(lower, upper + "~")
+        if operator == '>=':
+            return self.start_range(lower, "~")
+        if operator == '>':
+            return self.start_range(upper + "~", "~")
+        if operator == '<=':
+            return self.start_range("", upper + "~")
+
+        return self.start_range("", lower)
+
+    def query(self, conditions: list) -> list:
+        """Find the tournaments matching all conditions by intersecting the indexes
+
+        param conditions: list of (field, operator, value), as returned by parse_filter()
+        return: list of catalog summaries, sorted by start date
+        """
+
+        self.refresh()
+
+        names = None
+        for condition in conditions:
+            matching = self.candidates(condition)
+            names = set(matching) if names is None else names & matching
+            if not names:
+                return []
+
+        if names is None:
+            names = set(self.summaries)
+
+        results = [self.summaries[name] for name in names]
+        results.sort(key=lambda summary: (date_key(summary['start_date']), summary['name']))
+
+        return results
@@ -0,0 +1,309 @@
+"""
+Chess Tournament Manager
+OpenClassroom Project 4
+Checks shared by the model setters and by the batch validator
+Each check raises a ValidationError (see errors.py) and never prints anything
+The batch functions check thousands of stored records in one pass and return an error report
+"""
+
+import datetime
+from errors import ValidationError, InvalidNameError, InvalidDateError, InvalidChoiceError, InvalidNumberError
+
+
+TIME_CONTROLS = ("rapid", "blitz", "bullet")
+PAIRING_SYSTEMS = ("swiss", "round_robin", "double_round_robin", "arena")
+
+
+def check_person_name(field: str, name: str) -> None:
+    """Check the raw length of a first or last name (it is formatted afterwards)
+
+    param field: "first_name" or "last_name"
+    param name: name as typed
+    return: Nothing, raises InvalidNameError
+    """
+
+    if not isinstance(name, str) or len(name) < 1 or len(name) > 25:
+        label = "First name" if field == "first_name" else "Last name"
+        raise InvalidNameError(field, f"{label} length invalid")
+
+    return
+
+
+def check_birthday(day: int, year: int, mon: int) -> datetime.date:
+    """Check a birth date (years 1900 to 2015)
+
+    param day: 1-31
+    param year: 1900-2015
+    param mon: 1-12
+    return: the date, raises InvalidDateError
+    """
+
+    if not isinstance(year, int) or year < 1900 or year > 2015:
+        raise InvalidDateError("birthday", "Invalid year")
+
+    try:
+        return datetime.date(year=year, month=mon, day=day)
+    except (TypeError, ValueError):
+        raise InvalidDateError("birthday", "Invalid date")
+
+
+def check_sex(sex: str) -> None:
+    """Check the sex of a player
+
+    param sex: "M" or "F"
+    return: Nothing, raises InvalidChoiceError
+    """
+
+    if sex not in ("M", "F"):
+        raise InvalidChoiceError("sex", "Invalid sex")
+
+    return
+
+
+def check_rating(rating: int) -> None:
+    """Check a rating (rank, 1 = best)
+
+    param rating: positive integer
+    return: Nothing, raises InvalidNumberError
+    """
+
+    if not isinstance(rating, int) or rating < 1:
+        raise InvalidNumberError("rating", "Invalid rating")
+
+    return
+
+
+def check_score(half_points: int) -> None:
+    """Check a tournament score
+
+    param half_points: integer number of half-points, >= 0
+    return: Nothing, raises InvalidNumberError
+    """
+
+    if not isinstance(half_points, int) or half_points < 0:
+        raise InvalidNumberError("half_points", "Invalid score")
+
+    return
+
+
+def check_points(points: int) -> None:
+    """Check the points won in a game
+
+    param points: 0, 1 or 2 half-points
+    return: Nothing, raises InvalidNumberError
+    """
+
+    if points not in (0, 1, 2):
+        raise InvalidNumberError("points", "Invalid score")
+
+    return
+
+
+def check_match_index(match_index: int, match_count: int) -> None:
+    """Check the index of a match in a round
+
+    param match_index: 0 for the first match
+    param match_count: number of matches in the round
+    return: Nothing, raises InvalidChoiceError
+    """
+
+    if not isinstance(match_index, int) or match_index < 0 or match_index >= match_count:
+        raise InvalidChoiceError("match_index", "Invalid index in match list")
+
+    return
+
+
+def check_match_scores(score_1: int, score_2: int) -> None:
+    """Check the scores of a match: 0, 1 or 2 half-points each, 0 in total (not finished) or 2 (win or draw)
+
+    param score_1: white score in half-points
+    param score_2: black score in half-points
+    return: Nothing, raises InvalidNumberError
+    """
+
+    if score_1 not in (0, 1, 2) or score_2 not in (0, 1, 2) or score_1 + score_2 not in (0, 2):
+        raise InvalidNumberError("scores", "Invalid scores")
+
+    return
+
+
+def check_result_code(result_code: int) -> None:
+    """Check a match result code typed by the user
+
+    param result_code: 0 = not finished, 1 = white wins, 2 = black wins, 3 = draw
+    return: Nothing, raises InvalidChoiceError
+    """
+
+    if result_code not in (0, 1, 2, 3):
+        raise InvalidChoiceError("result_code", "Invalid result code")
+
+    return
+
+
+def check_tournament_name(name: str) -> None:
+    """Check the length of a tournament name
+
+    param name: at most 25 characters
+    return: Nothing, raises InvalidNameError
+    """
+
+    if not isinstance(name, str) or len(name) > 25:
+        raise InvalidNameError("name", "Tournament name must be 25 characters long at most")
+
+    return
+
+
+def check_location(location: str) -> None:
+    """Check the length of a tournament location
+
+    param location: at most 50 characters
+    return: Nothing, raises InvalidNameError
+    """
+
+    if not isinstance(location, str) or len(location) > 50:
+        raise InvalidNameError("location", "Tournament location must be 50 characters long at most")
+
+    return
+
+
+def check_dates(start_date: datetime.date, end_date: datetime.date) -> None:
+    """Check that a tournament does not end before it starts
+
+    param start_date: first day
+    param end_date: last day
+    return: Nothing, raises InvalidDateError
+    """
+
+    if start_date > end_date:
+        raise InvalidDateError("end_date", "End date must come after start date")
+
+    return
+
+
+def build_date(field: str, day: int, mon: int, year: int) -> datetime.date:
+    """Build a date from its parts
+
+    param field: name of the field, for the error
+    return: the date, raises InvalidDateError
+    """
+
+    try:
+        return datetime.date(year=year, month=mon, day=day)
+    except (TypeError, ValueError):
+        raise InvalidDateError(field, "Invalid dates")
+
+
+def read_iso_date(field: str, iso_date: str) -> datetime.date:
+    """Read a stored date
+
+    param field: name of the field, for the error
+    param iso_date: "YYYY-MM-DD"
+    return: the date, raises InvalidDateError
+    """
+
+    try:
+        return datetime.date.fromisoformat(iso_date)
+    except (TypeError, ValueError):
+        raise InvalidDateError(field, f"Not an ISO-8601 date: {iso_date} (see db_upgrade)")
+
+
+def check_choice(field: str, value: str, choices: tuple) -> None:
+    """Check a value taken from a fixed list
+
+    param field: name of the field
+    param value: value to check
+    param choices: allowed values
+    return: Nothing, raises InvalidChoiceError
+    """
+
+    if value not in choices:
+        raise InvalidChoiceError(field, f"Unknown {field.replace('_', ' ')}: {value}")
+
+    return
+
+
+def choice_from_menu(field: str, number: int, choices: tuple) -> str:
+    """Translate a menu number (1 = first choice) into the stored value
+
+    param field: name of the field
+    param number: number typed by the user
+    param choices: allowed values, in menu order
+    return: the chosen value, raises InvalidChoiceError
+    """
+
+    if not isinstance(number, int) or number < 1 or number > len(choices):
+        raise InvalidChoiceError(field, f"Unknown {field.replace('_', ' ')} value")
+
+    return choices[number - 1]
+
+
+def collect(errors: list, check, *args) -> object:
+    """Run a check and keep its error instead of raising it
+
+    param errors: list receiving the error
+    param check: one of the check functions
+    return: the result of the check, None if it failed
+    """
+
+    try:
+        return check(*args)
+    except ValidationError as error:
+        errors.append(error)
+        return None
+
+
+def validate_player(record: dict) -> list:
+    """Check all fields of a stored player
+
+    param record: serialized player
+    return: list of ValidationError (empty if valid)
+    """
+
+    errors = []
+    collect(errors, check_person_name, "first_name", record.get('first_name'))
+    collect(errors, check_person_name, "last_name", record.get('last_name'))
+    collect(errors, check_birthday, record.get('birth_day'), record.get('birth_year'), record.get('birth_mon'))
+    collect(errors, check_sex, record.get('sex'))
+    collect(errors, check_rating, record.get('rating'))
+    collect(errors, check_score, record.get('half_points'))
+
+    return errors
+
+
+def validate_tournament(record: dict) -> list:
+    """Check the general fields of a stored tournament (document or catalog entry)
+
+    param record: serialized tournament or catalog summary
+    return: list of ValidationError (empty if valid)
+    """
+
+    errors = []
+    collect(errors, check_tournament_name, record.get('name'))
+    collect(errors, check_location, record.get('location'))
+    collect(errors, check_choice, "time_control", record.get('time_control'), TIME_CONTROLS)
+    if 'pairing_system' in record:
+        collect(errors, check_choice, "pairing_system", record['pairing_system'], PAIRING_SYSTEMS)
+
+    start_date = collect(errors, read_iso_date, "start_date", record.get('start_date'))
+    end_date = collect(errors, read_iso_date, "end_date", record.get('end_date'))
+    if start_date is not None and end_date is not None:
+        collect(errors, check_dates, start_date, end_date)
+
+    return errors
+
+
+def validate_records(records: list, validator) -> dict:
+    """Check a list of records in one pass
+
+    param records: serialized players or tournaments
+    param validator: validate_player or validate_tournament
+    return: error report {index of the record: list of ValidationError}, empty if everything is valid
+    """
+
+    report = {}
+    for i, record in enumerate(records):
+        errors = validator(record)
+        if errors:
+            report[i] = errors
+
+    return report
@@ -4,6 +4,10 @@ OpenClassroom Project 4
 Functions for the view part of the MVC structure
 """
 
+import sys
+import datetime
+from round import decode_matches
+
 
 def print_welcome() -> None:
     """Print welcome lines
@@ -32,6 +36,8 @@ def print_commands() -> None:
     print("players_print: prints the whole list of players and their infos")
     print("player_add: create a new player to add to the list")
     print("player_del: remove player from the list")
+    print("player_stats: print the results of a player over all stored tournaments")
+    print("player_h2h: print all stored games between two players")
     print("players_clear: delete the whole list of players")
     print("players_save: saves the whole list of players with TinyDB")
     print("players_load: loads the whole list of players with TinyDB")
@@ -43,6 +49,12 @@ def print_commands() -> None:
     print("db_tournament_print: find and print a tournament in the database")
     print("db_tournament_print_all: list an print tournaments in the database")
     print("db_tournament_del: delete tournament in database")
+    print("db_tournament_find: list tournaments of the database matching a filter")
+    print("db_archive: move finished tournaments to the compressed archive")
+    print("db_migrate: split the former single-file database (ChessDB.json) into one file per tournament")
+    print("db_upgrade: rewrite tournaments saved by former versions in the current format")
+    print("db_validate: check all stored players and tournaments and list every invalid field")
+    print("db_stats_rebuild: compute the player statistics and head-to-head index again from all stored tournaments")
     print("tournament_add: adds a player to the list of participants for the tournament")
     print("tournament_del: remove a player from the list of participants for the tournament")
     print("tournament_name: define name for the tournament")
@@ -50,7 +62,11 @@ def print_commands() -> None:
     print("tournament_dates: set start/end dates for the tournament")
     print("tournament_desc: add general remarks/description to the tournament")
     print("tournament_time: rapid, blitz or bullet?")
+    print("tournament_pairing: swiss (8 players), round-robin, double round-robin or arena (any number of players)?")
     print("tournament_players: print tournament players")
+    print("tournament_standings: print a page of the current standings")
+    print("tournament_timing: print round durations and result times (mean, p95, slowest boards)")
+    print("tournament_position: print the current position of a player")
     print("tournament_print: print tournament infos (previous rounds + sorted participants)")
     print("tournament_start: check if tournament is OK and launch first round")
     print("tournament_clear: deletes tournament infos and reinitialize everything")
@@ -58,7 +74,18 @@ def print_commands() -> None:
     print("tournament_load: load tournament data from database")
     print("round_print: prints infos about current round (the four matches)")
     print("round_match_result: declares/overwrites results for an ongoing match")
+    print("round_results: declares results for many matches at once (inline or from a file), then saves")
     print("round_next: launch next round if all matches are finished for this one")
+    print("arena_queue: print who is waiting, playing or away in the arena")
+    print("arena_leave: a player leaves the arena for a while (no new game)")
+    print("arena_join: a player comes back to the arena (paired at once)")
+    print("arena_close: stop pairing players, the arena ends with the last game in progress")
+    print("session_new: create a new tournament in memory and select it")
+    print("session_select: select the tournament targeted by tournament/round commands")
+    print("session_list: list the tournaments kept in memory")
+    print("session_close: remove a tournament from memory")
+    print("autosave: set the delay before modified data is saved in the background (0 = disabled)")
+    print("io_wait: wait for the saves and loads still running in the background")
 
     return
 
@@ -127,25 +154,56 @@ def print_prompt_for_time_control() -> None:
     return
 
 
-def print_match(match: dict, i: int) -> None:
-    """Prints well-formatted infos about a match contained in a dictionary
+def print_prompt_for_pairing_system() -> None:
+    """Asks user to enter a code for the pairing system (1-3)
+
+    return: None
+    """
+
+    print("Please enter pairing system code")
+    print("1 = swiss (8 players, 4 rounds)")
+    print("2 = round-robin (everybody meets everybody once)")
+    print("3 = double round-robin (twice, with both colors)")
+    print("4 = arena (players paired again as soon as their game is over)")
+
+    return
+
+
+def format_score(half_points: int) -> str:
+    """Turn a score stored in half-points into its usual display form (1.5, 2, ...)
+
+    param half_points: integer number of half-points
+    return: string to print
+    """
+
+    if half_points % 2:
+        return f"{half_points // 2}.5"
+
+    return str(half_points // 2)
+
+
+def print_match(match: list, i: int, names: dict) -> None:
+    """Prints well-formatted infos about a match given as (white ID, black ID, white score, black score)
 
+    param names: complete name of each player, by ID
     return: None
     """
 
-    print(f"MATCH {i} : {match['first_name_1']} {match['last_name_1']} - "
-          f"{match['color_1']} - {match['score_1']} VS "
-          f"{match['score_2']} - {match['color_2']} - "
-          f"{match['first_name_2']} {match['last_name_2']}"
+    player_id_1, player_id_2, score_1, score_2 = match
+    print(f"MATCH {i} : {names[player_id_1]} - "
+          f"white - {format_score(score_1)} VS "
+          f"{format_score(score_2)} - black - "
+          f"{names[player_id_2]}"
           )
 
     return
 
 
 def print_player(first_name: str, last_name: str, birth_year: int, birth_mon: int, birth_day: int,
-                 sex: str, rating: int, tournament_score: float) -> None:
+                 sex: str, rating: int, tournament_score: int) -> None:
     """Called by a Player object to print its content
 
+    param tournament_score: score in half-points
     return: None
     """
 
@@ -158,15 +216,164 @@ def print_player(first_name: str, last_name: str, birth_year: int, birth_mon: in
     else:
         print("Female")
     print(f"Rank: {rating}")
-    print(f"Current tournament score: {tournament_score}")
+    print(f"Current tournament score: {format_score(tournament_score)}")
     print("")
 
     return
 
 
-def print_round(round_desc: dict):
+def player_names(serialized_players: list) -> dict:
+    """Build a table giving the complete name of each serialized player from his ID
+
+    param serialized_players: list of serialized players
+    return: Dictionary ID -> "first_name last_name"
+    """
+
+    names = {}
+    for player in serialized_players:
+        names[player['player_id']] = f"{player['first_name']} {player['last_name']}"
+
+    return names
+
+
+def format_table(headers: list, rows: list) -> str:
+    """Format rows as a text table with aligned columns
+
+    param headers: column titles
+    param rows: list of rows (lists or tuples of printable values)
+    return: the whole table as a single string
+    """
+
+    # Width of each column = longest cell, title included
+    cells = [[str(cell) for cell in row] for row in rows]
+    widths = [len(header) for header in headers]
+    for row in cells:
+        for i, cell in enumerate(row):
+            widths[i] = max(widths[i], len(cell))
+
+    lines = [" | ".join(header.ljust(widths[i]) for i, header in enumerate(headers)).rstrip(),
+             "-+-".join("-" * width for width in widths)]
+    for row in cells:
+        lines.append(" | ".join(cell.ljust(widths[i]) for i, cell in enumerate(row)).rstrip())
+
+    return "\n".join(lines) + "\n"
+
+
+def print_page(headers: list, rows: list, offset: int, more: bool) -> None:
+    """Print a page of records as a table, in a single write
+
+    param headers: column titles
+    param rows: records of this page
+    param offset: index of the first record of the page
+    param more: are there records after this page?
+    return: None
+    """
+
+    if not rows:
+        sys.stdout.write("No record on this page\n\n")
+        sys.stdout.flush()
+        return
+
+    footer = f"Records {offset + 1}-{offset + len(rows)}"
+    if more:
+        footer += " (more on next page)"
+
+    sys.stdout.write(format_table(headers, rows) + footer + "\n\n")
+    sys.stdout.flush()
+
+    return
+
+
+def print_players_page(serialized_players: list, offset: int, more: bool) -> None:
+    """Print a page of players as a table
+
+    param serialized_players: players of this page (serialized)
+    param offset: index of the first player of the page
+    param more: are there players after this page?
+    return: None
+    """
+
+    rows = []
+    for player in serialized_players:
+        rows.append((player['last_name'], player['first_name'],
+                     f"{player['birth_year']}/{player['birth_mon']}/{player['birth_day']}",
+                     player['sex'], player['rating'], format_score(player['half_points'])))
+
+    print_page(["Last name", "First name", "Birth date", "Sex", "Rank", "Score"], rows, offset, more)
+
+    return
+
+
+def print_filter_help() -> None:
+    """Print the syntax of tournament filters
+
+    return: None
+    """
+
+    print("Conditions separated by spaces, all of them must match:")
+    print("  location=<city> (use quotes for spaces: location=\"Saint Etienne\")")
+    print("  time=bullet|blitz|rapid")
+    print("  finished=yes|no")
+    print("  start=, start>=, start<=, start>, start< followed by YYYY, YYYY-MM or YYYY-MM-DD")
+
+    return
+
+
+def print_tournaments_page(summaries: list, offset: int, more: bool) -> None:
+    """Print a page of tournament summaries as a table
+
+    param summaries: catalog entries of this page
+    param offset: index of the first tournament of the page
+    param more: are there tournaments after this page?
+    return: None
+    """
+
+    rows = []
+    for summary in summaries:
+        if summary.get('archived', False):
+            status = "Finished (archived)"
+        elif summary['tournament_finished']:
+            status = "Finished"
+        else:
+            status = "Not finished"
+        rows.append((summary['name'], summary['location'], summary['time_control'],
+                     format_date(summary['start_date']), format_date(summary['end_date']), status))
+
+    print_page(["Name", "Location", "Time control", "Start date", "End date", "Status"], rows, offset, more)
+
+    return
+
+
+def print_standings(rows: list, offset: int, more: bool) -> None:
+    """Print a page of the standings
+
+    param rows: list of (position, complete name, score in half-points, rank)
+    param offset: index of the first player of the page
+    param more: are there players after this page?
+    return: None
+    """
+
+    table_rows = [(position, name, format_score(score), rating) for position, name, score, rating in rows]
+    print_page(["Pos", "Player", "Score", "Rank"], table_rows, offset, more)
+
+    return
+
+
+def print_position(name: str, position: int, total: int) -> None:
+    """Print the position of a player in the standings
+
+    return: None
+    """
+
+    print(f"{name}: position {position} / {total}\n")
+
+    return
+
+
+def print_round(round_desc: dict, names: dict):
     """Print content of a round
 
+    param names: complete name of each player, by ID
     return: Nothing
     """
 
@@ -181,10 +388,9 @@ def print_round(round_desc: dict):
     else:
         print("Round is not over")
 
-    # Sweep through the list of matches...
-    for i in range(len(round_desc["match_list"])):
-        match = round_desc["match_list"][i]
-        print_match(match, i)
+    # Sweep through the list of matches (stored as columns)...
+    for i, match in enumerate(decode_matches(round_desc)):
+        print_match(match, i, names)
 
     # Newline in the end
     print("")
@@ -203,10 +409,14 @@ def print_tournament_infos(tournament: dict) -> None:
     print(f"Tournament description: {tournament['description']}")
     print(f"Tournament time control: {tournament['time_control']}")
     print(f"Tournament location: {tournament['location']}")
-    print(f"Tournament start date: {tournament['start_date']}")
-    print(f"Tournament end date: {tournament['end_date']}")
-
-    if tournament['tournament_finished']:
+    if 'pairing_system' in tournament:
+        print(f"Tournament pairing system: {tournament['pairing_system']} ({tournament['max_round']} rounds)")
+    print(f"Tournament start date: {format_date(tournament['start_date'])}")
+    print(f"Tournament end date: {format_date(tournament['end_date'])}")
+
+    if tournament.get('archived', False):
+        print("Tournament status: Finished (archived)\n")
+    elif tournament['tournament_finished']:
         print("Tournament status: Finished\n")
     else:
         print("Tournament status: Not finished\n")
@@ -227,26 +437,265 @@ def print_tournament(tournament: dict) -> None:
     # Print players
     for player in tournament["players"]:
         print_player(player["first_name"], player["last_name"], player["birth_year"], player["birth_mon"],
-                     player["birth_day"], player["sex"], player["rating"], player["tournament_score"])
+                     player["birth_day"], player["sex"], player["rating"], player["half_points"])
 
     # Print previous rounds
+    names = player_names(tournament["players"])
     for round_desc in tournament["round_list"]:
-        print_round(round_desc)
+        print_round(round_desc, names)
 
     # Current round
-    print_round(tournament["current_round"])
+    print_round(tournament["current_round"], names)
+
+    # Durations (documents of former versions may not have them until upgraded)
+    if "timing_stats" in tournament:
+        print_timing_stats(tournament["timing_stats"])
 
     return
 
 
+def format_duration(seconds: float) -> str:
+    """Format a duration for display
+
+    param seconds: duration in seconds, None if unknown
+    return: e.g. "1:02:05", or "-" if unknown
+    """
+
+    if seconds is None:
+        return "-"
+
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def format_duration_stats(stats: dict) -> str:
+    """Format the summary of a list of durations
+
+    param stats: dictionary with count, mean, p95 and max (see round_timing)
+    return: one line of text
+    """
+
+    if not stats['count']:
+        return "no data"
+
+    return (f"mean {format_duration(stats['mean'])}, p95 {format_duration(stats['p95'])}, "
+            f"max {format_duration(stats['max'])} ({stats['count']} values)")
+
+
+def print_timing_stats(stats: dict) -> None:
+    """Print duration statistics of a tournament: one table row per round, then overall stats
+
+    param stats: dictionary built by round_timing.tournament_timing_stats()
+    return: None
+    """
+
+    rows = []
+    for round_stats in stats['rounds']:
+        slowest = ", ".join(f"match {board} {format_duration(time)}" for board, time in round_stats['slowest'])
+        rows.append((round_stats['round_name'], format_duration(round_stats['duration']),
+                     format_duration(round_stats['boards']['mean']), format_duration(round_stats['boards']['p95']),
+                     format_duration(round_stats['close_delay']), slowest))
+
+    table = format_table(["Round", "Duration", "Mean result", "p95 result", "Close delay", "Slowest boards"], rows)
+    lines = [f"Round durations: {format_duration_stats(stats['round_durations'])}"]
+    lines.append(f"Results (after round start): {format_duration_stats(stats['boards'])}")
+    lines.append(f"Delay between last result and next round: {format_duration_stats(stats['close_delays'])}")
+    slowest = ", ".join(f"{name} match {board} {format_duration(time)}" for name, board, time in stats['slowest'])
+    lines.append(f"Slowest boards: {slowest or '-'}")
+    sys.stdout.write(table + "\n" + "\n".join(lines) + "\n\n")
+
+    return
+
+
+def stats_row(title: str, record: dict) -> tuple:
+    """Build a table row from a record of games
+
+    param title: first cell (time control or tournament name)
+    param record: games, wins, draws, losses and half_points
+    return: tuple of cells
+    """
+
+    # Performance = share of the available points
+    performance = f"{record['half_points'] * 50 / record['games']:.0f}%" if record['games'] else "-"
+
+    return (title, record['games'], record['wins'], record['draws'], record['losses'],
+            format_score(record['half_points']), performance)
+
+
+def print_player_stats(stats: dict) -> None:
+    """Print the statistics of a player, by time control and by tournament
+
+    param stats: entry of the player statistics table
+    return: None
+    """
+
+    headers = ["Games", "Wins", "Draws", "Losses", "Score", "Performance"]
+    by_time_control = [stats_row(time_control, record) for time_control, record in stats['by_time_control'].items()]
+    by_tournament = [stats_row(name, record) for name, record in stats['tournaments'].items()]
+
+    sys.stdout.write(f"{stats['first_name']} {stats['last_name']}\n\n"
+                     + format_table(["Time control"] + headers, by_time_control) + "\n"
+                     + format_table(["Tournament"] + headers, by_tournament) + "\n")
+
+    return
+
+
+def print_head_to_head(games: list, names: dict) -> None:
+    """Print the games between two players as a table
+
+    param games: entries of the head-to-head index
+    param names: complete name of each player, by ID
+    return: None
+    """
+
+    rows = []
+    for game in games:
+        if game['white_score'] + game['black_score']:
+            result = f"{format_score(game['white_score'])} - {format_score(game['black_score'])}"
+        else:
+            result = "not played yet"
+        rows.append((game['tournament'], game['round'], names.get(game['white'], game['white']),
+                     names.get(game['black'], game['black']), result))
+
+    sys.stdout.write(format_table(["Tournament", "Round", "White", "Black", "Result"], rows) + "\n")
+
+    return
+
+
+def print_arena_queue(waiting: list, playing: list, paused: list) -> None:
+    """Print the state of an arena
+
+    param waiting: names of the players waiting for an opponent, best score first
+    param playing: names of the players in a game
+    param paused: names of the players who left for a while
+    return: None
+    """
+
+    print(f"Waiting ({len(waiting)}): {', '.join(waiting) or '-'}")
+    print(f"Playing ({len(playing)}): {', '.join(sorted(playing)) or '-'}")
+    print(f"Away ({len(paused)}): {', '.join(sorted(paused)) or '-'}\n")
+
+    return
+
+
+def print_sessions(summaries: list) -> None:
+    """Print the sessions kept in memory
+
+    param summaries: list of (session name, tournament name, round number, selected?)
+    return: None
+    """
+
+    for name, tour_name, round_number, selected in summaries:
+        marker = "*" if selected else " "
+        print(f"{marker} {name}: {tour_name or '(no name)'} - round {round_number}")
+    print("")
+
+    return
+
+
+def day_suffix(day: int) -> str:
+    """English ordinal suffix of a day of the month
+
+    param day: 1-31
+    return: "st", "nd", "rd" or "th"
+    """
+
+    if 11 <= day <= 13:
+        return "th"
+
+    return {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
+
+
+def format_date(iso_date: str) -> str:
+    """Format a stored date for display
+
+    param iso_date: "YYYY-MM-DD" (other strings are returned unchanged)
+    return: e.g. "Wednesday, March 1st, 2023"
+    """
+
+    try:
+        date = datetime.date.fromisoformat(iso_date)
+    except ValueError:
+        return iso_date
+
+    return f"{date:%A, %B} {date.day}{day_suffix(date.day)}, {date.year}"
+
+
+def format_datetime(iso_datetime: str) -> str:
+    """Format a stored timestamp for display
+
+    param iso_datetime: "YYYY-MM-DDTHH:MM:SS" (other strings are returned unchanged)
+    return: e.g. "14:05:00 on Wednesday, March 1st, 2023"
+    """
+
+    try:
+        timestamp = datetime.datetime.fromisoformat(iso_datetime)
+    except ValueError:
+        return iso_datetime
+
+    return f"{timestamp:%H:%M:%S} on {format_date(timestamp.date().isoformat())}"
+
+
 def print_datetime(date: str, prefix: str) -> None:
     """Print a nicely formatted date and time
 
-    param date: string with the formatted date
+    param date: stored ISO-8601 timestamp
     param prefix: string to be printed before the date
     return: Nothing
     """
 
-    print(f"{prefix} : {date}")
+    print(f"{prefix} : {format_datetime(date)}")
+
+    return
+
+
+def print_error(error: Exception) -> None:
+    """Print a value refused by the model
+
+    param error: ValidationError (or any exception with a readable message)
+    return: Nothing
+    """
+
+    print(error)
+
+    return
+
+
+def print_match_errors(errors: list) -> None:
+    """Print why a batch of match results was rejected
+
+    param errors: list of ValidationError (index = match index, None for the batch itself)
+    return: Nothing
+    """
+
+    for error in errors:
+        if error.index is None:
+            print(error)
+        else:
+            print(f"Match {error.index}: {error}")
+    print("No result was recorded")
+
+    return
+
+
+def print_validation_report(title: str, report: dict, labels: list) -> None:
+    """Print the errors found by a batch validation
+
+    param title: kind of records checked ("players", "tournaments")
+    param report: {index of the record: list of ValidationError}
+    param labels: one label per record (name...), same order as the checked records
+    return: Nothing
+    """
+
+    if not report:
+        print(f"{len(labels)} {title} checked, no error")
+        return
+
+    print(f"{len(labels)} {title} checked, {len(report)} with errors:")
+    for index, errors in sorted(report.items()):
+        for error in errors:
+            print(f"  {labels[index]} - {error.field}: {error}")
 
     return